@@ -0,0 +1,163 @@
+from PotentialRun import PotentialRun
+from helpers import *
+
+# Bitset counterpart of ClueRun. Legal start positions are the set bits of self.starts, and are only ever removed.
+class BitClueRun:
+    def __init__(self, line_object, clue_index, prev_run, length, first_start, last_end):
+        self.line_object = line_object
+        self.clue_index = clue_index
+
+        self.prev_run = prev_run
+        if prev_run is not None:
+            prev_run.next_run = self
+        self.next_run = None
+
+        self.length = length
+        self.starts = bit_range(first_start, last_end - length + 1)
+
+        self.dirty = True # Whether a start was removed since apply() was last called
+
+    def __str__(self):
+        return f"ClueRun({clue_run_name(self.line_object.axis, self.line_object.line_index, self.clue_index)})"
+
+    # Only built on demand, for display and debugging
+    @property
+    def potential_runs(self):
+        return [PotentialRun(self, start) for run_start, run_end in bit_runs(self.starts) for start in range(run_start, run_end)]
+
+    def placement_count(self):
+        return self.starts.bit_count()
+
+    def remove_starts(self, mask):
+        if not self.starts & mask:
+            return DirtyFlag.NONE
+
+        old_first_start = self.first_start()
+        old_last_start = self.last_start()
+        dirty_flags = self.clear_starts(mask)
+        if not self.starts:
+            return dirty_flags
+
+        # Cascade to the ClueRuns after and before, which must stay in order. Each cascade only moves one way along the
+        # line, so it's followed in a loop rather than by recursion, since a long line can have hundreds of ClueRuns.
+        if self.next_run is not None and self.first_start() != old_first_start:
+            dirty_flags |= self.line_object.with_rule(Rule.CASCADE, self.cascade_to_next_runs)
+        if self.prev_run is not None and self.last_start() != old_last_start:
+            dirty_flags |= self.line_object.with_rule(Rule.CASCADE, self.cascade_to_prev_runs)
+
+        return dirty_flags
+
+    # Remove the starts of each following ClueRun that would reach the first potential run of the one before it
+    def cascade_to_next_runs(self):
+        dirty_flags = DirtyFlag.NONE
+        clue_run = self
+        while clue_run.next_run is not None and clue_run.next_run.starts & bit_range(0, clue_run.first_end() + 1):
+            dirty_flags |= clue_run.next_run.clear_starts(bit_range(0, clue_run.first_end() + 1))
+            clue_run = clue_run.next_run
+        return dirty_flags
+
+    # Remove the starts of each preceding ClueRun that would reach the last potential run of the one after it
+    def cascade_to_prev_runs(self):
+        dirty_flags = DirtyFlag.NONE
+        clue_run = self
+        while clue_run.prev_run is not None:
+            mask = clue_run.prev_run.starts & ~bit_range(0, max(clue_run.last_start() - clue_run.prev_run.length, 0))
+            if not mask:
+                break
+            dirty_flags |= clue_run.prev_run.clear_starts(mask)
+            clue_run = clue_run.prev_run
+        return dirty_flags
+
+    # Remove the starts of the mask, without cascading
+    def clear_starts(self, mask):
+        solver = self.line_object.solver
+        if solver is not None and solver.options.detailed_stats:
+            solver.stats.count_removed_runs(solver.rule, (self.starts & mask).bit_count())
+        if solver is not None and solver.event_log is not None:
+            for start, end in bit_runs(self.starts & mask):
+                solver.event_log.removed_starts(solver.rule, self.line_object.axis, self.line_object.line_index, self.clue_index, start, end)
+
+        self.starts &= ~mask
+        self.dirty = True
+        self.line_object.dirty = True
+
+        if not self.starts:
+            self.line_object.assert_line(False, f"Removed every potential run from {self}")
+
+        return DirtyFlag.CLUES
+
+    # Index of the first potential run
+    def first_start(self):
+        return lowest_bit(self.starts)
+
+    # Index past the last tile of the first potential run
+    def first_end(self):
+        return self.first_start() + self.length
+
+    # Index of the last potential run
+    def last_start(self):
+        return highest_bit(self.starts)
+
+    # Index past the last tile of the last potential run
+    def last_end(self):
+        return self.last_start() + self.length
+
+    # Starts of the potential runs that entirely contain the given run
+    def containing_starts(self, run_start, run_end):
+        return self.starts & bit_range(max(run_end - self.length, 0), run_start + 1)
+
+    # True if any potential run entirely contains the given run
+    def can_contain(self, run_start, run_end=None):
+        if run_end is None:
+            run_end = run_start + 1
+
+        return run_start >= 0 and self.containing_starts(run_start, run_end) != 0
+
+    # True if all potential runs entirely contain the given run
+    def must_contain(self, run_start, run_end=None):
+        if run_end is None:
+            run_end = run_start + 1
+
+        return self.last_start() <= run_start and run_end <= self.first_end()
+
+    # True if there is only one potential run
+    def is_fixed(self):
+        return self.starts & (self.starts - 1) == 0
+
+    def remove_starts_after(self, i):
+        return self.remove_starts(self.starts & ~bit_range(0, max(i + 1, 0)))
+
+    def remove_ends_before(self, i):
+        return self.remove_starts(bit_range(0, max(i - self.length, 0)))
+
+    # Remove every start whose run would cover a crossed tile or touch a filled tile
+    def remove_blocked_starts(self, filled, crossed):
+        return self.remove_starts(smear_down(crossed, self.length) | (filled >> self.length) | (filled << 1))
+
+    # Tiles covered by at least one potential run
+    def coverage(self):
+        return smear_up(self.starts, self.length)
+
+    # Apply known tiles to the board
+    def apply(self):
+        if not self.dirty or not self.starts:
+            return DirtyFlag.NONE
+
+        # Fill known run
+        dirty_flags = self.line_object.fill(self.last_start(), self.first_end())
+
+        # If the run is complete, cross the tile before and the tile after
+        if self.is_fixed():
+            dirty_flags |= self.line_object.with_rule(Rule.COMPLETE_RUN, self.cross_ends)
+
+        self.dirty = False
+        return dirty_flags
+
+    # Cross the tiles either side of the only potential run
+    def cross_ends(self):
+        dirty_flags = DirtyFlag.NONE
+        if self.first_start() > 0:
+            dirty_flags |= self.line_object.cross(self.first_start() - 1)
+        if self.last_end() < self.line_object.size:
+            dirty_flags |= self.line_object.cross(self.last_end())
+        return dirty_flags
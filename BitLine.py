@@ -0,0 +1,285 @@
+from functools import partial
+
+from BitClueRun import BitClueRun
+from helpers import *
+from picross_placements import line_placements
+
+# Bitset counterpart of Line. Bit i of self.filled and self.crossed is tile i of the line.
+# With no solver, the line is solved on its own: only line_raw is written, and contradictions raise.
+class BitLine:
+    def __init__(self, solver, axis, line_index, clue_run_lengths, line_raw):
+        self.solver = solver
+        self.axis = axis
+        self.line_index = line_index
+        self.clue_run_lengths = clue_run_lengths
+        self.line_raw = line_raw
+        self.size = len(line_raw)
+        self.filled = 0
+        self.crossed = 0
+        self.clue_runs = []
+        self.blocked = 0 # Known tiles whose blocked starts have already been removed
+        self.dirty = True # Whether tiles or starts changed since solve_line() last ran
+
+        deduction = self.size - (sum(clue_run_lengths) + len(clue_run_lengths) - 1)
+
+        run_start = 0
+        clue_run = None
+        for clue_index, run_length in enumerate(clue_run_lengths):
+            clue_run = BitClueRun(self, clue_index, clue_run, run_length, run_start, run_start + run_length + deduction)
+            self.clue_runs.append(clue_run)
+            run_start += run_length + 1
+
+        # Tiles that are already known, such as when solving a line on its own
+        self.load_raw()
+
+    @property
+    def filled_runs(self):
+        return list(bit_runs(self.filled))
+
+    def verify(self):
+        if len(self.filled_runs) != len(self.clue_run_lengths):
+            return False
+        for (start, end), length in zip(self.filled_runs, self.clue_run_lengths):
+            if end - start != length:
+                return False
+        return True
+
+    # Reload the known tiles from line_raw, after the board was written to directly
+    def load_raw(self):
+        line_raw = np.asarray(self.line_raw)
+        self.filled = bools_to_mask(line_raw == State.FILLED)
+        self.crossed = bools_to_mask(line_raw == State.CROSSED)
+        self.dirty = True
+
+    def assert_line(self, result, message):
+        if self.solver is not None:
+            self.solver.assert_puzzle(result, message)
+        elif not result:
+            raise Contradiction(message)
+
+    # Count the changes made by operation against the given Rule, when solving for a Solver
+    def with_rule(self, rule, operation):
+        if self.solver is None:
+            return operation()
+        return self.solver.with_rule(rule, operation)
+
+    def set_state(self, state, start, end):
+        bits = bit_range(start, end)
+        if state == State.FILLED:
+            new_bits = bits & ~self.filled
+            conflicting_bits = new_bits & self.crossed
+        else:
+            new_bits = bits & ~self.crossed
+            conflicting_bits = new_bits & self.filled
+
+        if not new_bits:
+            return DirtyFlag.NONE
+
+        self.assert_line(not conflicting_bits, f"Tried to {state_name_verb(state)} {run_name(self.axis, self.line_index, start, end)} but part of it is already {state_name(-state)}")
+
+        if self.solver is None:
+            for new_start, new_end in bit_runs(new_bits):
+                self.line_raw[new_start:new_end] = [state] * (new_end - new_start)
+            self.set_bit(state, new_bits)
+            return DirtyFlag.BOARD
+
+        line_bit = 1 << self.line_index
+        perpendicular_lines = self.solver.line_objects[not self.axis]
+        for new_start, new_end in bit_runs(new_bits):
+            for i in range(new_start, new_end):
+                self.line_raw[i] = state
+                perpendicular_lines[i].set_bit(state, line_bit)
+                self.solver.line_changed(perpendicular_lines[i])
+        self.set_bit(state, new_bits)
+        self.solver.line_changed(self, new_bits.bit_count())
+        if self.solver.options.detailed_stats:
+            self.solver.stats.count_tiles(self.solver.rule, state, new_bits.bit_count())
+        if self.solver.options.track_dependencies:
+            deducing_line = self.solver.deducing_line(self.axis, self.line_index)
+            for new_start, new_end in bit_runs(new_bits):
+                self.solver.record_tiles(line_tiles(self.axis, self.line_index, new_start, new_end), deducing_line)
+        if self.solver.event_log is not None:
+            for new_start, new_end in bit_runs(new_bits):
+                self.solver.event_log.tiles(self.solver.rule, self.axis, self.line_index, new_start, new_end, state)
+
+        return DirtyFlag.BOARD
+
+    # Record known tiles without touching the board or the perpendicular lines
+    def set_bit(self, state, bits):
+        if state == State.FILLED:
+            self.filled |= bits
+            self.crossed &= ~bits
+        else:
+            self.crossed |= bits
+            self.filled &= ~bits
+        self.dirty = True
+
+    def placement_count(self):
+        return sum(clue_run.starts.bit_count() for clue_run in self.clue_runs)
+
+    def fill(self, start, end):
+        return self.set_state(State.FILLED, start, end)
+
+    def cross(self, index):
+        return self.set_state(State.CROSSED, index, index + 1)
+
+    # Remove every potential run that covers a crossed tile or ends next to a filled tile
+    def remove_blocked_starts(self):
+        new_filled = self.filled & ~self.blocked
+        new_crossed = self.crossed & ~self.blocked
+        if not new_filled and not new_crossed:
+            return DirtyFlag.NONE
+        self.blocked |= new_filled | new_crossed
+
+        return self.with_rule(Rule.BLOCKED, partial(self.remove_starts_blocked_by, new_filled, new_crossed))
+
+    def remove_starts_blocked_by(self, filled, crossed):
+        dirty_flags = DirtyFlag.NONE
+        for clue_run in self.clue_runs:
+            dirty_flags |= clue_run.remove_blocked_starts(filled, crossed)
+        return dirty_flags
+
+    # Fill or cross every tile of the given mask that isn't already in that state, counted against rule if given
+    def set_bits(self, state, bits, rule=None):
+        if not bits:
+            return DirtyFlag.NONE
+        if rule is not None:
+            return self.with_rule(rule, partial(self.set_bits, state, bits))
+
+        dirty_flags = DirtyFlag.NONE
+        for start, end in bit_runs(bits):
+            dirty_flags |= self.set_state(state, start, end)
+        return dirty_flags
+
+    # Keep solving until nothing in the line changes. Each step only reads and writes masks, so a whole line is
+    # solved before moving on rather than waiting for the next pass.
+    def solve_line(self):
+        dirty_flags = DirtyFlag.NONE
+        while self.dirty:
+            self.dirty = False
+            dirty_flags |= self.solve_step()
+        return dirty_flags
+
+    # Solve the line exactly, from every placement of the ClueRuns that fits the known tiles, instead of by solve_step
+    def solve_placements(self):
+        placements = line_placements(self.clue_run_lengths, self.filled, self.crossed, self.size)
+        self.assert_line(placements is not None, f"Line {line_name(self.axis, self.line_index)} can't satisfy its clues")
+
+        starts, fills, crosses = placements
+        dirty_flags = self.set_bits(State.FILLED, fills, Rule.PLACEMENTS) | self.set_bits(State.CROSSED, crosses, Rule.PLACEMENTS)
+        for clue_run, run_starts in zip(self.clue_runs, starts):
+            dirty_flags |= self.with_rule(Rule.PLACEMENTS, partial(clue_run.remove_starts, clue_run.starts & ~run_starts))
+
+        # Every start the tiles block was just removed, and nothing more can be deduced until another line changes
+        self.blocked = self.filled | self.crossed
+        self.dirty = False
+        return dirty_flags
+
+    def solve_step(self):
+        dirty_flags = self.remove_blocked_starts()
+        if not all(clue_run.starts for clue_run in self.clue_runs):
+            return dirty_flags
+
+        # Apply all ClueRuns, and cross every tile that no potential run covers
+        line_bits = bit_range(0, self.size)
+        fills = 0
+        crosses = 0
+        uncovered = line_bits
+        for clue_run in self.clue_runs:
+            first_start = clue_run.first_start()
+            last_start = clue_run.last_start()
+            fills |= bit_range(last_start, first_start + clue_run.length)
+            if first_start == last_start:
+                crosses |= 1 << first_start >> 1 | 1 << last_start + clue_run.length
+            uncovered &= ~clue_run.coverage()
+            clue_run.dirty = False
+
+        dirty_flags |= self.set_bits(State.FILLED, fills & ~self.filled, Rule.OVERLAP)
+        dirty_flags |= self.set_bits(State.CROSSED, crosses & line_bits & ~self.crossed, Rule.COMPLETE_RUN)
+        dirty_flags |= self.set_bits(State.CROSSED, uncovered & line_bits & ~self.crossed, Rule.UNCOVERED)
+        dirty_flags |= self.remove_blocked_starts()
+
+        fills = 0
+        crosses_before = 0
+        crosses_after = 0
+        trimmed_start = [False] * len(self.clue_runs)
+        ends_to_trim = [-1] * len(self.clue_runs)
+
+        # Iterate filled runs
+        for start, end in bit_runs(self.filled):
+            first_containing_clue_run = None
+            last_containing_clue_run = None
+
+            first_start = self.size
+            last_start = 0
+            first_end = self.size
+            last_end = 0
+
+            # Intersect the starts that could contain the filled run, from all ClueRuns
+            for clue_run in self.clue_runs:
+                starts = clue_run.starts
+
+                # Later ClueRuns can only start later, so none of them can contain the filled run either
+                if not starts & ((2 << start) - 1):
+                    break
+
+                containing_starts = starts & ~((1 << end - clue_run.length) - 1) if end > clue_run.length else starts
+                containing_starts &= (2 << start) - 1
+                if not containing_starts:
+                    continue
+
+                if first_containing_clue_run is None:
+                    first_containing_clue_run = clue_run
+                last_containing_clue_run = clue_run
+
+                lowest_start = (containing_starts & -containing_starts).bit_length() - 1
+                highest_start = containing_starts.bit_length() - 1
+                if lowest_start < first_start:
+                    first_start = lowest_start
+                if highest_start > last_start:
+                    last_start = highest_start
+                if lowest_start + clue_run.length < first_end:
+                    first_end = lowest_start + clue_run.length
+                if highest_start + clue_run.length > last_end:
+                    last_end = highest_start + clue_run.length
+
+            if first_containing_clue_run is None:
+                self.assert_line(False, f"No ClueRun can contain {run_name(self.axis, self.line_index, start, end)}")
+                continue
+
+            # Fill guaranteed run
+            fills |= bit_range(min(last_start, start), max(first_end, end))
+
+            # Cross before guaranteed start
+            if last_start < start and last_start == first_start and first_start > 0:
+                crosses_before |= 1 << first_start - 1
+
+            # Cross after guaranteed end
+            if first_end > end and first_end == last_end and last_end < self.size:
+                crosses_after |= 1 << last_end
+
+            # The first clue run that can contain this run must not start after the run does.
+            if not trimmed_start[first_containing_clue_run.clue_index]:
+                dirty_flags |= self.with_rule(Rule.TRIM_START, partial(first_containing_clue_run.remove_starts_after, start))
+                trimmed_start[first_containing_clue_run.clue_index] = True
+
+            # The last clue run that can contain this run must not end before the run does. (mark it for now)
+            ends_to_trim[last_containing_clue_run.clue_index] = end
+
+        # Trim any marked ClueRun to the end of the last filled run for which it was the last ClueRun to contain.
+        for clue_index, clue_run in enumerate(self.clue_runs):
+            if ends_to_trim[clue_index] != -1:
+                dirty_flags |= self.with_rule(Rule.TRIM_END, partial(clue_run.remove_ends_before, ends_to_trim[clue_index]))
+
+        dirty_flags |= self.set_bits(State.FILLED, fills & ~self.filled, Rule.GUARANTEED_RUN)
+        dirty_flags |= self.set_bits(State.CROSSED, crosses_before & ~self.crossed, Rule.CROSS_BEFORE)
+        dirty_flags |= self.set_bits(State.CROSSED, crosses_after & ~self.crossed, Rule.CROSS_AFTER)
+        return dirty_flags
+
+# Solve a line from nothing but its clues and tiles. Returns the tiles it newly fills and crosses, as masks.
+def solve_line_cells(clue_run_lengths, line_raw):
+    line_object = BitLine(None, Axis.ROWS, 0, clue_run_lengths, list(line_raw))
+    filled_before = line_object.filled
+    crossed_before = line_object.crossed
+    line_object.solve_line()
+    return line_object.filled & ~filled_before, line_object.crossed & ~crossed_before
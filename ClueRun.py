@@ -1,9 +1,11 @@
-from line_profiler_pycharm import profile
+from bisect import bisect_left, insort
 
 from PotentialRun import PotentialRun
 from helpers import *
 
 class ClueRun:
+    __slots__ = ("line_object", "clue_index", "prev_run", "next_run", "length", "min_start", "max_start", "excluded_starts", "sorted_excluded_starts", "dirty")
+
     def __init__(self, line_object, clue_index, prev_run, length, first_start, last_end):
         self.line_object = line_object
         self.clue_index = clue_index
@@ -14,118 +16,238 @@ class ClueRun:
         self.next_run = None
 
         self.length = length
-        self.potential_runs = [PotentialRun(self, i) for i in range(first_start, last_end - length + 1)]
-
-        for potential_run in self.potential_runs:
-            for tile in potential_run.tiles():
-                tile.add_run(potential_run)
-
-            tile_before = potential_run.tile_before()
-            if tile_before:
-                tile_before.add_adjacent_run(potential_run)
 
-            tile_after = potential_run.tile_after()
-            if tile_after:
-                tile_after.add_adjacent_run(potential_run)
+        # Potential runs start at every index from min_start to max_start, except for the excluded starts.
+        # min_start and max_start themselves are never excluded. The excluded starts are also kept sorted, so that
+        # trimming either end finds the ones it drops by bisection rather than by checking every trimmed start.
+        self.min_start = first_start
+        self.max_start = last_end - length
+        self.excluded_starts = set()
+        self.sorted_excluded_starts = []
 
-        self.dirty = True # Whether a potential_run was removed since apply() was last called
+        self.dirty = True # Whether a potential run was removed since apply() was last called
 
     def __str__(self):
         return f"ClueRun({clue_run_name(self.line_object.axis, self.line_object.line_index, self.clue_index)})"
 
-    def remove_run(self, potential_run):
-        if potential_run == self.potential_runs[0]:
-            return self.remove_first()
-        elif potential_run == self.potential_runs[-1]:
-            return self.remove_last()
+    # Only built on demand, for display and debugging
+    @property
+    def potential_runs(self):
+        return [PotentialRun(self, start) for start in range(self.min_start, self.max_start + 1) if start not in self.excluded_starts]
 
-        self.potential_runs.remove(potential_run)
+    def placement_count(self):
+        return self.max_start - self.min_start + 1 - len(self.excluded_starts)
+
+    # Replace the potential runs with the set bits of a mask of starts, such as those of a BitClueRun
+    def set_starts(self, starts):
+        self.min_start = lowest_bit(starts)
+        self.max_start = highest_bit(starts)
+        self.sorted_excluded_starts = [i for i in range(self.min_start + 1, self.max_start) if not starts >> i & 1]
+        self.excluded_starts = set(self.sorted_excluded_starts)
         self.dirty = True
-        return DirtyFlag.CLUES | potential_run.remove_from_tiles()
 
-    def remove_first(self):
-        first_run = self.potential_runs.pop(0)
+    # Mask of the starts of the potential runs, like BitClueRun.starts
+    def starts_mask(self):
+        starts = bit_range(self.min_start, self.max_start + 1)
+        for start in self.excluded_starts:
+            starts &= ~(1 << start)
+        return starts
+
+    # Remove every potential run whose start isn't a set bit of starts, which must only hold starts that are left. The
+    # starts are taken as they are, without cascading or crossing uncovered tiles, as when they come from line_placements.
+    def keep_starts(self, starts):
+        removed_count = self.placement_count() - starts.bit_count()
+        if not removed_count:
+            return DirtyFlag.NONE
+
+        solver = self.line_object.solver
+        if solver.options.detailed_stats:
+            solver.stats.count_removed_runs(solver.rule, removed_count)
+        if solver.event_log is not None:
+            for start, end in bit_runs(self.starts_mask() & ~starts):
+                self.log_removed_starts(start, end)
+        self.set_starts(starts)
+        return DirtyFlag.CLUES
+
+    # Remove the potential run starting at start, if there is one. Each newly known tile removes a few single starts
+    # from every ClueRun that reaches it, so this skips the range handling of remove_starts.
+    def remove_start(self, start):
+        if start < self.min_start or start > self.max_start or start in self.excluded_starts:
+            return DirtyFlag.NONE
+        if start == self.min_start:
+            return self.remove_starts_before(start + 1)
+        if start == self.max_start:
+            return self.remove_starts_after(start - 1)
+
+        self.excluded_starts.add(start)
+        insort(self.sorted_excluded_starts, start)
         self.dirty = True
-        dirty_flags = DirtyFlag.CLUES | first_run.remove_from_tiles()
+        solver = self.line_object.solver
+        if solver.options.detailed_stats:
+            solver.stats.count_removed_runs(solver.rule, 1)
+        if solver.event_log is not None:
+            self.log_removed_starts(start, start + 1)
+        return DirtyFlag.CLUES | self.line_object.cross_uncovered(start, start + self.length)
+
+    # Remove every potential run starting from start to end (inclusive)
+    def remove_starts(self, start, end):
+        if end < self.min_start or start > self.max_start:
+            return DirtyFlag.NONE
+        if start <= self.min_start:
+            return self.remove_starts_before(end + 1)
+        if end >= self.max_start:
+            return self.remove_starts_after(start - 1)
 
-        # Cascade to next ClueRun if necessary
-        if self.next_run is not None:
-            while self.next_run.first_start() <= self.first_end():
-                dirty_flags |= self.next_run.remove_first()
+        removed_starts = [i for i in range(start, end + 1) if i not in self.excluded_starts]
+        if not removed_starts:
+            return DirtyFlag.NONE
+
+        self.excluded_starts.update(removed_starts)
+        self.sorted_excluded_starts[bisect_left(self.sorted_excluded_starts, start):bisect_left(self.sorted_excluded_starts, end + 1)] = range(start, end + 1)
+        self.dirty = True
+        if self.line_object.solver.options.detailed_stats:
+            self.line_object.solver.stats.count_removed_runs(self.line_object.solver.rule, len(removed_starts))
+        if self.line_object.solver.event_log is not None:
+            self.log_removed_starts(start, end + 1)
+        return DirtyFlag.CLUES | self.line_object.cross_uncovered(removed_starts[0], removed_starts[-1] + self.length)
+
+    # Remove every potential run that starts before i, and cascade to the following ClueRuns, which must stay in order.
+    # Cascades are followed in a loop rather than by recursion, since a long line can have hundreds of ClueRuns.
+    def remove_starts_before(self, i):
+        dirty_flags = self.trim_starts_before(i)
+        if not dirty_flags:
+            return dirty_flags
+
+        solver = self.line_object.solver
+        clue_run = self
+        while clue_run.next_run is not None and clue_run.first_end() + 1 > clue_run.next_run.min_start:
+            dirty_flags |= solver.with_rule(Rule.CASCADE, clue_run.next_run.trim_starts_before, clue_run.first_end() + 1)
+            clue_run = clue_run.next_run
 
         return dirty_flags
 
-    def remove_last(self):
-        last_run = self.potential_runs.pop()
-        self.dirty = True
-        dirty_flags = DirtyFlag.CLUES | last_run.remove_from_tiles()
+    # Remove every potential run that starts after i, and cascade to the preceding ClueRuns
+    def remove_starts_after(self, i):
+        dirty_flags = self.trim_starts_after(i)
+        if not dirty_flags:
+            return dirty_flags
 
-        # Cascade to previous ClueRun if necessary
-        if self.prev_run is not None:
-            while self.prev_run.last_end() >= self.last_start():
-                dirty_flags |= self.prev_run.remove_last()
+        solver = self.line_object.solver
+        clue_run = self
+        while clue_run.prev_run is not None and clue_run.last_start() - clue_run.prev_run.length - 1 < clue_run.prev_run.max_start:
+            dirty_flags |= solver.with_rule(Rule.CASCADE, clue_run.prev_run.trim_starts_after, clue_run.last_start() - clue_run.prev_run.length - 1)
+            clue_run = clue_run.prev_run
 
         return dirty_flags
 
+    # Remove every potential run that starts before i, without cascading
+    def trim_starts_before(self, i):
+        if i <= self.min_start:
+            return DirtyFlag.NONE
+
+        solver = self.line_object.solver
+        solver.assert_puzzle(i <= self.max_start, f"Tried to remove the last potential run from {self}")
+
+        old_min_start = self.min_start
+        old_placement_count = self.placement_count()
+        while i in self.excluded_starts:
+            i += 1
+        index = bisect_left(self.sorted_excluded_starts, i)
+        self.excluded_starts.difference_update(self.sorted_excluded_starts[:index])
+        del self.sorted_excluded_starts[:index]
+        self.min_start = i
+        self.dirty = True
+        if solver.options.detailed_stats:
+            solver.stats.count_removed_runs(solver.rule, old_placement_count - self.placement_count())
+        if solver.event_log is not None:
+            self.log_removed_starts(old_min_start, i)
+
+        return DirtyFlag.CLUES | self.line_object.cross_uncovered(old_min_start, min(i, self.max_start) + self.length - 1)
+
+    # Remove every potential run that starts after i, without cascading
+    def trim_starts_after(self, i):
+        if i >= self.max_start:
+            return DirtyFlag.NONE
+
+        solver = self.line_object.solver
+        solver.assert_puzzle(i >= self.min_start, f"Tried to remove the last potential run from {self}")
+
+        old_max_start = self.max_start
+        old_placement_count = self.placement_count()
+        while i in self.excluded_starts:
+            i -= 1
+        index = bisect_left(self.sorted_excluded_starts, i)
+        self.excluded_starts.difference_update(self.sorted_excluded_starts[index:])
+        del self.sorted_excluded_starts[index:]
+        self.max_start = i
+        self.dirty = True
+        if solver.options.detailed_stats:
+            solver.stats.count_removed_runs(solver.rule, old_placement_count - self.placement_count())
+        if solver.event_log is not None:
+            self.log_removed_starts(i + 1, old_max_start + 1)
+
+        return DirtyFlag.CLUES | self.line_object.cross_uncovered(max(i, self.min_start) + 1, old_max_start + self.length)
+
+    # Record the removal of every potential run starting from start to end (exclusive), including any already excluded
+    def log_removed_starts(self, start, end):
+        solver = self.line_object.solver
+        solver.event_log.removed_starts(solver.rule, self.line_object.axis, self.line_object.line_index, self.clue_index, start, end)
+
+    def remove_ends_before(self, i):
+        return self.remove_starts_before(i - self.length)
+
     # Index of the first potential run
     def first_start(self):
-        return self.potential_runs[0].start
+        return self.min_start
 
     # Index past the last tile of the first potential run
     def first_end(self):
-        return self.potential_runs[0].end
+        return self.min_start + self.length
 
     # Index of the last potential run
     def last_start(self):
-        return self.potential_runs[-1].start
+        return self.max_start
 
     # Index past the last tile of the last potential run
     def last_end(self):
-        return self.potential_runs[-1].end
+        return self.max_start + self.length
+
+    # First and last starts of the potential runs that entirely contain the given run, or None if there are none
+    def containing_starts(self, run_start, run_end):
+        first = max(self.min_start, run_end - self.length)
+        last = min(self.max_start, run_start)
+        while first <= last and first in self.excluded_starts:
+            first += 1
+        if first > last:
+            return None
+        while last in self.excluded_starts:
+            last -= 1
+        return first, last
 
     # True if any potential run entirely contains the given run
     def can_contain(self, run_start, run_end=None):
         if run_end is None:
             run_end = run_start + 1
 
-        if run_end - run_start > self.length:
+        # The first and last starts are never excluded, so only a range strictly between them has to be searched
+        first = max(self.min_start, run_end - self.length)
+        last = min(self.max_start, run_start)
+        if first > last:
             return False
-
-        for potential_run in self.potential_runs:
-            if potential_run.start > run_start:
-                break
-
-            if run_end <= potential_run.end:
-                return True
-
-        return False
+        if first == self.min_start or last == self.max_start or not self.excluded_starts:
+            return True
+        return self.containing_starts(run_start, run_end) is not None
 
     # True if all potential runs entirely contain the given run
     def must_contain(self, run_start, run_end=None):
         if run_end is None:
             run_end = run_start + 1
 
-        for potential_run in self.potential_runs:
-            if not potential_run.contains(run_start, run_end):
-                return False
-
-        return True
+        return self.max_start <= run_start and run_end <= self.min_start + self.length
 
     # True if there is only one potential run
     def is_fixed(self):
-        return len(self.potential_runs) == 1
-
-    def remove_starts_after(self, i):
-        dirty_flags = DirtyFlag.NONE
-        while self.last_start() > i:
-            dirty_flags |= self.remove_last()
-        return dirty_flags
-
-    def remove_ends_before(self, i):
-        dirty_flags = DirtyFlag.NONE
-        while self.first_end() < i:
-            dirty_flags |= self.remove_first()
-        return dirty_flags
+        return self.min_start == self.max_start
 
     # Apply known tiles to the board
     def apply(self):
@@ -137,10 +259,16 @@ class ClueRun:
 
         # If the run is complete, cross the tile before and the tile after
         if self.is_fixed():
-            if self.first_start() > 0:
-                dirty_flags |= self.line_object.cross(self.first_start() - 1)
-            if self.last_end() < len(self.line_object.puzzle_line):
-                dirty_flags |= self.line_object.cross(self.last_end())
+            dirty_flags |= self.line_object.solver.with_rule(Rule.COMPLETE_RUN, self.cross_ends)
 
         self.dirty = False
         return dirty_flags
+
+    # Cross the tiles either side of the only potential run
+    def cross_ends(self):
+        dirty_flags = DirtyFlag.NONE
+        if self.first_start() > 0:
+            dirty_flags |= self.line_object.cross(self.first_start() - 1)
+        if self.last_end() < len(self.line_object.puzzle_line):
+            dirty_flags |= self.line_object.cross(self.last_end())
+        return dirty_flags
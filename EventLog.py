@@ -0,0 +1,116 @@
+import json
+import struct
+
+import numpy as np
+
+from helpers import *
+
+# Event log layout. The header describes the puzzle, and every event after it is one fixed-size record:
+#   header      EVENT_LOG_HEADER, then a utf-8 JSON object holding the puzzle's name, clues and starting board
+#   events      EVENT_RECORD records, in the order they happened, until the end of the file
+# Each record is (kind, rule, axis, value, line_index, clue_index, start, end), where value is the state of TILES
+# events and the Step of STEP events. Tiles and starts run from start to end (exclusive).
+EVENT_LOG_MAGIC = b"PICLOG\0\0"
+EVENT_LOG_VERSION = 1
+EVENT_LOG_HEADER = struct.Struct("<8sII") # magic, version, length of the JSON header
+EVENT_RECORD = struct.Struct("<BBBbiiii")
+EVENT_DTYPE = np.dtype([
+    ("kind", np.uint8),
+    ("rule", np.uint8),
+    ("axis", np.uint8),
+    ("value", np.int8),
+    ("line_index", "<i4"),
+    ("clue_index", "<i4"),
+    ("start", "<i4"),
+    ("end", "<i4"),
+])
+
+# Rule of a step that sets its own Rules, such as a solving pass
+NO_RULE = 255
+
+# Records are buffered and written in blocks of about this many bytes
+EVENT_BUFFER_SIZE = 1 << 16
+
+# Records every tile change, removed potential run and finished step of one solve to a file, so that the solve can be
+# replayed with EventReplay afterwards instead of displayed while it runs. Only the Solver it's given to is
+# recorded. Search branches aren't, but the tiles the search proves or adopts are.
+class EventLog:
+    def __init__(self, filename):
+        self.filename = filename
+        self.file = open(filename, 'wb')
+        self.buffer = bytearray()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # Called by the Solver with the starting board, before anything is solved
+    def start(self, puzzle_name, puzzle_raw, row_and_col_clues_raw):
+        header = json.dumps({
+            "name": puzzle_name,
+            "clues": row_and_col_clues_raw,
+            "board": np.asarray(puzzle_raw).tolist(),
+        }).encode("utf-8")
+        self.file.write(EVENT_LOG_HEADER.pack(EVENT_LOG_MAGIC, EVENT_LOG_VERSION, len(header)))
+        self.file.write(header)
+
+    def tiles(self, rule, axis, line_index, start, end, state):
+        self.write(Event.TILES, rule, axis, state, line_index, -1, start, end)
+
+    def removed_starts(self, rule, axis, line_index, clue_index, start, end):
+        self.write(Event.REMOVED_STARTS, rule, axis, 0, line_index, clue_index, start, end)
+
+    def step(self, step, rule, axis, line_index, clue_index=-1, start=-1, end=-1):
+        self.write(Event.STEP, NO_RULE if rule is None else rule, axis, step, line_index, clue_index, start, end)
+
+    def write(self, kind, rule, axis, value, line_index, clue_index, start, end):
+        self.buffer += EVENT_RECORD.pack(kind, rule, axis, value, line_index, clue_index, start, end)
+        if len(self.buffer) >= EVENT_BUFFER_SIZE:
+            self.flush()
+
+    def flush(self):
+        self.file.write(self.buffer)
+        self.buffer.clear()
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+def read_event_log(filename):
+    """
+    :return: (header, events), where header is the dict written by EventLog.start, and events is a structured array
+        of EVENT_DTYPE. A record cut short, such as by a crash while writing, is left out.
+    """
+    with open(filename, 'rb') as file:
+        data = file.read()
+
+    magic, version, header_length = EVENT_LOG_HEADER.unpack_from(data, 0)
+    if magic != EVENT_LOG_MAGIC:
+        raise ValueError(f"{filename} is not a picross event log")
+    if version != EVENT_LOG_VERSION:
+        raise ValueError(f"{filename} is version {version} of the event log format, expected {EVENT_LOG_VERSION}")
+
+    header_end = EVENT_LOG_HEADER.size + header_length
+    header = json.loads(data[EVENT_LOG_HEADER.size:header_end].decode("utf-8"))
+    event_count = (len(data) - header_end) // EVENT_DTYPE.itemsize
+    events = np.frombuffer(data, dtype=EVENT_DTYPE, count=event_count, offset=header_end)
+    return header, events
+
+# Events as dicts, such as for writing as JSON lines
+def event_dicts(events):
+    for kind, rule, axis, value, line_index, clue_index, start, end in events.tolist():
+        event = {"kind": ["tiles", "removed_starts", "step"][kind], "axis": axis_name(axis), "line": line_index}
+        if rule != NO_RULE:
+            event["rule"] = rule_name(rule)
+        match kind:
+            case Event.TILES:
+                event.update(state=state_name(value), start=start, end=end)
+            case Event.REMOVED_STARTS:
+                event.update(clue=clue_index, start=start, end=end)
+            case Event.STEP:
+                event["step"] = step_name(value, None if rule == NO_RULE else rule, axis, line_index, clue_index, start, end)
+        yield event
@@ -0,0 +1,80 @@
+import numpy as np
+
+from EventLog import NO_RULE, read_event_log
+from Solver import Solver
+from helpers import *
+
+# Rebuilds any state of a solve recorded by an EventLog, without solving anything. The state is kept in a bitset
+# Solver that's never solved, so it can be displayed the same way as a live solve.
+class EventReplay:
+    def __init__(self, filename):
+        self.header, self.events = read_event_log(filename)
+        self.step_ends = np.flatnonzero(self.events["kind"] == Event.STEP) + 1 # Events applied after each step
+
+        self.starting_board = np.array(self.header["board"], dtype=int)
+        self.solver = Solver(self.header["name"], self.starting_board.copy(), self.header["clues"], display_steps=False, engine=Engine.BITSET)
+        self.solver.initialize_clue_runs()
+        self.starting_starts = [clue_run.starts for clue_run in self.solver.get_all_clue_runs()]
+        self.event_index = 0 # Events applied so far
+
+    # Number of steps. Step 0 is the starting board, and step i is the state after the i-th step finished.
+    def __len__(self):
+        return len(self.step_ends)
+
+    def reset(self):
+        self.solver.puzzle_raw[:] = self.starting_board
+        for clue_run, starts in zip(self.solver.get_all_clue_runs(), self.starting_starts):
+            clue_run.starts = starts
+        self.event_index = 0
+
+    def seek(self, step):
+        """
+        Bring the Solver to the state after the given step.
+
+        :param step: Step from 0 to len(self), or None for every recorded event, including any after the last step
+        :return: The Solver, which is updated in place by later seeks
+        """
+        if step is None:
+            return self.seek_event(len(self.events))
+        if not 0 <= step <= len(self):
+            raise IndexError(f"Step {step} is out of range for a log of {len(self)} steps")
+        return self.seek_event(self.step_ends[step - 1] if step else 0)
+
+    def seek_event(self, event_index):
+        if event_index < self.event_index:
+            self.reset()
+
+        for kind, _, axis, value, line_index, clue_index, start, end in self.events[self.event_index:event_index].tolist():
+            match kind:
+                case Event.TILES:
+                    if axis == Axis.ROWS:
+                        self.solver.puzzle_raw[line_index, start:end] = value
+                    else:
+                        self.solver.puzzle_raw[start:end, line_index] = value
+                case Event.REMOVED_STARTS:
+                    self.solver.line_objects[axis][line_index].clue_runs[clue_index].starts &= ~bit_range(start, end)
+        self.event_index = event_index
+        return self.solver
+
+    def board(self, step=None):
+        return self.seek(step).puzzle_raw.copy()
+
+    # Description of the given step, as it was titled when displaying steps
+    def step_title(self, step):
+        if step == 0:
+            return "Start"
+        _, rule, axis, value, line_index, clue_index, start, end = self.events[self.step_ends[step - 1] - 1].tolist()
+        return step_name(value, None if rule == NO_RULE else rule, axis, line_index, clue_index, start, end)
+
+    # Steps that changed the board, as the steps displayed when displaying steps
+    def board_steps(self):
+        tile_counts = np.cumsum(self.events["kind"] == Event.TILES)
+        changed = np.diff(tile_counts[self.step_ends - 1], prepend=0) > 0
+        return [int(step) for step in np.flatnonzero(changed) + 1]
+
+    def display(self, step, block=True):
+        self.seek(step)
+        if self.solver.renderer is None:
+            from PicrossRenderer import PicrossRenderer # matplotlib is only imported when displaying
+            self.solver.renderer = PicrossRenderer(self.solver)
+        self.solver.renderer.update(f"{self.header['name']} - Step {step}: {self.step_title(step)}", block)
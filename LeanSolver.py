@@ -0,0 +1,145 @@
+import numpy as np
+
+from SolveBudget import SolveBudget
+from SolveResult import SolveResult
+from SolveStats import SolveStats
+from helpers import *
+from picross_placements import line_placements
+
+# A new board of unknown tiles, a byte each. With a filename, the board is a np.memmap of that file, so only the parts of
+# it in use have to be in memory.
+def lean_board(shape, filename=None):
+    if filename is None:
+        return np.zeros(shape, dtype=np.int8)
+    return np.memmap(filename, dtype=np.int8, mode="w+", shape=shape)
+
+# Solver for boards too large for the Tiles and Lines of a Solver. The only state kept per tile is the board, and the only
+# state kept per ClueRun is its length and the bounds of its starts, each in one flat array over every line, rows first
+# and then columns. Each line is solved exactly by line_placements from those and its tiles, with nothing kept after.
+# Line logic only: there is no search, display, event log or change_clue.
+class LeanSolver:
+    def __init__(self, puzzle_name, puzzle_raw, row_and_col_clues_raw, time_limit=None, max_passes=None, max_operations=None, budget=None):
+        """
+        :param puzzle_raw: Board to solve in place, such as one made by lean_board. Any integer dtype works, but int8
+            keeps it to a byte per tile.
+        :param row_and_col_clues_raw: Clues as returned by picross_import. They're copied to flat arrays, so the lists
+            can be dropped once the LeanSolver is made.
+        """
+        self.puzzle_name = puzzle_name
+        self.puzzle_raw = puzzle_raw
+        self.stats = SolveStats()
+        self.pass_count = 0
+        self.budget = budget if budget is not None else SolveBudget(time_limit, max_passes, max_operations)
+
+        # Line n's ClueRuns are n_start to n_end of the flat arrays, for n_start, n_end = clue_offsets[n:n + 2]. An
+        # empty line's clue is written as [0], but it has no ClueRuns. Lengths and starts are stored in the smallest
+        # type that holds a line's tile indices.
+        row_count, col_count = puzzle_raw.shape
+        index_type = np.int16 if max(row_count, col_count) < 1 << 15 else np.int32
+        self.line_sizes = np.repeat(np.array([col_count, row_count]), [row_count, col_count])
+        clue_counts = np.fromiter((sum(1 for run_length in clue_run_lengths if run_length)
+                                   for axis_clues_raw in row_and_col_clues_raw for clue_run_lengths in axis_clues_raw),
+                                  dtype=np.int64, count=row_count + col_count)
+        self.clue_offsets = np.concatenate([[0], np.cumsum(clue_counts)])
+        self.clue_lengths = np.fromiter((run_length for axis_clues_raw in row_and_col_clues_raw for clue_run_lengths in axis_clues_raw
+                                         for run_length in clue_run_lengths if run_length),
+                                        dtype=index_type, count=self.clue_offsets[-1])
+
+        # Every ClueRun starts out between its left-most placement, with every run packed to the left, and its
+        # right-most, with every run shifted by the line's slack. The packed starts are a running sum over every line,
+        # less the sum at the line's first ClueRun. The sum may wrap around, but the difference is still right, and
+        # it's computed in place so that no array larger than the final ones is made.
+        self.first_starts = np.cumsum(self.clue_lengths + 1, dtype=index_type)
+        self.first_starts -= self.clue_lengths + 1
+        clue_lines = np.flatnonzero(clue_counts)
+        self.first_starts -= np.repeat(self.first_starts[self.clue_offsets[clue_lines]], clue_counts[clue_lines])
+        last_clue_runs = self.clue_offsets[clue_lines + 1] - 1
+        slack = self.line_sizes[clue_lines] - self.first_starts[last_clue_runs] - self.clue_lengths[last_clue_runs]
+        # A line too short for its clue is left with no starts
+        self.last_starts = self.first_starts + np.repeat(slack.astype(index_type), clue_counts[clue_lines])
+
+    # Raises Contradiction if result is False
+    def assert_puzzle(self, result, message):
+        if not result:
+            raise Contradiction(f"{self.puzzle_name} assert: {message}")
+
+    # The axis and index of line n, with rows numbered first
+    def line_location(self, line_number):
+        row_count = self.puzzle_raw.shape[Axis.ROWS]
+        return (Axis.ROWS, line_number) if line_number < row_count else (Axis.COLS, line_number - row_count)
+
+    def line_number(self, axis, line_index):
+        return line_index if axis == Axis.ROWS else self.puzzle_raw.shape[Axis.ROWS] + line_index
+
+    def is_complete(self):
+        return not (self.puzzle_raw == State.UNKNOWN).any()
+
+    # True if every line is complete and matches its clue
+    def verify(self):
+        for line_number in range(len(self.line_sizes)):
+            axis, line_index = self.line_location(line_number)
+            line_raw = np.asarray(puzzle_and_transpose(self.puzzle_raw)[axis][line_index])
+            clue_start, clue_end = self.clue_offsets[line_number:line_number + 2]
+            if (line_raw == State.UNKNOWN).any() or line_placements(self.clue_lengths[clue_start:clue_end].tolist(),
+                    bools_to_mask(line_raw == State.FILLED), bools_to_mask(line_raw == State.CROSSED), len(line_raw)) is None:
+                return False
+        return True
+
+    def solve(self):
+        """
+        Solve as far as line logic can go, or until the budget runs out or the solve is cancelled.
+
+        :return: SolveResult of this solve. Raises Contradiction if the clues can't be satisfied.
+        """
+        self.budget.start()
+        try:
+            with self.stats.phase("propagate"):
+                self.propagate()
+        except BudgetExceeded as e:
+            return SolveResult(self.puzzle_raw, e.stop_reason, self.stats)
+        return SolveResult(self.puzzle_raw, StopReason.COMPLETE if self.is_complete() else StopReason.STALLED, self.stats)
+
+    def cancel(self):
+        self.budget.cancel()
+
+    # Solve every row that needs it, then every column, until no line has new tiles to work with
+    def propagate(self):
+        row_count = self.puzzle_raw.shape[Axis.ROWS]
+        lines_to_solve = np.ones(len(self.line_sizes), dtype=bool)
+        axis_lines = [slice(0, row_count), slice(row_count, None)]
+        axis = Axis.ROWS
+        while lines_to_solve.any():
+            if axis == Axis.ROWS:
+                self.budget.count_passes()
+                self.pass_count += 1
+                self.stats.passes += 1
+            for line_index in np.flatnonzero(lines_to_solve[axis_lines[axis]]).tolist():
+                lines_to_solve[self.line_number(axis, line_index)] = False
+                self.solve_line(axis, line_index, lines_to_solve)
+            axis = Axis.COLS if axis == Axis.ROWS else Axis.ROWS
+
+    # Solve a line and write the tiles it deduces to the board, marking the perpendicular lines they're on to be solved
+    def solve_line(self, axis, line_index, lines_to_solve):
+        self.budget.count_operation()
+        self.stats.line_solves += 1
+
+        line_number = self.line_number(axis, line_index)
+        clue_start, clue_end = self.clue_offsets[line_number:line_number + 2]
+        line_raw = puzzle_and_transpose(self.puzzle_raw)[axis][line_index]
+        size = len(line_raw)
+        line_values = np.asarray(line_raw)
+        placements = line_placements(self.clue_lengths[clue_start:clue_end].tolist(), bools_to_mask(line_values == State.FILLED),
+                                     bools_to_mask(line_values == State.CROSSED), size,
+                                     self.first_starts[clue_start:clue_end].tolist(), self.last_starts[clue_start:clue_end].tolist())
+        self.assert_puzzle(placements is not None, f"Line {line_name(axis, line_index)} can't satisfy its clues")
+
+        starts, fills, crosses = placements
+        self.first_starts[clue_start:clue_end] = [lowest_bit(run_starts) for run_starts in starts]
+        self.last_starts[clue_start:clue_end] = [highest_bit(run_starts) for run_starts in starts]
+        if fills:
+            line_raw[mask_to_bools(fills, size)] = State.FILLED
+        if crosses:
+            line_raw[mask_to_bools(crosses, size)] = State.CROSSED
+        if fills | crosses:
+            perpendicular_axis = Axis.COLS if axis == Axis.ROWS else Axis.ROWS
+            lines_to_solve[self.line_number(perpendicular_axis, 0) + np.flatnonzero(mask_to_bools(fills | crosses, size))] = True
@@ -1,16 +1,24 @@
+from bisect import bisect_left, bisect_right
 from functools import partial
-from line_profiler_pycharm import profile
 
 from helpers import *
+from BitLine import BitLine
 from ClueRun import ClueRun
+from picross_placements import line_placements
+
+# Fewest ClueRuns of a line for which clue_index_range searches for the ClueRuns that can reach a range
+BISECT_MIN_CLUE_RUNS = 6
 
 class Line:
+    __slots__ = ("solver", "axis", "line_index", "clue_run_lengths", "puzzle_line", "line_raw", "clue_runs", "filled_runs")
+
     def __init__(self, solver, axis, line_index, clue_run_lengths, puzzle_line):
         self.solver = solver
         self.axis = axis
         self.line_index = line_index
         self.clue_run_lengths = clue_run_lengths
-        self.puzzle_line = puzzle_line
+        self.puzzle_line = list(puzzle_line) # Indexing a list is cheaper than indexing an object array
+        self.line_raw = puzzle_and_transpose(solver.puzzle_raw)[axis][line_index]
         self.clue_runs = []
         self.filled_runs = []
 
@@ -24,11 +32,16 @@ class Line:
             run_start += run_length + 1
 
     def verify(self):
+        if len(self.filled_runs) != len(self.clue_run_lengths):
+            return False
         for (start, end), length in zip(self.filled_runs, self.clue_run_lengths):
             if end - start != length:
                 return False
         return True
 
+    def placement_count(self):
+        return sum(clue_run.placement_count() for clue_run in self.clue_runs)
+
     def set_state(self, state, start, end):
         dirty_flags = DirtyFlag.NONE
 
@@ -40,12 +53,80 @@ class Line:
 
         return dirty_flags
 
+    # Fill or cross every tile of the given mask
+    def set_bits(self, state, bits):
+        dirty_flags = DirtyFlag.NONE
+        for start, end in bit_runs(bits):
+            dirty_flags |= self.set_state(state, start, end)
+        return dirty_flags
+
     def fill(self, start, end):
         return self.set_state(State.FILLED, start, end)
 
     def cross(self, index):
         return self.set_state(State.CROSSED, index, index + 1)
 
+    # ClueRuns whose potential runs could start at or before start and end at or after end, as a range of clue indices.
+    # first_start() and last_end() only grow with the clue index, so the range is found by binary search. On a line of
+    # few ClueRuns, the search costs more than checking every one of them, so they're all returned instead.
+    def clue_index_range(self, start, end):
+        if len(self.clue_runs) < BISECT_MIN_CLUE_RUNS:
+            return range(len(self.clue_runs))
+        first_clue_index = bisect_left(self.clue_runs, end, key=ClueRun.last_end)
+        last_clue_index = bisect_right(self.clue_runs, start, lo=first_clue_index, key=ClueRun.first_start)
+        return range(first_clue_index, last_clue_index)
+
+    # Bring a new Line up to date with the tiles already known, such as after its clue changed. The potential runs the
+    # tiles block are removed all at once by a BitLine of the same tiles, rather than one tile at a time.
+    def load_tiles(self):
+        line_raw = np.array(self.solver.puzzle_raw[line_tiles(self.axis, self.line_index, 0, None)])
+        bit_line = BitLine(None, self.axis, self.line_index, [clue_run.length for clue_run in self.clue_runs], line_raw)
+        bit_line.remove_blocked_starts()
+        for clue_run, bit_clue_run in zip(self.clue_runs, bit_line.clue_runs):
+            clue_run.set_starts(bit_clue_run.starts)
+
+        for start, end in bit_runs(bit_line.filled):
+            self.add_filled_run(start, end)
+        return self.cross_uncovered(0, len(self.puzzle_line))
+
+    # Remove the potential runs that would end just before or start just after a filled tile
+    def remove_adjacent_starts(self, i):
+        dirty_flags = DirtyFlag.NONE
+        for clue_index in self.clue_index_range(i + 1, i):
+            clue_run = self.clue_runs[clue_index]
+            dirty_flags |= clue_run.remove_start(i + 1)
+            dirty_flags |= clue_run.remove_start(i - clue_run.length)
+        return dirty_flags
+
+    # Remove the potential runs that would cover a crossed tile
+    def remove_covering_starts(self, i):
+        dirty_flags = DirtyFlag.NONE
+        for clue_index in self.clue_index_range(i, i + 1):
+            clue_run = self.clue_runs[clue_index]
+            dirty_flags |= clue_run.remove_starts(i - clue_run.length + 1, i)
+        return dirty_flags
+
+    # Cross every tile from start to end that no potential run can cover anymore. What each ClueRun can reach is taken
+    # once for the whole range: crossing tiles only takes potential runs away, and any tile that's left uncovered by
+    # that is crossed by the removal that uncovered it.
+    def cross_uncovered(self, start, end):
+        start = max(start, 0)
+        end = min(end, len(self.puzzle_line))
+        if start >= end:
+            return DirtyFlag.NONE
+
+        # (first tile, last tile + 1, ClueRun if its excluded starts can leave gaps between them)
+        reaches = [(clue_run.min_start, clue_run.max_start + clue_run.length, clue_run if clue_run.excluded_starts else None)
+                   for clue_run in (self.clue_runs[clue_index] for clue_index in self.clue_index_range(end - 1, start + 1))]
+        dirty_flags = DirtyFlag.NONE
+        for i in range(start, end):
+            for first_tile, end_tile, gapped_clue_run in reaches:
+                if first_tile <= i < end_tile and (gapped_clue_run is None or gapped_clue_run.can_contain(i)):
+                    break
+            else:
+                dirty_flags |= self.solver.with_rule(Rule.UNCOVERED, self.cross, i)
+        return dirty_flags
+
     def add_filled_run(self, start, end=None):
         if end is None:
             end = start + 1
@@ -73,15 +154,33 @@ class Line:
         if connected_or_added_index is None:
             self.filled_runs.append((start, end))
 
+    # Solve the line exactly, from every placement of the ClueRuns that fits the known tiles, instead of by the Rules of
+    # solve_line. The potential runs no placement uses are removed too, so the ClueRuns stay as exact as the tiles.
+    def solve_placements(self):
+        line_raw = np.asarray(self.line_raw)
+        placements = line_placements(self.clue_run_lengths, bools_to_mask(line_raw == State.FILLED), bools_to_mask(line_raw == State.CROSSED), len(self.puzzle_line))
+        self.solver.assert_puzzle(placements is not None, f"Line {line_name(self.axis, self.line_index)} can't satisfy its clues")
+
+        starts, fills, crosses = placements
+        dirty_flags = self.solver.display_changes(lambda: self.set_bits(State.FILLED, fills) | self.set_bits(State.CROSSED, crosses),
+                                                  Rule.PLACEMENTS, Step.DEDUCTION, self)
+        for clue_run, run_starts in zip(self.clue_runs, starts):
+            dirty_flags |= self.solver.display_changes(partial(clue_run.keep_starts, run_starts), Rule.PLACEMENTS, Step.DEDUCTION, self, clue_run.clue_index)
+        return dirty_flags
+
     def solve_line(self):
+        # No potential run covers any tile of an empty line
+        if not self.clue_runs:
+            return self.solver.display_changes(partial(self.cross_uncovered, 0, len(self.puzzle_line)), Rule.UNCOVERED, Step.DEDUCTION, self)
+
         dirty_flags = DirtyFlag.NONE
 
         # Apply all ClueRuns
         for clue_run in self.clue_runs:
-            dirty_flags |= self.solver.display_changes(clue_run.apply, lambda: f"Apply {clue_run}")
+            dirty_flags |= self.solver.display_changes(clue_run.apply, Rule.OVERLAP, Step.DEDUCTION, self, clue_run.clue_index)
 
         trimmed_start = [False] * len(self.clue_runs)
-        ends_to_trim = [-1] * len(self.clue_runs)
+        runs_to_trim = [None] * len(self.clue_runs)
 
         # Iterate filled runs
         for start, end in self.filled_runs[:]:
@@ -93,51 +192,56 @@ class Line:
             first_end = len(self.puzzle_line)
             last_end = 0
 
-            # Iterate all potential runs containing the filled run, from all ClueRuns
-            for clue_run in self.clue_runs:
-                for potential_run in clue_run.potential_runs:
-                    if potential_run.start > start or potential_run.end < end:
-                        continue
+            # Find the first and last potential runs containing the filled run, from the ClueRuns that could reach it
+            for clue_index in self.clue_index_range(start, end):
+                clue_run = self.clue_runs[clue_index]
+                containing_starts = clue_run.containing_starts(start, end)
+                if containing_starts is None:
+                    continue
+
+                if first_containing_clue_run is None:
+                    first_containing_clue_run = clue_run
+                last_containing_clue_run = clue_run
 
-                    if first_containing_clue_run is None:
-                        first_containing_clue_run = clue_run
-                    last_containing_clue_run = clue_run
+                first_containing_start, last_containing_start = containing_starts
+                first_start = min(first_start, first_containing_start)
+                last_start = max(last_start, last_containing_start)
+                first_end = min(first_end, first_containing_start + clue_run.length)
+                last_end = max(last_end, last_containing_start + clue_run.length)
 
-                    first_start = min(first_start, potential_run.start)
-                    last_start = max(last_start, potential_run.start)
-                    first_end = min(first_end, potential_run.end)
-                    last_end = max(last_end, potential_run.end)
+            if first_containing_clue_run is None:
+                self.solver.assert_puzzle(False, f"No ClueRun can contain {run_name(self.axis, self.line_index, start, end)}")
 
             new_start = last_start if last_start < start else end
             new_end = first_end if first_end > end else start
 
             if new_start < new_end:
                 # Fill guaranteed run
-                dirty_flags |= self.solver.display_changes(partial(self.fill, new_start, new_end),
-                        lambda: f"Fill guaranteed run {run_name(self.axis, self.line_index, new_start, new_end)}")
+                dirty_flags |= self.solver.display_changes(partial(self.fill, new_start, new_end), Rule.GUARANTEED_RUN,
+                        Step.DEDUCTION, self, start=new_start, end=new_end)
 
             if last_start < start and last_start == first_start and first_start > 0:
-                dirty_flags |= self.solver.display_changes(partial(self.cross, first_start - 1),
-                        lambda: f"Cross before guaranteed start {tile_name(self.axis, self.line_index, first_start - 1)}")
+                dirty_flags |= self.solver.display_changes(partial(self.cross, first_start - 1), Rule.CROSS_BEFORE,
+                        Step.DEDUCTION, self, start=first_start - 1, end=first_start)
 
             if first_end > end and first_end == last_end and last_end < len(self.puzzle_line):
-                dirty_flags |= self.solver.display_changes(partial(self.cross, last_end),
-                        lambda: f"Cross after guaranteed end {tile_name(self.axis, self.line_index, last_end)}")
+                dirty_flags |= self.solver.display_changes(partial(self.cross, last_end), Rule.CROSS_AFTER,
+                        Step.DEDUCTION, self, start=last_end, end=last_end + 1)
 
             # The first clue run that can contain this run must not start after the run does.
             if not trimmed_start[first_containing_clue_run.clue_index]:
-                dirty_flags |= self.solver.display_changes(partial(first_containing_clue_run.remove_starts_after, start),
-                        lambda: f"{first_containing_clue_run} first to contain {run_name(self.axis, self.line_index, start, end)} so last_start={start}")
+                dirty_flags |= self.solver.display_changes(partial(first_containing_clue_run.remove_starts_after, start), Rule.TRIM_START,
+                        Step.DEDUCTION, self, first_containing_clue_run.clue_index, start, end)
                 trimmed_start[first_containing_clue_run.clue_index] = True
 
             # The last clue run that can contain this run must not end before the run does. (mark it for now)
-            ends_to_trim[last_containing_clue_run.clue_index] = end
+            runs_to_trim[last_containing_clue_run.clue_index] = (start, end)
 
         # Trim any marked ClueRun to the end of the last filled run for which it was the last ClueRun to contain.
         for clue_index, clue_run in enumerate(self.clue_runs):
-            if ends_to_trim[clue_index] != -1:
-                end = ends_to_trim[clue_index]
-                dirty_flags |= self.solver.display_changes(partial(clue_run.remove_ends_before, end),
-                        lambda: f"{clue_run} last to contain {run_name(self.axis, self.line_index, start, end)} so first_end={end}")
+            if runs_to_trim[clue_index] is not None:
+                start, end = runs_to_trim[clue_index]
+                dirty_flags |= self.solver.display_changes(partial(clue_run.remove_ends_before, end), Rule.TRIM_END,
+                        Step.DEDUCTION, self, clue_index, start, end)
 
         return dirty_flags
\ No newline at end of file
@@ -0,0 +1,57 @@
+from collections import OrderedDict
+
+from BitLine import solve_line_cells
+from helpers import *
+
+# Bounded LRU cache of line deductions. A line's deductions only depend on its clues and its current tiles, so one
+# cache can be shared by every line of a puzzle, and by every Solver in a batch.
+class LineCache:
+    def __init__(self, max_size=100_000):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __str__(self):
+        return f"LineCache(size={len(self)}/{self.max_size}, hits={self.hits}, misses={self.misses}, hit_rate={self.hit_rate():.1%}, evictions={self.evictions})"
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {
+            "size": len(self),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate(),
+            "evictions": self.evictions,
+        }
+
+    # Returns the (fills, crosses) masks of the tiles that the line's clues determine, or None for a contradiction
+    def solve(self, clue_run_lengths, line_raw):
+        key = (tuple(clue_run_lengths), line_raw.tobytes())
+
+        result = self.entries.get(key, False)
+        if result is not False:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return result
+
+        self.misses += 1
+        try:
+            result = solve_line_cells(clue_run_lengths, line_raw)
+        except Contradiction:
+            result = None
+
+        self.entries[key] = result
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+        return result
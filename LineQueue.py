@@ -0,0 +1,45 @@
+# Lines waiting to be solved, grouped into rounds. A line queued while it's already waiting in the current round is
+# left where it is; a line queued after it was visited this round waits for the next one.
+class LineQueue:
+    def __init__(self, prioritize=False):
+        self.prioritize = prioritize
+        self.current_round = []
+        self.in_current_round = set()
+        self.next_round = {} # Used as an ordered set
+        self.new_cells = {} # Tiles changed in each queued line since it was last solved
+        self.round_count = 0
+
+    def __len__(self):
+        return len(self.in_current_round) + len(self.next_round)
+
+    def push(self, line_object, new_cells=0):
+        if new_cells:
+            self.new_cells[line_object] = self.new_cells.get(line_object, 0) + new_cells
+
+        if line_object not in self.in_current_round:
+            self.next_round[line_object] = None
+
+    def pop(self):
+        if not self.in_current_round:
+            if not self.next_round:
+                return None
+            self.start_round()
+
+        line_object = self.current_round.pop()
+        self.in_current_round.remove(line_object)
+        self.new_cells.pop(line_object, None)
+        return line_object
+
+    def start_round(self):
+        self.current_round = list(self.next_round)
+        if self.prioritize:
+            self.current_round.sort(key=self.priority)
+        self.current_round.reverse() # pop() takes from the end
+        self.in_current_round = set(self.next_round)
+        self.next_round = {}
+        self.round_count += 1
+
+    # Lower is solved sooner. Lines with few placements left, or that gained many tiles since they were last solved,
+    # are the most likely to yield new tiles.
+    def priority(self, line_object):
+        return line_object.placement_count() / (1 + self.new_cells.get(line_object, 0))
@@ -0,0 +1,279 @@
+import colorsys
+import random
+
+import numpy as np
+from matplotlib import pyplot as plt
+from matplotlib.collections import LineCollection
+from matplotlib.widgets import Button
+
+from helpers import *
+
+CROSS_RADIUS = 0.35
+
+# A window showing a Solver's board and ClueRuns, which is built once and then updated in place. Only the crosses
+# and ClueRun overlays that changed since the last update are recomputed, and each kind of mark is drawn as a single
+# path of a LineCollection, rather than a plot per mark. The grid, clues and buttons are drawn once and kept as a background
+# image, so each update only draws the board and the marks over it.
+class PicrossRenderer:
+    def __init__(self, solver, btn_solve_callback=None):
+        self.solver = solver
+        self.closed = False
+        self.waiting = False
+        self.background = None
+        self.full_redraw = True # Whether the background has to be drawn again from scratch
+        self.changed_texts = [] # Clues to draw over the background before the next update
+
+        num_rows, num_cols = solver.puzzle_raw.shape
+
+        plt.ioff()
+        self.fig, self.ax = plt.subplots(figsize=(6, 6))
+        self.fig.set_facecolor('black')
+        self.fig.canvas.mpl_connect('close_event', self.on_close)
+        self.fig.canvas.mpl_connect('draw_event', self.on_draw)
+
+        # Display the puzzle as an image, using a custom color map
+        cmap = plt.cm.colors.ListedColormap(['grey', 'grey', 'black'])
+        norm = plt.cm.colors.BoundaryNorm([-2, -0.5, 0.5, 2], cmap.N)
+        self.image = self.ax.imshow(np.array(solver.puzzle_raw), cmap=cmap, norm=norm, interpolation='nearest')
+
+        # Draw grid lines
+        self.ax.set_xticks(np.arange(-.5, num_cols, 1))
+        self.ax.set_yticks(np.arange(-.5, num_rows, 1))
+        self.ax.grid(color='#444', linestyle='-', linewidth=2)
+        self.ax.set_axisbelow(True)
+
+        # Clues of each line, each ClueRun in its own color, added once the lines exist. Lines are kept by their axis and
+        # index, as a Line is replaced when its clue changes.
+        self.shown_lines = {}
+        self.colors = {}
+        self.clue_texts = {}
+
+        # Crosses, and the solid and dashed lines and arrows of the ClueRun overlays
+        self.crosses = self.ax.add_collection(LineCollection([], colors='black'))
+        self.solid_lines = self.ax.add_collection(LineCollection([], linewidths=2))
+        self.dashed_lines = self.ax.add_collection(LineCollection([], linewidths=1, linestyles='dashed'))
+        self.marks = self.ax.add_collection(LineCollection([]))
+
+        # Drawn over the background on every update
+        self.dynamic_artists = [self.image, self.crosses, self.solid_lines, self.dashed_lines, self.marks]
+        for artist in self.dynamic_artists:
+            artist.set_animated(True)
+
+        self.crossed = np.zeros(solver.puzzle_raw.shape, dtype=bool)
+        self.cross_path = np.empty((0, 2))
+
+        # Overlay marks of each ClueRun, and the placements they were computed for
+        self.overlay_keys = {}
+        self.overlays = {}
+
+        # Hide the x and y axis labels and ticks, and make room for the clues
+        self.ax.set_xticklabels([])
+        self.ax.set_yticklabels([])
+        self.ax.tick_params(which='both', bottom=False, left=False)
+        self.fig.tight_layout()
+
+        # Continue the solve until the next change
+        ax_next = self.fig.add_axes([0.85, 0.05, 0.1, 0.075])
+        self.btn_next = Button(ax_next, 'Next')
+        self.btn_next.on_clicked(lambda event: self.stop_waiting())
+
+        # Add button which will attempt to solve the puzzle. Can be used to do additional passes for debugging.
+        self.btn_solve = None
+        if btn_solve_callback is not None:
+            ax_solve = self.fig.add_axes([0.05, 0.05, 0.1, 0.075])
+            self.btn_solve = Button(ax_solve, 'Solve')
+            self.btn_solve.on_clicked(lambda event: btn_solve_callback())
+
+        self.fig.show()
+
+    # Show the clues of a line, replacing those of the line it replaced, if any
+    def add_line_clues(self, line_object):
+        old_line_object = self.shown_lines.get((line_object.axis, line_object.line_index))
+        if old_line_object is not None:
+            for clue_run in old_line_object.clue_runs:
+                self.clue_texts.pop(clue_run).remove()
+                del self.colors[clue_run]
+                self.overlay_keys.pop(clue_run, None)
+                self.overlays.pop(clue_run, None)
+        self.shown_lines[(line_object.axis, line_object.line_index)] = line_object
+
+        first_hue = random.random()
+        for j, clue_run in enumerate(reversed(line_object.clue_runs)):
+            hue = (first_hue + j / len(line_object.clue_runs)) % 1
+            self.colors[clue_run] = (colorsys.hls_to_rgb(hue, .5, 1), colorsys.hls_to_rgb(hue, .5, 0))
+            x, y = (-1 - j / 2, line_object.line_index) if line_object.axis == Axis.ROWS else (line_object.line_index, -1 - j / 2)
+            self.full_redraw = True
+            # The box behind the clue covers its old color when it's drawn again in a new one
+            self.clue_texts[clue_run] = self.ax.text(x, y, str(clue_run.length), ha='center', va='center', fontsize=16,
+                                                     color=self.clue_run_color(clue_run),
+                                                     bbox=dict(facecolor='black', edgecolor='none', pad=0))
+
+    def clue_run_color(self, clue_run):
+        return self.colors[clue_run][1 if clue_run.is_fixed() else 0]
+
+    def update(self, title=None, block=True):
+        """
+        Bring the window up to date with the Solver.
+
+        :param block: If True, wait until Next is clicked or the window is closed
+        """
+        if self.closed:
+            return
+
+        if title is None:
+            title = self.solver.puzzle_name
+        if self.fig.canvas.manager is not None:
+            self.fig.canvas.manager.set_window_title(title)
+
+        puzzle_raw = self.solver.puzzle_raw
+        self.image.set_data(puzzle_raw)
+        self.update_crosses(puzzle_raw == State.CROSSED)
+        self.update_overlays()
+
+        canvas = self.fig.canvas
+        if self.full_redraw or self.background is None:
+            self.full_redraw = False
+            self.changed_texts = []
+            canvas.draw()
+        else:
+            canvas.restore_region(self.background)
+            if self.changed_texts:
+                for text in self.changed_texts:
+                    self.ax.draw_artist(text)
+                self.changed_texts = []
+                self.background = canvas.copy_from_bbox(self.fig.bbox)
+            self.draw_dynamic_artists()
+        canvas.blit(self.fig.bbox)
+
+        if block:
+            self.waiting = True
+            canvas.start_event_loop(timeout=0)
+        else:
+            canvas.flush_events()
+
+    def draw_dynamic_artists(self):
+        for artist in self.dynamic_artists:
+            self.ax.draw_artist(artist)
+
+    # After every full draw, such as when the window is resized, keep the background and draw the board over it
+    def on_draw(self, event):
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self.draw_dynamic_artists()
+
+    def update_crosses(self, crossed):
+        new_crossed = crossed & ~self.crossed
+        if not new_crossed.any() and (crossed == self.crossed).all():
+            return
+
+        # Tiles are only ever crossed during a solve, so the new crosses are appended. Anything else is redrawn.
+        if (crossed | ~self.crossed).all():
+            self.cross_path = np.concatenate([self.cross_path, cross_path(new_crossed)])
+        else:
+            self.cross_path = cross_path(crossed)
+        self.crossed = crossed
+        self.crosses.set_segments([self.cross_path])
+
+    def update_overlays(self):
+        changed = False
+        for line_object in self.solver.get_all_line_objects():
+            if self.shown_lines.get((line_object.axis, line_object.line_index)) is not line_object:
+                self.add_line_clues(line_object)
+                changed = True
+
+            for clue_run in line_object.clue_runs:
+                # Potential runs are only ever removed, so their count identifies them
+                key = (clue_run.first_start(), clue_run.last_start(), clue_run.placement_count())
+                if self.overlay_keys.get(clue_run) == key:
+                    continue
+
+                self.overlay_keys[clue_run] = key
+                self.overlays[clue_run] = clue_run_overlay(clue_run, line_object.line_index, len(line_object.clue_runs), line_object.axis)
+                changed = True
+
+                # The clue is part of the background, so it's only drawn again when its color changes
+                color = self.clue_run_color(clue_run)
+                if self.clue_texts[clue_run].get_color() != color:
+                    self.clue_texts[clue_run].set_color(color)
+                    self.changed_texts.append(self.clue_texts[clue_run])
+
+        if not changed:
+            return
+
+        # One path per ClueRun in each collection
+        for collection, overlay_index in [(self.solid_lines, 0), (self.dashed_lines, 1), (self.marks, 2)]:
+            paths = []
+            colors = []
+            for clue_run, overlay in self.overlays.items():
+                if len(overlay[overlay_index]):
+                    paths.append(overlay[overlay_index])
+                    colors.append(self.clue_run_color(clue_run))
+            collection.set_segments(paths)
+            collection.set_color(colors)
+
+    def stop_waiting(self):
+        if self.waiting:
+            self.waiting = False
+            self.fig.canvas.stop_event_loop()
+
+    # Closing the window lets the solve carry on without displaying any more steps
+    def on_close(self, event):
+        self.closed = True
+        self.stop_waiting()
+
+    def close(self):
+        plt.close(self.fig)
+
+# Joins lines of (x, y) points into one path, broken by NaN points. Each path is drawn as a whole, which is much
+# faster than drawing its lines separately.
+def join_lines(lines):
+    if not lines:
+        return np.empty((0, 2))
+    return np.concatenate([np.append(line, [[np.nan, np.nan]], axis=0) for line in lines])
+
+# Path of the two diagonal lines of each crossed tile
+def cross_path(crossed):
+    rows, cols = np.nonzero(crossed)
+    rows = rows[:, np.newaxis].astype(float)
+    cols = cols[:, np.newaxis].astype(float)
+    gaps = np.full_like(rows, np.nan)
+    xs = np.hstack([cols - CROSS_RADIUS, cols + CROSS_RADIUS, gaps, cols - CROSS_RADIUS, cols + CROSS_RADIUS, gaps])
+    ys = np.hstack([rows - CROSS_RADIUS, rows + CROSS_RADIUS, gaps, rows + CROSS_RADIUS, rows - CROSS_RADIUS, gaps])
+    return np.stack([xs.ravel(), ys.ravel()], axis=-1)
+
+# Paths of the ClueRun's overlay, as (solid lines, dashed lines, arrows and marks), in (x, y) board coordinates
+def clue_run_overlay(clue_run, line_index, num_runs, axis):
+    solid_lines = []
+    dashed_lines = []
+    marks = []
+    if clue_run.is_fixed():
+        return join_lines(solid_lines), join_lines(dashed_lines), join_lines(marks)
+
+    # Offset each run's line so that overlapping bounds are visible
+    offset = line_index + 0.8 * ((clue_run.clue_index + 1) / (num_runs + 1) - 0.5)
+
+    # Board coordinates of a point along the line, and across it
+    def point(along, across):
+        return (along, across) if axis == Axis.ROWS else (across, along)
+
+    # The main line along the entire length of the bounds, dashed in the unknown sections
+    for i in range(clue_run.first_start(), clue_run.last_end()):
+        if not clue_run.can_contain(i):
+            continue
+
+        line_start = i - 0.3 if not clue_run.can_contain(i - 1) or clue_run.length == 1 else i - 0.5
+        line_end = i + 0.3 if not clue_run.can_contain(i + 1) or clue_run.length == 1 else i + 0.5
+        lines = solid_lines if clue_run.must_contain(i) else dashed_lines
+        lines.append([point(line_start, offset), point(line_end, offset)])
+
+    # Small arrows to indicate each potential start and end
+    for potential_run in clue_run.potential_runs:
+        start = potential_run.start - 0.4
+        end = (potential_run.end - 1) + 0.4
+        marks.append([point(start, offset - 0.1), point(start + 0.1, offset), point(start, offset + 0.1)])
+        marks.append([point(end, offset - 0.1), point(end - 0.1, offset), point(end, offset + 0.1)])
+
+    # Fill in the last start and first end arrows a little, to help indicate where the center known section is
+    for along in [clue_run.last_start() - 0.4, (clue_run.first_end() - 1) + 0.4]:
+        marks.append([point(along, offset - 0.1), point(along, offset + 0.1)])
+
+    return join_lines(solid_lines), join_lines(dashed_lines), join_lines(marks)
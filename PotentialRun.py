@@ -1,10 +1,9 @@
 from helpers import *
-from line_profiler_pycharm import profile
 
 class PotentialRun:
-    def __init__(self, clue_run, start):
-        super().__init__()
+    __slots__ = ("clue_run", "start", "end")
 
+    def __init__(self, clue_run, start):
         self.clue_run = clue_run
         self.start = start
         self.end = start + clue_run.length
@@ -15,26 +14,6 @@ class PotentialRun:
     def tiles(self):
         return self.clue_run.line_object.puzzle_line[self.start:self.end]
 
-    def tile_before(self):
-        return self.clue_run.line_object.puzzle_line[self.start - 1] if self.start - 1 >= 0 else None
-
-    def tile_after(self):
-        return self.clue_run.line_object.puzzle_line[self.end] if self.end < len(self.clue_run.line_object.puzzle_line) else None
-
-    def remove_from_tiles(self):
-        for tile in self.tiles():
-            tile.remove_run(self)
-
-        dirty_flags = DirtyFlag.NONE
-
-        for tile in self.tiles():
-            for axis_runs in tile.potential_runs:
-                if not axis_runs:
-                    dirty_flags |= tile.cross()
-                    break
-
-        return dirty_flags
-
     # True if the given run of tiles is entirely contained within this one.
     def contains(self, run_start, run_end):
         return self.start <= run_start and run_end <= self.end
@@ -0,0 +1,105 @@
+import mmap
+import struct
+
+import numpy as np
+
+from picross_import import PuzzleRecord
+
+# Binary corpus layout. Every section is a flat little-endian array, so any puzzle is found from the offsets alone:
+#   header      CORPUS_HEADER, then the byte offset of each section in CORPUS_SECTIONS order
+#   clues       uint16 run lengths of every line of every puzzle, one after another
+#   line_starts int64, index into clues of each line's first run, plus the end of the last line
+#   puzzle_starts int64, index into line_starts of each puzzle's first row, plus the end of the last puzzle
+#   row_counts  int32, number of rows of each puzzle. The rest of its lines are columns.
+#   line_numbers int64, line of the source file each puzzle came from
+#   title_starts int64, byte index into titles of each puzzle's title, plus the end of the last title
+#   titles      utf-8 titles, one after another
+CORPUS_MAGIC = b"PICROSS\0"
+CORPUS_VERSION = 1
+CORPUS_HEADER = struct.Struct("<8sIIQQQ") # magic, version, reserved, puzzle count, line count, clue count
+CORPUS_SECTIONS = [
+    ("clues", np.uint16),
+    ("line_starts", np.int64),
+    ("puzzle_starts", np.int64),
+    ("row_counts", np.int32),
+    ("line_numbers", np.int64),
+    ("title_starts", np.int64),
+    ("titles", np.uint8),
+]
+CORPUS_SECTION_OFFSETS = struct.Struct(f"<{len(CORPUS_SECTIONS)}Q")
+
+# A compiled puzzle corpus, memory-mapped so that opening it reads nothing but the header, and reading a puzzle
+# only touches the pages holding that puzzle
+class PuzzleCorpus:
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, 'rb') as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, self.puzzle_count, line_count, clue_count = CORPUS_HEADER.unpack_from(self.data, 0)
+        if magic != CORPUS_MAGIC:
+            raise ValueError(f"{filename} is not a compiled puzzle corpus")
+        if version != CORPUS_VERSION:
+            raise ValueError(f"{filename} is version {version} of the corpus format, expected {CORPUS_VERSION}")
+
+        section_offsets = CORPUS_SECTION_OFFSETS.unpack_from(self.data, CORPUS_HEADER.size)
+        section_lengths = {
+            "clues": clue_count,
+            "line_starts": line_count + 1,
+            "puzzle_starts": self.puzzle_count + 1,
+            "row_counts": self.puzzle_count,
+            "line_numbers": self.puzzle_count,
+            "title_starts": self.puzzle_count + 1,
+        }
+        for (name, dtype), offset in zip(CORPUS_SECTIONS, section_offsets):
+            length = section_lengths.get(name, -1)
+            setattr(self, name, np.frombuffer(self.data, dtype=np.dtype(dtype).newbyteorder("<"), count=length, offset=offset))
+
+    def __len__(self):
+        return self.puzzle_count
+
+    def __getitem__(self, index):
+        return self.clues_of(index)
+
+    def __iter__(self):
+        return (self.clues_of(index) for index in range(self.puzzle_count))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        # The arrays are views of the map, so they must go before it can be closed
+        for name, _ in CORPUS_SECTIONS:
+            setattr(self, name, None)
+        self.data.close()
+
+    # Clues of one puzzle, in the nested lists returned by picross_import
+    def clues_of(self, index):
+        if not 0 <= index < self.puzzle_count:
+            raise IndexError(f"Puzzle {index} is out of range for a corpus of {self.puzzle_count} puzzles")
+
+        first_line, last_line = self.puzzle_starts[index:index + 2]
+        line_starts = self.line_starts[first_line:last_line + 1].tolist()
+        clues = self.clues[line_starts[0]:line_starts[-1]].tolist()
+        first_clue = line_starts[0]
+        lines = [clues[start - first_clue:end - first_clue] for start, end in zip(line_starts, line_starts[1:])]
+
+        row_count = int(self.row_counts[index])
+        return [lines[:row_count], lines[row_count:]]
+
+    def title_of(self, index):
+        title_start, title_end = self.title_starts[index:index + 2]
+        return self.titles[title_start:title_end].tobytes().decode("utf-8")
+
+    def record(self, index):
+        clues = self.clues_of(index)
+        return PuzzleRecord(index, int(self.line_numbers[index]), len(clues[1]), len(clues[0]), self.title_of(index), clues)
+
+    # Records of the given puzzles, or of every puzzle, read one at a time
+    def records(self, indices=None):
+        if indices is None:
+            indices = range(self.puzzle_count)
+        return (self.record(index) for index in indices)
@@ -0,0 +1,58 @@
+import time
+
+from helpers import *
+
+# Limits on one solve, shared by a Solver and the Solvers its search branches into. They're checked before every line
+# is solved, and raise BudgetExceeded once one runs out.
+class SolveBudget:
+    def __init__(self, time_limit=None, max_passes=None, max_operations=None):
+        """
+        :param time_limit: Most seconds the solve can take
+        :param max_passes: Most solving passes, counting those of search branches
+        :param max_operations: Most lines solved, counting those of search branches
+        """
+        self.time_limit = time_limit
+        self.max_passes = max_passes
+        self.max_operations = max_operations
+        self.deadline = None
+        self.passes = 0
+        self.operations = 0
+
+        # Set from any thread by cancel(), and only cleared by the solving thread as the cancel stops it, so it needs no
+        # lock. A cancel from before a solve starts stops it at its first check.
+        self.cancelled = False
+
+    def __repr__(self):
+        return f"SolveBudget(time_limit={self.time_limit}, max_passes={self.max_passes}, max_operations={self.max_operations})"
+
+    # Start counting again, as each solve gets the whole budget
+    def start(self):
+        self.deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+        self.passes = 0
+        self.operations = 0
+
+    # Stop the solve at its next operation. Safe to call from another thread, or from a task awaiting the solve.
+    def cancel(self):
+        self.cancelled = True
+
+    # Called before each line is solved
+    def count_operation(self):
+        self.operations += 1
+        if self.max_operations is not None and self.operations > self.max_operations:
+            raise BudgetExceeded(StopReason.MAX_OPERATIONS)
+        self.check()
+
+    # Stop if the solve was cancelled or ran out of time, between steps that aren't counted as operations
+    def check(self):
+        if self.cancelled:
+            # The cancel is used up by the solve it stops, so the next solve runs
+            self.cancelled = False
+            raise BudgetExceeded(StopReason.CANCELLED)
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise BudgetExceeded(StopReason.DEADLINE)
+
+    # Called before each solving pass, or each round of a LineQueue
+    def count_passes(self, count=1):
+        self.passes += count
+        if self.max_passes is not None and self.passes > self.max_passes:
+            raise BudgetExceeded(StopReason.MAX_PASSES)
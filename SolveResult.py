@@ -0,0 +1,30 @@
+from helpers import *
+
+# Returned by Solver.solve: the board as far as the solve got, why it stopped, and the SolveStats of the solve
+class SolveResult:
+    def __init__(self, board, stop_reason, stats):
+        self.board = board # The Solver's own board, which changes if it's solved again
+        self.stop_reason = stop_reason # A StopReason
+        self.stats = stats
+
+    def __repr__(self):
+        return f"SolveResult(stop_reason={self.stop_reason!r}, known={self.known_fraction():.1%}, passes={self.stats.passes}, line_solves={self.stats.line_solves})"
+
+    @property
+    def complete(self):
+        return self.stop_reason == StopReason.COMPLETE
+
+    # True if the solve stopped before line logic, or search, ran out of deductions
+    @property
+    def interrupted(self):
+        return self.stop_reason not in [StopReason.COMPLETE, StopReason.STALLED]
+
+    def known_fraction(self):
+        return (self.board != State.UNKNOWN).mean() if self.board.size else 1.0
+
+    def to_dict(self):
+        return {
+            "stop_reason": self.stop_reason,
+            "board": self.board.tolist(),
+            "stats": self.stats.to_dict(),
+        }
@@ -0,0 +1,63 @@
+import time
+from contextlib import contextmanager
+
+from helpers import *
+
+# Counters for one solve, returned by Solver.solve. Passes, line solves and phase times are always counted. Tiles and
+# removed potential runs per Rule are only counted when the Solver is created with detailed_stats=True, since they
+# are counted in the innermost loops.
+class SolveStats:
+    def __init__(self):
+        self.passes = 0
+        self.line_solves = 0
+        self.search_nodes = 0
+        self.phase_times = {} # Seconds spent in each phase of the solve
+        self.filled = [0] * Rule.COUNT # Tiles filled by each Rule
+        self.crossed = [0] * Rule.COUNT # Tiles crossed by each Rule
+        self.removed_runs = [0] * Rule.COUNT # Potential runs removed by each Rule
+
+    def __str__(self):
+        lines = [f"passes:{self.passes}, line solves:{self.line_solves}, search nodes:{self.search_nodes}"]
+        if self.phase_times:
+            lines.append(", ".join(f"{phase}:{seconds:.4f}s" for phase, seconds in self.phase_times.items()))
+        for rule in range(Rule.COUNT):
+            if self.filled[rule] or self.crossed[rule] or self.removed_runs[rule]:
+                lines.append(f"  {rule_name(rule)}: filled:{self.filled[rule]}, crossed:{self.crossed[rule]}, removed runs:{self.removed_runs[rule]}")
+        return "\n".join(lines)
+
+    @contextmanager
+    def phase(self, name):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_times[name] = self.phase_times.get(name, 0.0) + time.perf_counter() - start_time
+
+    def count_tiles(self, rule, state, count=1):
+        if state == State.FILLED:
+            self.filled[rule] += count
+        else:
+            self.crossed[rule] += count
+
+    def count_removed_runs(self, rule, count):
+        self.removed_runs[rule] += count
+
+    # Add the work done by another solve, such as a search branch. Phase times aren't added, as they overlap.
+    def merge(self, other):
+        self.passes += other.passes
+        self.line_solves += other.line_solves
+        self.search_nodes += other.search_nodes
+        for rule in range(Rule.COUNT):
+            self.filled[rule] += other.filled[rule]
+            self.crossed[rule] += other.crossed[rule]
+            self.removed_runs[rule] += other.removed_runs[rule]
+
+    def to_dict(self):
+        return {
+            "passes": self.passes,
+            "line_solves": self.line_solves,
+            "search_nodes": self.search_nodes,
+            "phase_times": dict(self.phase_times),
+            "rules": {rule_name(rule): {"filled": self.filled[rule], "crossed": self.crossed[rule], "removed_runs": self.removed_runs[rule]}
+                      for rule in range(Rule.COUNT)},
+        }
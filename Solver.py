@@ -1,38 +1,121 @@
 import copy
-from collections.abc import Callable
+from collections import deque
+from functools import partial
 
 import numpy as np
-from line_profiler_pycharm import profile
 
+from BitLine import BitLine, solve_line_cells
 from Line import Line
+from LineCache import LineCache
+from LineQueue import LineQueue
+from SolveBudget import SolveBudget
+from SolveResult import SolveResult
+from SolveStats import SolveStats
+from SolverOptions import SolverOptions
 from Tile import Tile
 from helpers import *
-from picross_display import display_picross
+from picross_overlap import initial_overlap
+from picross_placements import solve_line_placement_cells
 
 class Solver:
-    def __init__(self, puzzle_name, puzzle_raw, row_and_col_clues_raw, display_steps):
+    # Options are given as a SolverOptions, or as its keyword arguments, which change those of options if both are given
+    def __init__(self, puzzle_name, puzzle_raw, row_and_col_clues_raw, display_steps, options=None, **option_kwargs):
+        if options is None:
+            options = SolverOptions(**option_kwargs)
+        elif option_kwargs:
+            options = options.replace(**option_kwargs)
+        self.options = options
+
         self.puzzle_name = puzzle_name
         self.puzzle_raw = puzzle_raw
-        self.puzzle = self.init_tiles(puzzle_raw)
-        self.row_and_col_clues_raw = row_and_col_clues_raw
+        self.stats = SolveStats()
+        self.rule = Rule.KNOWN # The Rule of the deduction being made, that changes are counted against
+        self.blocked_queue = None # Removals of blocked potential runs waiting to run, while one is running
+
+        # The line that deduced each known tile, and the order tiles were deduced in, so that change_clue only rolls
+        # back the tiles that depend on the changed line
+        self.starting_known = puzzle_raw != State.UNKNOWN
+        self.tile_lines = np.full(puzzle_raw.shape, Deducer.GIVEN, dtype=np.int32) if options.track_dependencies else None
+        self.tile_order = np.full(puzzle_raw.shape, -1, dtype=np.int64) if options.track_dependencies else None
+        self.tile_count = 0
+
+        # After change_clue finds a contradiction, the tiles it deduced from then on, and the Lines it rebuilt, are
+        # left as they were for display, and are rolled back by the next change
+        self.unsettled_since = None
+        self.unsettled_lines = []
+        self.renderer = None # PicrossRenderer showing each step, once one is displayed
+        self.event_log = options.event_log # EventLog recording every change, until change_clue stops it
+        if self.event_log is not None:
+            self.event_log.start(puzzle_name, puzzle_raw, row_and_col_clues_raw)
+        with self.stats.phase("tiles"):
+            self.puzzle = self.init_tiles(puzzle_raw) if options.engine == Engine.OBJECTS else None
+        # An empty line's clue is written as [0], but it has no ClueRuns
+        self.row_and_col_clues_raw = [[[run_length for run_length in clue_run_lengths if run_length] for clue_run_lengths in axis_clues_raw]
+                                      for axis_clues_raw in row_and_col_clues_raw]
         self.line_objects = [[], []]
         self.display_steps = display_steps
+        self.line_queue = LineQueue(prioritize=options.schedule == Schedule.PRIORITY) if options.schedule != Schedule.SWEEP else None
+        self.line_cache = options.line_cache # A LineCache, which find_solutions may replace for its branches
+        self.pass_count = 0
+
+        self.search_enabled = options.search # Turned off by find_solutions, which follows every branch itself
+        self.search_nodes = 0
+
+        # Limits on each solve, shared with search branches, which are given the budget of the Solver they branch from
+        self.budget = options.budget if options.budget is not None else SolveBudget(options.time_limit, options.max_passes, options.max_operations)
+
+        self.bind_tile_hooks()
+
+    # The optional work Tile.set_state does for each tile it sets, bound once here rather than checked for every tile.
+    # Bound again whenever the event log or the LineQueue changes.
+    def bind_tile_hooks(self):
+        tile_hooks = []
+        if self.options.detailed_stats:
+            tile_hooks.append(self.count_tile)
+        if self.options.track_dependencies:
+            tile_hooks.append(self.record_tile)
+        if self.event_log is not None:
+            tile_hooks.append(self.log_tile)
+        if self.line_queue is not None:
+            tile_hooks.append(self.queue_tile_lines)
+        self.tile_hooks = tuple(tile_hooks)
 
+    def count_tile(self, tile, state, fill_axis):
+        self.stats.count_tiles(self.rule, state)
+
+    def record_tile(self, tile, state, fill_axis):
+        self.record_tiles((tile.row_index, tile.col_index), self.deducing_line(fill_axis, tile.line_index(fill_axis)))
+
+    def log_tile(self, tile, state, fill_axis):
+        self.event_log.tiles(self.rule, Axis.ROWS, tile.row_index, tile.col_index, tile.col_index + 1, state)
+
+    def queue_tile_lines(self, tile, state, fill_axis):
+        self.line_queue.push(self.line_objects[Axis.ROWS][tile.row_index], 1)
+        self.line_queue.push(self.line_objects[Axis.COLS][tile.col_index], 1)
+
+    # Stop solving at the next line, from any thread. solve returns its SolveResult as if a budget had run out. If no
+    # solve is running, the next one stops as it starts.
+    def cancel(self):
+        self.budget.cancel()
+
+    # Raises Contradiction if result is False. When displaying steps, the board is displayed first for debugging.
     def assert_puzzle(self, result, message):
         if result:
             return
 
-        display_picross(self, title=f"{self.puzzle_name} assert: {message}")
-        print(f"{self.puzzle_name} assert: {message}")
+        if self.display_steps:
+            self.display(f"{self.puzzle_name} assert: {message}")
+            print(f"{self.puzzle_name} assert: {message}")
+
+        raise Contradiction(f"{self.puzzle_name} assert: {message}")
 
     def init_tiles(self, puzzle_raw):
-        puzzle_arr = []
-        for line_index, line_raw in enumerate(puzzle_raw):
-            line = []
-            for i in range(len(line_raw)):
-                line.append(Tile(self, line_index, line_raw, i))
-            puzzle_arr.append(line)
-        return np.array(puzzle_arr, Tile)
+        num_rows, num_cols = puzzle_raw.shape
+        puzzle_arr = np.empty((num_rows, num_cols), dtype=object)
+        for row_index in range(num_rows):
+            for col_index in range(num_cols):
+                puzzle_arr[row_index, col_index] = Tile(self, row_index, col_index)
+        return puzzle_arr
 
     def get_all_puzzle_lines(self):
         return [puzzle_line
@@ -57,27 +140,466 @@ class Solver:
     def verify(self):
         return all(line_object.verify() for line_object in self.get_all_line_objects())
 
-    def display_changes(self, operation, description_func: Callable[[], str]):
+    def is_complete(self):
+        return not (self.puzzle_raw == State.UNKNOWN).any()
+
+    # Called whenever tiles of a line change, so that the line is solved again
+    def line_changed(self, line_object, new_cells=1):
+        if self.line_queue is not None:
+            self.line_queue.push(line_object, new_cells)
+
+    def solve_line(self, line_object):
+        self.budget.count_operation()
+        self.stats.line_solves += 1
+        if self.options.line_logic == LineLogic.PLACEMENTS:
+            return line_object.solve_placements()
+        if self.line_cache is None:
+            return line_object.solve_line()
+
+        result = self.line_cache.solve(line_object.clue_run_lengths, line_object.line_raw)
+        self.assert_puzzle(result is not None, f"Line {line_name(line_object.axis, line_object.line_index)} can't satisfy its clues")
+        if result is None:
+            return DirtyFlag.NONE
+
+        fills, crosses = result
+        return self.with_rule(Rule.LINE_CACHE, lambda: line_object.set_bits(State.FILLED, fills) | line_object.set_bits(State.CROSSED, crosses))
+
+    # Count the changes made by operation(*args) against the given Rule
+    def with_rule(self, rule, operation, *args):
+        previous_rule = self.rule
+        self.rule = rule
+        try:
+            return operation(*args)
+        finally:
+            self.rule = previous_rule
+
+    def remove_blocked_starts(self, operation):
+        """
+        Run operation, which removes the potential runs blocked by a newly known tile. Removing them can cross more
+        tiles, which block more potential runs, so on a large board this could recurse across the whole board. Instead,
+        removals started while one is running are queued, and the first one runs them all before returning.
+        """
+        if self.blocked_queue is not None:
+            self.blocked_queue.append(operation)
+            return DirtyFlag.NONE
+
+        self.blocked_queue = deque([operation])
+        dirty_flags = DirtyFlag.NONE
+        try:
+            while self.blocked_queue:
+                dirty_flags |= self.with_rule(Rule.BLOCKED, self.blocked_queue.popleft())
+        finally:
+            self.blocked_queue = None
+        return dirty_flags
+
+    def display_changes(self, operation, rule, step=Step.DEDUCTION, line_object=None, clue_index=-1, start=-1, end=-1):
         """
-        :param description_func:
-            A function that returns a string, because that way we can delay string evaluation until necessary
+        :param rule:
+            The Rule that changes made by operation are counted against, or None if operation sets its own Rules
+        :param step:
+            The kind of step. With the Rule, and the line, ClueRun and tiles it applies to, it describes the step
+            when it's displayed or replayed, so no description has to be built unless it's needed.
         """
-        dirty_flags = operation()
+        if rule is None:
+            dirty_flags = operation()
+        else:
+            dirty_flags = self.with_rule(rule, operation)
 
-        if board_dirty(dirty_flags) and self.display_steps:
-            title = f"{self.puzzle_name} - After {description_func()}"
-            display_picross(self, title=title)
+        if dirty_flags and (self.display_steps or self.event_log is not None):
+            axis, line_index = (line_object.axis, line_object.line_index) if line_object is not None else (Axis.ROWS, -1)
+            if self.event_log is not None:
+                self.event_log.step(step, rule, axis, line_index, clue_index, start, end)
+            if board_dirty(dirty_flags) and self.display_steps:
+                self.display(f"{self.puzzle_name} - After {step_name(step, rule, axis, line_index, clue_index, start, end)}")
 
         return dirty_flags
 
+    # Show the board in a window that's kept open and updated for every step
+    def display(self, title):
+        if self.renderer is None:
+            from PicrossRenderer import PicrossRenderer # matplotlib is only imported when displaying
+            self.renderer = PicrossRenderer(self)
+        self.renderer.update(title)
+
     def solve(self):
-        dirty_flags = self.initialize_clue_runs()
-        dirty_flags |= self.display_changes(self.initial_solving_pass, lambda:"Initial pass")
+        """
+        Solve as far as line logic, and search if enabled, can go, or until the budget runs out or the solve is
+        cancelled.
+
+        :return: SolveResult of this solve. Raises Contradiction if the clues can't be satisfied.
+        """
+        self.budget.start()
+        try:
+            self.solve_steps()
+        except BudgetExceeded as e:
+            return SolveResult(self.puzzle_raw, e.stop_reason, self.stats)
+        return SolveResult(self.puzzle_raw, StopReason.COMPLETE if self.is_complete() else StopReason.STALLED, self.stats)
+
+    # The steps of solve, which raise BudgetExceeded once the budget runs out, such as out of a search branch
+    def solve_steps(self):
+        try:
+            with self.stats.phase("setup"):
+                dirty_flags = self.initialize_clue_runs()
+                dirty_flags |= self.apply_known_tiles()
+
+            with self.stats.phase("initial pass"):
+                initial_pass = self.vectorized_initial_pass if self.options.vectorized_init else self.initial_solving_pass
+                dirty_flags |= self.display_changes(initial_pass, Rule.OVERLAP if self.options.vectorized_init else None, Step.INITIAL_PASS)
+
+            with self.stats.phase("propagate"):
+                self.propagate(dirty_flags)
+
+            if self.search_enabled and not self.is_complete():
+                with self.stats.phase("search"):
+                    self.search()
+        finally:
+            self.stats.passes += self.pass_count
+            self.stats.search_nodes += self.search_nodes
+            if self.event_log is not None:
+                self.event_log.flush()
+
+    # Solve lines until line logic can't find anything more
+    def propagate(self, dirty_flags=DirtyFlag.ALL):
+        if self.line_queue is not None:
+            self.solve_queued()
+            return
 
         while dirty_flags:
-            dirty_flags = self.display_changes(self.solving_pass, lambda:"Solving pass")
+            self.budget.count_passes()
+            self.pass_count += 1
+            dirty_flags = self.display_changes(self.solving_pass, None, Step.SOLVING_PASS)
+
+    # Rather than sweeping every line, only solve lines that have changed since they were last solved
+    def solve_queued(self):
+        # Every line gets solved once, like the first solving pass
+        if self.pass_count == 0:
+            for line_object in self.get_all_line_objects():
+                self.line_queue.push(line_object)
+
+        round_count = self.line_queue.round_count
+        line_object = self.line_queue.pop()
+        while line_object is not None:
+            if self.line_queue.round_count > round_count:
+                self.budget.count_passes(self.line_queue.round_count - round_count)
+                round_count = self.line_queue.round_count
+            dirty_flags = self.display_changes(partial(self.solve_line, line_object), None, Step.SOLVE_LINE, line_object)
+            if dirty_flags:
+                self.line_queue.push(line_object)
+            self.pass_count = self.line_queue.round_count
+            line_object = self.line_queue.pop()
+
+    def set_tile(self, row_index, col_index, state, rule=Rule.KNOWN):
+        row_index, col_index, state = int(row_index), int(col_index), int(state)
+        return self.with_rule(rule, partial(self.line_objects[Axis.ROWS][row_index].set_state, state, col_index, col_index + 1))
+
+    # The unknown tile whose row and column are the most known, as those are the most constrained
+    def choose_search_tile(self):
+        unknown = self.puzzle_raw == State.UNKNOWN
+        if not unknown.any():
+            return None
+
+        known = ~unknown
+        score = known.sum(axis=1)[:, np.newaxis] + known.sum(axis=0)[np.newaxis, :]
+        score[known] = -1
+        return tuple(int(i) for i in np.unravel_index(np.argmax(score), score.shape))
+
+    # A copy of this Solver with one more tile known, solved as far as line logic allows.
+    # Returns None if that leads to a contradiction.
+    def branch(self, row_index, col_index, state):
+        puzzle_raw = self.puzzle_raw.copy()
+        puzzle_raw[row_index, col_index] = state
+        options = SolverOptions(engine=self.options.engine, schedule=Schedule.SWEEP if self.line_queue is None else Schedule.QUEUE,
+                                line_cache=self.line_cache, line_logic=self.options.line_logic, detailed_stats=self.options.detailed_stats,
+                                budget=self.budget)
+        child = Solver(f"{self.puzzle_name} {tile_name(Axis.ROWS, row_index, col_index)}={state_name(state)}",
+                       puzzle_raw, self.row_and_col_clues_raw, display_steps=False, options=options)
+        try:
+            child.solve_steps()
+        except Contradiction:
+            return None
+        finally:
+            # Count the branch's work here, including any more it does once searched
+            self.stats.merge(child.stats)
+            child.stats = self.stats
+        return child
+
+    # Copy every tile that's known in a solved branch
+    def adopt(self, child):
+        for row_index, col_index in np.argwhere((self.puzzle_raw == State.UNKNOWN) & (child.puzzle_raw != State.UNKNOWN)):
+            self.set_tile(row_index, col_index, child.puzzle_raw[row_index, col_index], Rule.SEARCH)
+
+    def search(self, root=None, depth=0):
+        """
+        Guess unknown tiles once line logic stalls. A guess that leads to a contradiction proves the opposite, which
+        is then propagated. If neither guess of a tile contradicts, each is searched in turn, up to the depth and node
+        limits of the root Solver.
+
+        :return: True if the puzzle was completed. Raises Contradiction if this board has no solution.
+        """
+        if root is None:
+            root = self
+
+        while True:
+            tile = self.choose_search_tile()
+            if tile is None:
+                self.assert_puzzle(self.verify(), "Completed board doesn't match the clues")
+                return True
+
+            children = []
+            for state in [State.FILLED, State.CROSSED]:
+                if root.search_nodes >= root.options.max_search_nodes:
+                    return False
+                root.search_nodes += 1
+
+                child = self.branch(*tile, state)
+                if child is None:
+                    # The guess was impossible, so the tile must be the opposite
+                    self.propagate(self.set_tile(*tile, -state, Rule.SEARCH))
+                    break
+                children.append(child)
+            else:
+                if depth >= root.options.max_search_depth:
+                    return False
+
+                for child, state in zip(children, [State.FILLED, State.CROSSED]):
+                    try:
+                        if child.search(root, depth + 1):
+                            self.adopt(child)
+                            return True
+                    except Contradiction:
+                        self.propagate(self.set_tile(*tile, -state, Rule.SEARCH))
+                        break
+                else:
+                    return False
+
+    def find_solutions(self, limit=2):
+        """
+        Find solutions by line logic, then by branching on unknown tiles, until limit are found. With the default
+        limit of 2, one solution proves it's the only one. Unlike search, every branch is followed to the end, with
+        no depth or node limit, but the budget still applies.
+
+        Each branch solves its board again from the start, while most of its lines are as they were in the board it
+        branched from. Without a LineCache, one is shared by every branch for the search, so those lines are looked up
+        rather than solved again.
+
+        :return: List of up to limit solved boards, the first one found first. Raises BudgetExceeded if the budget
+            runs out first.
+        """
+        line_cache = self.line_cache
+        search_enabled = self.search_enabled
+        self.search_enabled = False
+        self.budget.start()
+        try:
+            try:
+                self.solve_steps()
+            except Contradiction:
+                return []
+
+            if line_cache is None and self.options.line_logic == LineLogic.RULES and not self.is_complete():
+                self.line_cache = LineCache()
+            solutions = []
+            branches = [self]
+            while branches and len(solutions) < limit:
+                branch = branches.pop()
+                tile = branch.choose_search_tile()
+                if tile is None:
+                    if branch.verify():
+                        solutions.append(branch.puzzle_raw.copy())
+                    continue
+
+                # Search the filled guess first, by pushing it last
+                for state in [State.CROSSED, State.FILLED]:
+                    child = branch.branch(*tile, state)
+                    if child is not None:
+                        branches.append(child)
+            return solutions
+        finally:
+            self.line_cache = line_cache
+            self.search_enabled = search_enabled
+
+    # Number of the line deducing tiles along the given axis, or a Deducer for tiles not deduced by one line
+    def deducing_line(self, axis, line_index):
+        if self.rule == Rule.KNOWN:
+            return Deducer.GIVEN
+        if self.rule == Rule.SEARCH:
+            return Deducer.SEARCH
+        if axis is None:
+            return Deducer.ROW_AND_COL
+        return line_index if axis == Axis.ROWS else self.puzzle_raw.shape[Axis.ROWS] + line_index
+
+    # Tiles deduced together are given the same order, as none of them depends on the others
+    def record_tiles(self, tiles, deducing_line):
+        self.tile_lines[tiles] = deducing_line
+        self.tile_order[tiles] = self.tile_count
+        self.tile_count += 1
+
+    def dependent_tiles(self, line_number):
+        """
+        Known tiles that depend on the clue of a line. A tile deduced by a line depends on that line's clue and on the
+        tiles of the line that were known before it. Once some of those are dependent, the line is solved again from
+        the rest of them, and its tiles are only dependent if they can't be deduced without them.
+
+        :return: Boolean array of the board's shape
+        """
+        num_rows, num_cols = self.puzzle_raw.shape
+        dependent = np.zeros(self.puzzle_raw.shape, dtype=bool)
+
+        # Visit the deduced tiles in order. Nothing deduced before the first tile the line deduced depends on it.
+        deduced = np.flatnonzero((self.tile_order >= 0) & (self.tile_lines != Deducer.GIVEN))
+        deduced = deduced[np.argsort(self.tile_order.flat[deduced], kind="stable")]
+        orders = self.tile_order.flat[deduced]
+        depends_on_line = self.tile_lines.flat[deduced] == line_number
+        depends_on_line |= self.tile_lines.flat[deduced] == Deducer.SEARCH
+        if line_number < num_rows:
+            depends_on_line |= (self.tile_lines.flat[deduced] == Deducer.ROW_AND_COL) & (deduced // num_cols == line_number)
+        else:
+            depends_on_line |= (self.tile_lines.flat[deduced] == Deducer.ROW_AND_COL) & (deduced % num_cols == line_number - num_rows)
+        if not depends_on_line.any():
+            return dependent
+        first = int(np.argmax(depends_on_line))
+
+        # Order of the first dependent tile of each line. Tiles the line deduces before it can't depend on the line.
+        no_order = np.iinfo(np.int64).max
+        dependent_since = [no_order] * (num_rows + num_cols)
+
+        # Order of the last tile of each line found not to be dependent
+        last_independent = [-1] * (num_rows + num_cols)
+
+        # Tiles each line can deduce without the dependent tiles, as (order solved at, filled, crossed). Tiles are only
+        # ever found to be dependent in order, so these stay valid for the line's later tiles, and stay complete until
+        # the line has another tile that isn't dependent.
+        independent_deductions = {}
+
+        for index, order, deducing_line in zip(deduced[first:].tolist(), orders[first:].tolist(), self.tile_lines.flat[deduced[first:]].tolist()):
+            row_index, col_index = divmod(index, num_cols)
+            if deducing_line == Deducer.SEARCH or deducing_line == line_number:
+                is_dependent = True
+            elif deducing_line == Deducer.ROW_AND_COL:
+                is_dependent = line_number in (row_index, num_rows + col_index)
+            elif dependent_since[deducing_line] < order:
+                tile_bit = 1 << (col_index if deducing_line < num_rows else row_index)
+                state_index = 0 if self.puzzle_raw[row_index, col_index] == State.FILLED else 1
+                deductions = independent_deductions.get(deducing_line)
+                if deductions is None or not deductions[1 + state_index] & tile_bit and last_independent[deducing_line] >= deductions[0]:
+                    deductions = (order, *self.independent_line_deductions(deducing_line, order, dependent))
+                    independent_deductions[deducing_line] = deductions
+                is_dependent = not deductions[1 + state_index] & tile_bit
+            else:
+                is_dependent = False
+            if is_dependent:
+                dependent[row_index, col_index] = True
+                dependent_since[row_index] = min(dependent_since[row_index], order)
+                dependent_since[num_rows + col_index] = min(dependent_since[num_rows + col_index], order)
+            else:
+                last_independent[row_index] = order
+                last_independent[num_rows + col_index] = order
+        return dependent
+
+    # Tiles of a line that its clue and its tiles known before the given order, but not dependent, are enough to deduce
+    def independent_line_deductions(self, line_number, order, dependent):
+        num_rows = self.puzzle_raw.shape[Axis.ROWS]
+        axis, line_index = (Axis.ROWS, line_number) if line_number < num_rows else (Axis.COLS, line_number - num_rows)
+        tiles = line_tiles(axis, line_index, 0, None)
+
+        line_raw = self.puzzle_raw[tiles]
+        known = (line_raw != State.UNKNOWN) & (self.tile_order[tiles] < order) & ~dependent[tiles]
+        line_raw = np.where(known, line_raw, State.UNKNOWN)
+        try:
+            solve_cells = solve_line_placement_cells if self.options.line_logic == LineLogic.PLACEMENTS else solve_line_cells
+            fills, crosses = solve_cells(self.row_and_col_clues_raw[axis][line_index], line_raw)
+        except Contradiction:
+            return 0, 0
+        return fills | bools_to_mask(line_raw == State.FILLED), crosses | bools_to_mask(line_raw == State.CROSSED)
+
+    def change_clue(self, axis, line_index, clue_run_lengths):
+        """
+        Change the clue of one line and solve again. Only the tiles that depend on the line are rolled back, and only
+        the Lines that lost tiles are rebuilt, so the rest of the board and of the ClueRuns are kept as they are.
+        Without track_dependencies, every tile not on the starting board is rolled back instead, but the Tiles are
+        still kept. The event log, if any, stops recording, as it can't record tiles being rolled back.
+
+        :param clue_run_lengths: The line's new clue, such as [3, 1]
+        :return: SolveResult, whose SolveStats count this solve along with those before it. Raises Contradiction if
+            the new clues can't be satisfied. After a contradiction, or once the budget runs out, the board is left as
+            far as the solve got, and is rolled back by the next change.
+        """
+        num_rows, num_cols = self.puzzle_raw.shape
+        axis, line_index = int(axis), int(line_index)
+        self.row_and_col_clues_raw[axis][line_index] = [int(run_length) for run_length in clue_run_lengths if run_length]
+        if self.event_log is not None:
+            self.event_log.flush()
+            self.event_log = None
+
+        if self.options.track_dependencies:
+            rolled_back = self.dependent_tiles(line_index if axis == Axis.ROWS else num_rows + line_index)
+            if self.unsettled_since is not None:
+                rolled_back |= self.tile_order >= self.unsettled_since
+            self.tile_order[rolled_back] = -1
+        else:
+            rolled_back = (self.puzzle_raw != State.UNKNOWN) & ~self.starting_known
+        self.puzzle_raw[rolled_back] = State.UNKNOWN
+
+        # Lines that kept all of their tiles still have ClueRuns that match them
+        if self.options.track_dependencies:
+            changed_lines = {(axis, line_index)}
+            changed_lines.update((Axis.ROWS, int(i)) for i in np.flatnonzero(rolled_back.any(axis=1)))
+            changed_lines.update((Axis.COLS, int(i)) for i in np.flatnonzero(rolled_back.any(axis=0)))
+            changed_lines.update(self.unsettled_lines)
+            changed_lines = sorted(changed_lines)
+        else:
+            changed_lines = [(line_object.axis, line_object.line_index) for line_object in self.get_all_line_objects()]
+
+        # Solve the rebuilt lines, and every line they change, with a queue of their own
+        line_queue = self.line_queue
+        self.line_queue = LineQueue(prioritize=line_queue is not None and line_queue.prioritize)
+        self.bind_tile_hooks()
+        change_start = self.tile_count
+        self.budget.start()
+        try:
+            # Every Line is replaced before any loads its tiles, as loading can cross tiles of the other lines
+            with self.stats.phase("rebuild"):
+                new_lines = [self.rebuild_line(*line) for line in changed_lines]
+                for line_object in new_lines:
+                    if self.options.engine == Engine.OBJECTS:
+                        line_object.load_tiles()
+                    self.line_queue.push(line_object)
+
+            with self.stats.phase("propagate"):
+                self.solve_queued()
+
+            if self.search_enabled and not self.is_complete():
+                with self.stats.phase("search"):
+                    self.search()
+        except (Contradiction, BudgetExceeded) as e:
+            self.unsettled_since = change_start
+            self.unsettled_lines = changed_lines
+            if isinstance(e, Contradiction):
+                raise
+            return SolveResult(self.puzzle_raw, e.stop_reason, self.stats)
+        finally:
+            self.stats.passes += self.line_queue.round_count
+            self.line_queue = line_queue
+            self.bind_tile_hooks()
+
+        self.unsettled_since = None
+        self.unsettled_lines = []
+        return SolveResult(self.puzzle_raw, StopReason.COMPLETE if self.is_complete() else StopReason.STALLED, self.stats)
+
+    # Replace a line's Line with a new one, built from its clue. A BitLine reads the tiles still known as it's built,
+    # but a Line has to load them afterwards.
+    def rebuild_line(self, axis, line_index):
+        clue_run_lengths = self.row_and_col_clues_raw[axis][line_index]
+        if self.options.engine == Engine.BITSET:
+            line_object = BitLine(self, axis, line_index, clue_run_lengths, puzzle_and_transpose(self.puzzle_raw)[axis][line_index])
+        else:
+            line_object = Line(self, axis, line_index, clue_run_lengths, puzzle_and_transpose(self.puzzle)[axis][line_index])
+        self.line_objects[axis][line_index] = line_object
+        return line_object
 
     def initialize_clue_runs(self):
+        if self.options.engine == Engine.BITSET:
+            return self.initialize_bit_lines()
+
         for axis, puzzle_view in enumerate(puzzle_and_transpose(self.puzzle)):
             axis_lines = self.line_objects[axis]
             line_clues_raw = self.row_and_col_clues_raw[axis]
@@ -87,18 +609,84 @@ class Solver:
                 axis_lines.append(line_object)
         return DirtyFlag.CLUES
 
+    def initialize_bit_lines(self):
+        for axis, raw_view in enumerate(puzzle_and_transpose(self.puzzle_raw)):
+            axis_lines = self.line_objects[axis]
+            line_clues_raw = self.row_and_col_clues_raw[axis]
+            for line_index, line_raw in enumerate(raw_view):
+                clue_run_lengths = line_clues_raw[line_index]
+                line_object = BitLine(self, axis, line_index, clue_run_lengths, line_raw)
+                axis_lines.append(line_object)
+        return DirtyFlag.CLUES
+
+    # Known tiles on the starting board, or written directly to puzzle_raw, have to be applied to the lines
+    def apply_known_tiles(self, tiles=None):
+        if self.options.engine != Engine.OBJECTS:
+            for line_object in self.get_all_line_objects():
+                line_object.load_raw()
+            return DirtyFlag.NONE
+
+        dirty_flags = DirtyFlag.NONE
+        for tile in (self.puzzle.flat if tiles is None else tiles):
+            state = tile.get_state()
+            if state != State.UNKNOWN:
+                tile.board[tile.row_index, tile.col_index] = State.UNKNOWN
+                dirty_flags |= tile.set_state(state)
+        return dirty_flags
+
     def initial_solving_pass(self):
         dirty_flags = DirtyFlag.NONE
 
         for clue_run in self.get_all_clue_runs():
-            dirty_flags |= self.display_changes(clue_run.apply, lambda:f"Initialize {clue_run}")
+            self.budget.check()
+            dirty_flags |= self.display_changes(clue_run.apply, Rule.OVERLAP, Step.INITIALIZE, clue_run.line_object, clue_run.clue_index)
 
         return dirty_flags
 
+    # Same deductions as initial_solving_pass on a blank board, but computed for every line at once
+    def vectorized_initial_pass(self):
+        self.budget.check()
+        num_rows, num_cols = self.puzzle_raw.shape
+        row_filled, row_crossed, _, _ = initial_overlap(self.row_and_col_clues_raw[Axis.ROWS], num_cols)
+        col_filled, col_crossed, _, _ = initial_overlap(self.row_and_col_clues_raw[Axis.COLS], num_rows)
+        filled = row_filled | col_filled.T
+        crossed = row_crossed | col_crossed.T
+
+        self.assert_puzzle(not (filled & crossed).any(), "Initial pass both fills and crosses a tile")
+        self.assert_puzzle(not (filled & (self.puzzle_raw == State.CROSSED)).any(), "Initial pass fills a crossed tile")
+        self.assert_puzzle(not (crossed & (self.puzzle_raw == State.FILLED)).any(), "Initial pass crosses a filled tile")
+
+        # On a blank board, these are exactly the tiles every ClueRun would apply. Otherwise, ClueRuns may have been
+        # trimmed by the known tiles and still need applying.
+        if not self.puzzle_raw.any():
+            for clue_run in self.get_all_clue_runs():
+                clue_run.dirty = False
+
+        unknown = self.puzzle_raw == State.UNKNOWN
+        new_tiles = (filled | crossed) & unknown
+        if not new_tiles.any():
+            return DirtyFlag.NONE
+
+        self.puzzle_raw[filled & unknown] = State.FILLED
+        self.puzzle_raw[crossed & unknown] = State.CROSSED
+        if self.options.engine != Engine.OBJECTS:
+            # Tiles count and log themselves as they're applied, but BitLines only reload puzzle_raw
+            for state, state_tiles in [(State.FILLED, filled & unknown), (State.CROSSED, crossed & unknown)]:
+                if self.options.detailed_stats:
+                    self.stats.count_tiles(self.rule, state, int(np.count_nonzero(state_tiles)))
+                if self.event_log is not None:
+                    for row_index in np.flatnonzero(state_tiles.any(axis=1)).tolist():
+                        for start, end in bit_runs(bools_to_mask(state_tiles[row_index])):
+                            self.event_log.tiles(self.rule, Axis.ROWS, row_index, start, end, state)
+            if self.options.track_dependencies:
+                self.record_tiles(new_tiles, Deducer.ROW_AND_COL)
+        self.apply_known_tiles(self.puzzle[new_tiles] if self.options.engine == Engine.OBJECTS else None)
+        return DirtyFlag.BOARD
+
     def solving_pass(self):
         dirty_flags = DirtyFlag.NONE
 
         for line_object in self.get_all_line_objects():
-            dirty_flags |= self.display_changes(line_object.solve_line, lambda:f"Solve line {line_name(line_object.axis, line_object.line_index)}")
+            dirty_flags |= self.display_changes(partial(self.solve_line, line_object), None, Step.SOLVE_LINE, line_object)
 
         return dirty_flags
@@ -0,0 +1,46 @@
+from helpers import *
+
+# How a Solver solves, fixed when it's built. The state these set up, such as the LineQueue or the SolveBudget, is kept
+# on the Solver, along with the options it changes as it solves.
+class SolverOptions:
+    def __init__(self, engine=Engine.OBJECTS, schedule=Schedule.SWEEP, line_cache=None, line_logic=LineLogic.RULES, search=False,
+                 max_search_depth=8, max_search_nodes=1000, vectorized_init=False, detailed_stats=False, event_log=None,
+                 track_dependencies=False, time_limit=None, max_passes=None, max_operations=None, budget=None):
+        """
+        :param engine: Engine the lines are solved with
+        :param schedule: Schedule the lines are solved in
+        :param line_cache: A LineCache, which may be shared with other Solvers
+        :param line_logic: How each line is solved. PLACEMENTS lines are exact, so they skip the LineCache.
+        :param search: Guess tiles once line logic stalls, up to max_search_depth and max_search_nodes
+        :param vectorized_init: Compute the initial pass for all lines at once with NumPy
+        :param detailed_stats: Count tiles and removed potential runs per Rule
+        :param event_log: EventLog recording every change, to be replayed later
+        :param track_dependencies: Record the line that deduced each tile, so that change_clue only rolls back the
+            tiles that depend on the changed line
+        :param time_limit: Most seconds each solve can take
+        :param max_passes: Most solving passes of each solve
+        :param max_operations: Most lines solved in each solve
+        :param budget: SolveBudget to share with another Solver, instead of one made from the limits above
+        """
+        self.engine = engine
+        self.schedule = schedule
+        self.line_cache = line_cache
+        self.line_logic = line_logic
+        self.search = search
+        self.max_search_depth = max_search_depth
+        self.max_search_nodes = max_search_nodes
+        self.vectorized_init = vectorized_init
+        self.detailed_stats = detailed_stats
+        self.event_log = event_log
+        self.track_dependencies = track_dependencies
+        self.time_limit = time_limit
+        self.max_passes = max_passes
+        self.max_operations = max_operations
+        self.budget = budget
+
+    def __repr__(self):
+        return f"SolverOptions({', '.join(f'{name}={value!r}' for name, value in vars(self).items())})"
+
+    # A copy with the given options changed. Raises TypeError for an option that doesn't exist, as the constructor does.
+    def replace(self, **changes):
+        return SolverOptions(**{**vars(self), **changes})
@@ -0,0 +1,352 @@
+import asyncio
+import json
+import os
+import signal
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from Solver import Solver
+from helpers import *
+from picross_import import parse_puzzle_line
+
+try:
+    import resource # Memory budgets are only enforced where the address space can be limited
+except ImportError:
+    resource = None
+
+# Largest request body accepted, in bytes
+MAX_BODY_SIZE = 1 << 20
+
+# A solve stops itself at its time budget, but steps its SolveBudget doesn't check, such as building Tiles, are
+# interrupted by SIGALRM this many seconds after. Where there's no SIGALRM, a request gives up on its worker this many
+# seconds after its budget instead, counted from when it was submitted.
+TIME_LIMIT_GRACE = 1.0
+
+# Requests whose latencies the metrics are taken over
+LATENCY_WINDOW = 1000
+
+# Smallest puzzle, solved once by each worker as the service starts
+WARM_UP_PUZZLE = "1x1\tWarm up\t1-1"
+
+# Address space of this worker process before it solves anything, that memory budgets are added to
+worker_base_memory = None
+
+def address_space_size():
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def raise_timeout(signum, frame):
+    raise TimeoutError("Time budget exceeded")
+
+def init_worker():
+    global worker_base_memory
+    worker_base_memory = address_space_size()
+    if hasattr(signal, "setitimer"):
+        signal.signal(signal.SIGALRM, raise_timeout)
+    # Stopping the service stops the workers, so they leave interrupts to it
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+@contextmanager
+def worker_budgets(time_limit, memory_limit):
+    """
+    Raise TimeoutError once time_limit seconds have passed, and MemoryError once the worker has allocated more than
+    memory_limit bytes, until the block ends. Either is skipped if None or unsupported.
+    """
+    old_memory_limits = None
+    if memory_limit is not None and resource is not None and worker_base_memory is not None:
+        old_memory_limits = resource.getrlimit(resource.RLIMIT_AS)
+        hard_limit = old_memory_limits[1]
+        soft_limit = worker_base_memory + memory_limit
+        if hard_limit != resource.RLIM_INFINITY:
+            soft_limit = min(soft_limit, hard_limit)
+        resource.setrlimit(resource.RLIMIT_AS, (soft_limit, hard_limit))
+    if time_limit is not None and hasattr(signal, "setitimer"):
+        signal.setitimer(signal.ITIMER_REAL, time_limit)
+    try:
+        yield
+    finally:
+        if time_limit is not None and hasattr(signal, "setitimer"):
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        if old_memory_limits is not None:
+            resource.setrlimit(resource.RLIMIT_AS, old_memory_limits)
+
+def solve_request(puzzle_text, solver_options, time_limit=None, memory_limit=None):
+    """
+    Solve one puzzle in a worker process, within the given budgets.
+
+    :param puzzle_text: Puzzle in the format of the puzzle files' lines
+    :return: Dict of the response, with the status "solved", "unsolved", "timeout", "out_of_memory",
+        "contradiction" or "error"
+    """
+    title, puzzle_clues_raw = parse_puzzle_line(puzzle_text)
+    puzzle = np.zeros((len(puzzle_clues_raw[Axis.ROWS]), len(puzzle_clues_raw[Axis.COLS])), dtype=int)
+
+    response = {"title": title, "error": None}
+    start_time = time.perf_counter()
+    solver = None
+    try:
+        with worker_budgets(None if time_limit is None else time_limit + TIME_LIMIT_GRACE, memory_limit):
+            solver = Solver(title or "Request", puzzle, puzzle_clues_raw, display_steps=False, time_limit=time_limit, **solver_options)
+            result = solver.solve()
+        if result.stop_reason == StopReason.DEADLINE:
+            response.update(status="timeout", error=f"Time budget of {time_limit}s exceeded")
+        else:
+            response["status"] = "solved" if solver.verify() else "unsolved"
+    except TimeoutError:
+        response.update(status="timeout", error=f"Time budget of {time_limit}s exceeded")
+    except MemoryError:
+        response.update(status="out_of_memory", error=f"Memory budget of {memory_limit} bytes exceeded")
+    except Contradiction as e:
+        response.update(status="contradiction", error=str(e))
+    except Exception as e:
+        response.update(status="error", error=f"{type(e).__name__}: {e}")
+    response["time"] = time.perf_counter() - start_time
+    response["board"] = puzzle.tolist()
+    response["stats"] = None if solver is None else solver.stats.to_dict()
+    return response
+
+class BadRequest(Exception):
+    pass
+
+# Long-lived solving service. Puzzles are posted over HTTP, on a TCP port or a Unix socket, in the format of the
+# puzzle files' lines, and are solved by a pool of warm worker processes. Each request is held to a time and memory
+# budget, and requests beyond what the workers and the queue can hold are turned away rather than queued without end.
+#   POST /solve     body is the puzzle. The query can set engine, schedule, search, timeout (seconds) and max_memory
+#                   (MiB), up to the service's own budgets. Responds with the status, board and SolveStats as JSON.
+#   GET /health     whether the service is accepting requests
+#   GET /metrics    request counts and latencies
+class SolverService:
+    def __init__(self, workers=None, max_pending=None, time_limit=10.0, memory_limit=None, **solver_options):
+        """
+        :param workers: Worker processes, by default one per CPU
+        :param max_pending: Requests that can wait for a worker, beyond those being solved, by default 4 per worker
+        :param time_limit: Most seconds a request can take, or None for no limit
+        :param memory_limit: Most bytes a request can allocate, or None for no limit
+        :param solver_options: Default keyword arguments of each request's Solver
+        """
+        self.workers = workers or os.cpu_count()
+        self.max_pending = 4 * self.workers if max_pending is None else max_pending
+        self.time_limit = time_limit
+        self.memory_limit = memory_limit
+        self.solver_options = solver_options
+        self.pool = None
+        self.server = None
+        self.loop = None
+        self.start_time = None
+
+        # Requests handed to the pool whose workers haven't finished with them, even after a request gave up
+        self.in_flight = 0
+
+        self.counts = {status: 0 for status in ["requests", "rejected", "bad_request", "solved", "unsolved", "timeout",
+                                                "out_of_memory", "contradiction", "error"]}
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    @property
+    def capacity(self):
+        return self.workers + self.max_pending
+
+    async def start(self, host="127.0.0.1", port=8765, unix_path=None):
+        self.loop = asyncio.get_running_loop()
+        self.start_pool()
+        await self.warm_up()
+        if unix_path is not None:
+            self.server = await asyncio.start_unix_server(self.handle_connection, unix_path)
+        else:
+            self.server = await asyncio.start_server(self.handle_connection, host, port)
+        self.start_time = time.time()
+        return self.server
+
+    def start_pool(self):
+        self.pool = ProcessPoolExecutor(self.workers, initializer=init_worker)
+
+    # Start every worker and solve a puzzle in each, so that the first requests don't pay for imports
+    async def warm_up(self):
+        await asyncio.gather(*[self.loop.run_in_executor(self.pool, solve_request, WARM_UP_PUZZLE, self.solver_options)
+                               for _ in range(self.workers)])
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            try:
+                method, target, body = await read_request(reader)
+                status_code, response = await self.route(method, target, body)
+            except BadRequest as e:
+                self.counts["bad_request"] += 1
+                status_code, response = 400, {"error": str(e)}
+            write_response(writer, status_code, response)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, target, body):
+        url = urlsplit(target)
+        match method, url.path:
+            case "GET", "/health":
+                return 200, self.health()
+            case "GET", "/metrics":
+                return 200, self.metrics()
+            case "POST", "/solve":
+                return await self.solve(body, parse_qs(url.query))
+            case _, "/health" | "/metrics" | "/solve":
+                return 405, {"error": f"{method} isn't supported for {url.path}"}
+            case _:
+                return 404, {"error": f"No endpoint at {url.path}"}
+
+    async def solve(self, body, query):
+        self.counts["requests"] += 1
+        solver_options, time_limit, memory_limit = self.request_options(query)
+        try:
+            puzzle_text = body.decode("utf-8")
+            _, puzzle_clues_raw = parse_puzzle_line(puzzle_text)
+        except ValueError as e: # Including UnicodeDecodeError
+            raise BadRequest(f"Couldn't read the puzzle: {e}")
+        if len(puzzle_clues_raw) != 2 or not all(puzzle_clues_raw):
+            raise BadRequest("Couldn't read the puzzle: expected row clues and column clues separated by a dash")
+
+        # Backpressure: turn the request away rather than queue it behind more than the pool can soon get to
+        if self.in_flight >= self.capacity:
+            self.counts["rejected"] += 1
+            return 503, {"error": "The service is busy", "in_flight": self.in_flight}
+
+        start_time = time.perf_counter()
+        pool = self.pool
+        future = pool.submit(solve_request, puzzle_text, solver_options, time_limit, memory_limit)
+        self.in_flight += 1
+        future.add_done_callback(self.request_done)
+
+        try:
+            timeout = time_limit + TIME_LIMIT_GRACE if time_limit is not None and not hasattr(signal, "setitimer") else None
+            response = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError: # Not the builtin TimeoutError before Python 3.11
+            response = {"status": "timeout", "error": f"Time budget of {time_limit}s exceeded, and the worker didn't stop"}
+        except BrokenProcessPool:
+            # A worker died, such as by being killed for its memory, which takes the whole pool and its requests with it
+            if self.pool is pool:
+                self.start_pool()
+            response = {"status": "error", "error": "The worker solving the puzzle stopped"}
+        except Exception as e:
+            response = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+
+        self.counts[response["status"]] += 1
+        self.latencies.append(time.perf_counter() - start_time)
+        status_code = 200 if response["status"] in ["solved", "unsolved", "contradiction"] else 504 if response["status"] == "timeout" else 500
+        return status_code, response
+
+    # Called from the pool's thread, so the count is changed on the event loop's thread instead
+    def request_done(self, future):
+        self.loop.call_soon_threadsafe(self.finish_request)
+
+    def finish_request(self):
+        self.in_flight -= 1
+
+    def request_options(self, query):
+        solver_options = dict(self.solver_options)
+        try:
+            if "engine" in query:
+                solver_options["engine"] = choice(query, "engine", [Engine.OBJECTS, Engine.BITSET])
+            if "schedule" in query:
+                solver_options["schedule"] = choice(query, "schedule", [Schedule.SWEEP, Schedule.QUEUE, Schedule.PRIORITY])
+            if "search" in query:
+                solver_options["search"] = choice(query, "search", ["0", "1", "false", "true"]) in ["1", "true"]
+            time_limit = within_limit(float(query["timeout"][-1]), self.time_limit) if "timeout" in query else self.time_limit
+            memory_limit = within_limit(int(float(query["max_memory"][-1]) * (1 << 20)), self.memory_limit) if "max_memory" in query else self.memory_limit
+        except ValueError as e:
+            raise BadRequest(str(e))
+        return solver_options, time_limit, memory_limit
+
+    def health(self):
+        accepting = self.in_flight < self.capacity
+        return {"status": "ok" if accepting else "busy", "workers": self.workers, "in_flight": self.in_flight, "capacity": self.capacity}
+
+    def metrics(self):
+        latencies = np.array(self.latencies)
+        return {
+            "uptime": time.time() - self.start_time,
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "capacity": self.capacity,
+            "time_limit": self.time_limit,
+            "memory_limit": self.memory_limit,
+            "counts": dict(self.counts),
+            "latency": {
+                "requests": len(latencies),
+                "mean": float(latencies.mean()) if len(latencies) else None,
+                "p50": float(np.percentile(latencies, 50)) if len(latencies) else None,
+                "p95": float(np.percentile(latencies, 95)) if len(latencies) else None,
+                "max": float(latencies.max()) if len(latencies) else None,
+            },
+        }
+
+def choice(query, name, choices):
+    value = query[name][-1]
+    if value not in choices:
+        raise ValueError(f"{name} must be one of {', '.join(choices)}, not {value}")
+    return value
+
+# A request's own budget, which can't go over the service's
+def within_limit(value, limit):
+    if value <= 0:
+        raise ValueError(f"Budgets must be positive, not {value}")
+    return value if limit is None else min(value, limit)
+
+async def read_request(reader):
+    """
+    Read one HTTP/1.1 request. Every response closes its connection, so nothing after the body is read.
+
+    :return: (method, target, body)
+    """
+    request_line = await reader.readline()
+    if not request_line:
+        raise asyncio.IncompleteReadError(b"", None)
+    try:
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise BadRequest("Malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in [b"\r\n", b"\n", b""]:
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        content_length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise BadRequest("Malformed Content-Length")
+    if not 0 <= content_length <= MAX_BODY_SIZE:
+        raise BadRequest(f"Bodies can be at most {MAX_BODY_SIZE} bytes")
+    body = await reader.readexactly(content_length)
+    return method, target, body
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error",
+           503: "Service Unavailable", 504: "Gateway Timeout"}
+
+def write_response(writer, status_code, response):
+    body = json.dumps(response).encode("utf-8")
+    headers = [f"HTTP/1.1 {status_code} {REASONS[status_code]}", "Content-Type: application/json",
+               f"Content-Length: {len(body)}", "Connection: close"]
+    if status_code == 503:
+        headers.append("Retry-After: 1")
+    writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + body)
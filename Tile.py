@@ -1,19 +1,19 @@
 from helpers import *
 
 class Tile:
-    def __init__(self, solver, row_index, line_raw, col_index):
+    __slots__ = ("solver", "board", "row_index", "col_index")
+
+    def __init__(self, solver, row_index, col_index):
         self.solver = solver
+        self.board = solver.puzzle_raw # Shared by every tile, rather than each tile holding its row
         self.row_index = row_index
-        self.line_raw = line_raw
         self.col_index = col_index
-        self.potential_runs = [[], []]
-        self.adjacent_potential_runs = [] # ends just before or starts just after this tile
 
     def __str__(self):
         return f"Tile(R{self.row_index}, C{self.col_index})"
 
     def get_state(self):
-        return self.line_raw[self.col_index]
+        return self.board[self.row_index, self.col_index]
 
     def set_state(self, state, fill_axis=None):
         if self.is_state(state):
@@ -26,26 +26,33 @@ class Tile:
 
         self.solver.assert_puzzle(self.is_unknown(), f"Tried to {state_name_verb(state)} {self} but it's already {state_name(self.get_state())}")
 
-        self.line_raw[self.col_index] = state
+        self.board[self.row_index, self.col_index] = state
+        # Counting, recording, logging and queueing the tile, as far as the Solver's options call for them
+        for tile_hook in self.solver.tile_hooks:
+            tile_hook(self, state, fill_axis)
 
+        # Potential runs that include this tile are found from each line's ClueRuns, rather than stored on the tile
         if state == State.FILLED:
-            for adjacent_run in self.adjacent_potential_runs:
-                if adjacent_run not in adjacent_run.clue_run.potential_runs:
-                    continue
-                dirty_flags |= adjacent_run.clue_run.remove_run(adjacent_run)
+            dirty_flags |= self.solver.remove_blocked_starts(self.remove_adjacent_starts)
 
             for axis in [Axis.ROWS, Axis.COLS]:
                 if axis != fill_axis:
                     self.solver.line_objects[axis][self.line_index(axis)].add_filled_run(self.line_index(not axis))
         elif state == State.CROSSED:
-            for axis_runs in self.potential_runs:
-                for potential_run in axis_runs[:]:
-                    if potential_run not in potential_run.clue_run.potential_runs:
-                        continue
-                    dirty_flags |= potential_run.clue_run.remove_run(potential_run)
-                    self.solver.assert_puzzle(potential_run not in axis_runs, f"Failed to remove potential run {potential_run} from {self}")
-            self.solver.assert_puzzle(not self.potential_runs[Axis.ROWS] and not self.potential_runs[Axis.COLS], f"Failed to clear all potential runs from crossed {self}")
+            dirty_flags |= self.solver.remove_blocked_starts(self.remove_covering_starts)
+
+        return dirty_flags
+
+    def remove_adjacent_starts(self):
+        dirty_flags = DirtyFlag.NONE
+        for axis in [Axis.ROWS, Axis.COLS]:
+            dirty_flags |= self.solver.line_objects[axis][self.line_index(axis)].remove_adjacent_starts(self.line_index(not axis))
+        return dirty_flags
 
+    def remove_covering_starts(self):
+        dirty_flags = DirtyFlag.NONE
+        for axis in [Axis.ROWS, Axis.COLS]:
+            dirty_flags |= self.solver.line_objects[axis][self.line_index(axis)].remove_covering_starts(self.line_index(not axis))
         return dirty_flags
 
     def is_state(self, state):
@@ -71,14 +78,3 @@ class Tile:
 
     def line_index(self, axis):
         return self.row_index if axis == Axis.ROWS else self.col_index
-
-    def add_run(self, potential_run):
-        axis_runs = self.potential_runs[potential_run.clue_run.line_object.axis]
-        axis_runs.append(potential_run)
-
-    def remove_run(self, potential_run):
-        axis_runs = self.potential_runs[potential_run.clue_run.line_object.axis]
-        axis_runs.remove(potential_run)
-
-    def add_adjacent_run(self, potential_run):
-        self.adjacent_potential_runs.append(potential_run)
\ No newline at end of file
@@ -0,0 +1,154 @@
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from picross_import import picross_import
+from Solver import Solver
+from helpers import *
+
+CORPORA = {
+    "Small": "puzzles/Small.txt",
+    "Medium": "puzzles/Medium.txt",
+    "Large": "puzzles/Large.txt",
+    "Test Puzzles": "puzzles/Test Puzzles.txt",
+}
+
+# Puzzles faster than this are too noisy to flag, however large the relative slowdown
+MIN_REGRESSION_SECONDS = 0.0005
+
+def time_puzzle(puzzle_clues_raw, solver_options):
+    puzzle = np.zeros((len(puzzle_clues_raw[0]), len(puzzle_clues_raw[1])), dtype=int)
+
+    start_time = time.perf_counter()
+    solver = Solver("Benchmark", puzzle, puzzle_clues_raw, display_steps=False, **solver_options)
+    solver.solve()
+    time_elapsed = time.perf_counter() - start_time
+
+    return time_elapsed, solver, puzzle
+
+def benchmark_puzzle(index, puzzle_clues_raw, warmup, repeat, solver_options):
+    for _ in range(warmup):
+        time_puzzle(puzzle_clues_raw, solver_options)
+
+    times = []
+    for _ in range(repeat):
+        time_elapsed, solver, puzzle = time_puzzle(puzzle_clues_raw, solver_options)
+        times.append(time_elapsed)
+
+    median = statistics.median(times)
+    cells_solved = int(np.count_nonzero(puzzle))
+    return {
+        "index": index,
+        "size": f"{puzzle.shape[Axis.COLS]}x{puzzle.shape[Axis.ROWS]}",
+        "solved": bool(solver.verify()),
+        "min": min(times),
+        "median": median,
+        "passes": solver.pass_count,
+        "line_solves": solver.stats.line_solves,
+        "cells_solved": cells_solved,
+        "cells_per_second": cells_solved / median if median > 0 else 0.0,
+    }
+
+def run_benchmark(corpora, warmup, repeat, solver_options, puzzle_limit=None):
+    results = {}
+    for corpus_name in corpora:
+        all_puzzle_clues = picross_import(CORPORA[corpus_name])
+        if puzzle_limit is not None:
+            all_puzzle_clues = all_puzzle_clues[:puzzle_limit]
+
+        results[corpus_name] = [benchmark_puzzle(i, puzzle_clues_raw, warmup, repeat, solver_options)
+                                for i, puzzle_clues_raw in enumerate(all_puzzle_clues)]
+
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "warmup": warmup,
+        "repeat": repeat,
+        "solver_options": solver_options,
+        "corpora": results,
+    }
+
+def corpus_summary(puzzle_results):
+    return {
+        "solved": sum(result["solved"] for result in puzzle_results),
+        "unsolved": sum(not result["solved"] for result in puzzle_results),
+        "min": sum(result["min"] for result in puzzle_results),
+        "median": sum(result["median"] for result in puzzle_results),
+        "passes": sum(result["passes"] for result in puzzle_results),
+    }
+
+def find_regressions(report, baseline, threshold, metric="min"):
+    regressions = []
+    for corpus_name, puzzle_results in report["corpora"].items():
+        baseline_results = {result["index"]: result for result in baseline["corpora"].get(corpus_name, [])}
+        for result in puzzle_results:
+            baseline_result = baseline_results.get(result["index"])
+            if baseline_result is None:
+                continue
+
+            slowdown = result[metric] - baseline_result[metric]
+            ratio = result[metric] / baseline_result[metric] if baseline_result[metric] > 0 else float("inf")
+            if ratio > 1 + threshold and slowdown > MIN_REGRESSION_SECONDS:
+                regressions.append((corpus_name, result, baseline_result, ratio))
+            elif baseline_result["solved"] and not result["solved"]:
+                regressions.append((corpus_name, result, baseline_result, ratio))
+    return regressions
+
+def print_report(report, baseline):
+    for corpus_name, puzzle_results in report["corpora"].items():
+        summary = corpus_summary(puzzle_results)
+        line = f"{corpus_name}: solved:{summary['solved']}, unsolved:{summary['unsolved']}, min:{summary['min']:.4f}, median:{summary['median']:.4f}, passes:{summary['passes']}"
+        if baseline is not None and corpus_name in baseline["corpora"]:
+            baseline_summary = corpus_summary(baseline["corpora"][corpus_name])
+            line += f" (baseline median:{baseline_summary['median']:.4f})"
+        print(line)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time every puzzle in the puzzle corpora and compare against a saved baseline.")
+    parser.add_argument("--corpus", action="append", choices=list(CORPORA), help="Corpus to run (repeatable, default all)")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed solves per puzzle before timing")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed solves per puzzle")
+    parser.add_argument("--limit", type=int, help="Only run the first N puzzles of each corpus")
+    parser.add_argument("--engine", default=Engine.OBJECTS, choices=[Engine.OBJECTS, Engine.BITSET])
+    parser.add_argument("--schedule", default=Schedule.SWEEP, choices=[Schedule.SWEEP, Schedule.QUEUE, Schedule.PRIORITY])
+    parser.add_argument("--search", action="store_true", help="Guess tiles once line logic stalls")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Flag puzzles whose time grew by more than this fraction")
+    parser.add_argument("--metric", default="min", choices=["min", "median"], help="Per-puzzle time compared against the baseline (min is the least noisy)")
+    args = parser.parse_args(argv)
+
+    solver_options = {"engine": args.engine, "schedule": args.schedule, "search": args.search}
+    report = run_benchmark(args.corpus or list(CORPORA), args.warmup, args.repeat, solver_options, args.limit)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=1)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+
+    print_report(report, baseline)
+
+    if baseline is None:
+        return 0
+
+    regressions = find_regressions(report, baseline, args.threshold, args.metric)
+    for corpus_name, result, baseline_result, ratio in regressions:
+        print(f"REGRESSION {corpus_name} Puzzle {result['index']} ({result['size']}): "
+              f"{args.metric} {baseline_result[args.metric]:.5f} -> {result[args.metric]:.5f} ({ratio:.2f}x), "
+              f"solved {baseline_result['solved']} -> {result['solved']}")
+    print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,5 @@
+import numpy as np
+
 class State:
     CROSSED = -1
     UNKNOWN = 0
@@ -7,6 +9,77 @@ class Axis:
     ROWS = 0
     COLS = 1
 
+class Engine:
+    OBJECTS = "objects" # Tile, ClueRun and PotentialRun object graph
+    BITSET = "bitset" # Line state and ClueRun starts stored as integer bitmasks
+
+class Schedule:
+    SWEEP = "sweep" # Solve every line on every pass
+    QUEUE = "queue" # Only solve lines whose tiles or ClueRuns changed
+    PRIORITY = "priority" # Like QUEUE, but solve the lines most likely to yield new tiles first
+
+class LineLogic:
+    RULES = "rules" # The Rules of Line.solve_line and BitLine.solve_line, which can miss deductions
+    PLACEMENTS = "placements" # Every deduction the line allows, from a DP over the placements of its clue runs
+
+# The deduction that changed a tile or removed a potential run, for SolveStats
+class Rule:
+    KNOWN = 0 # Given on the starting board, or set from outside the line logic
+    OVERLAP = 1 # Tiles covered by every potential run of a ClueRun
+    COMPLETE_RUN = 2 # Tiles either side of a ClueRun with only one potential run
+    GUARANTEED_RUN = 3 # Tiles every ClueRun that can contain a filled run would fill
+    CROSS_BEFORE = 4 # Tile before a filled run that must start where it is
+    CROSS_AFTER = 5 # Tile after a filled run that must end where it is
+    TRIM_START = 6 # Potential runs of the first ClueRun that can contain a filled run, starting after it
+    TRIM_END = 7 # Potential runs of the last ClueRun that can contain a filled run, ending before it
+    BLOCKED = 8 # Potential runs covering a crossed tile, or touching a filled tile
+    CASCADE = 9 # Potential runs of a neighbouring ClueRun, which must stay in order
+    UNCOVERED = 10 # Tiles no potential run covers anymore
+    LINE_CACHE = 11 # Tiles from a LineCache
+    SEARCH = 12 # Tiles proven or adopted by search
+    PLACEMENTS = 13 # Tiles and potential runs that every or no placement of a line's clue runs uses
+    COUNT = 14
+
+# Kind of each record of an EventLog
+class Event:
+    TILES = 0 # Tiles start to end of a line were filled or crossed
+    REMOVED_STARTS = 1 # Potential runs of a ClueRun starting from start to end were removed
+    STEP = 2 # A step of the solve finished, as displayed when displaying steps
+
+# What a step of the solve was doing, which together with its Rule and location describes it
+class Step:
+    DEDUCTION = 0 # One Rule applied to a line, ClueRun or run of tiles
+    INITIALIZE = 1 # A ClueRun applied for the first time
+    SOLVE_LINE = 2
+    INITIAL_PASS = 3
+    SOLVING_PASS = 4
+
+# Tiles that weren't deduced by a single line, for the dependencies tracked by Solver. Lines deducing tiles are
+# numbered from 0, rows first and then columns.
+class Deducer:
+    GIVEN = -1 # On the starting board or set from outside, so never rolled back
+    SEARCH = -2 # Proven or adopted by search, which depends on every line
+    ROW_AND_COL = -3 # By the initial pass of its row or its column
+
+# The clues and known tiles can't all be satisfied
+class Contradiction(Exception):
+    pass
+
+# Why Solver.solve stopped, as given in its SolveResult
+class StopReason:
+    COMPLETE = "complete" # Every tile is known
+    STALLED = "stalled" # Line logic, and search if enabled, can't find anything more
+    DEADLINE = "deadline" # The time limit ran out
+    MAX_PASSES = "max_passes"
+    MAX_OPERATIONS = "max_operations" # Lines solved
+    CANCELLED = "cancelled" # Solver.cancel was called
+
+# A SolveBudget ran out, or the solve was cancelled
+class BudgetExceeded(Exception):
+    def __init__(self, stop_reason):
+        super().__init__(f"Solve stopped: {stop_reason}")
+        self.stop_reason = stop_reason
+
 class DirtyFlag:
     NONE = 0b00
     CLUES = 0b01 # PotentialRuns have been removed from ClueRuns
@@ -19,6 +92,49 @@ def board_dirty(dirty_flags):
 def clues_dirty(dirty_flags):
     return DirtyFlag.CLUES & dirty_flags
 
+def bit_range(start, end):
+    return ((1 << (end - start)) - 1) << start if end > start else 0
+
+def lowest_bit(mask):
+    return (mask & -mask).bit_length() - 1
+
+def highest_bit(mask):
+    return mask.bit_length() - 1
+
+# Packs a sequence of booleans into an int, with element i as bit i
+def bools_to_mask(bools):
+    return int.from_bytes(np.packbits(bools, bitorder="little").tobytes(), "little")
+
+def mask_to_bools(mask, size):
+    return np.unpackbits(np.frombuffer(mask.to_bytes((size + 7) // 8, "little"), dtype=np.uint8), count=size, bitorder="little").astype(bool)
+
+# Sets every bit that has a set bit within the next (length - 1) bits above it
+def smear_down(mask, length):
+    covered = 1
+    while covered < length:
+        step = min(covered, length - covered)
+        mask |= mask >> step
+        covered += step
+    return mask
+
+# Sets every bit that has a set bit within the previous (length - 1) bits below it
+def smear_up(mask, length):
+    covered = 1
+    while covered < length:
+        step = min(covered, length - covered)
+        mask |= mask << step
+        covered += step
+    return mask
+
+# Yields (start, end) for each run of consecutive set bits, from the lowest
+def bit_runs(mask):
+    while mask:
+        start = lowest_bit(mask)
+        shifted = mask >> start
+        length = (~shifted & (shifted + 1)).bit_length() - 1
+        yield start, start + length
+        mask &= ~bit_range(start, start + length)
+
 def axis_name(axis):
     return "cols" if axis else "rows"
 
@@ -50,6 +166,36 @@ def state_name(state):
             return "filled"
     return str(state)
 
+def rule_name(rule):
+    return ["known", "overlap", "complete run", "guaranteed run", "cross before", "cross after", "trim start",
+            "trim end", "blocked", "cascade", "uncovered", "line cache", "search", "placements"][rule]
+
+def step_name(step, rule, axis, line_index, clue_index=-1, start=-1, end=-1):
+    match step:
+        case Step.INITIAL_PASS:
+            return "Initial pass"
+        case Step.SOLVING_PASS:
+            return "Solving pass"
+        case Step.SOLVE_LINE:
+            return f"Solve line {line_name(axis, line_index)}"
+        case Step.INITIALIZE:
+            return f"Initialize ClueRun({clue_run_name(axis, line_index, clue_index)})"
+
+    match rule:
+        case Rule.OVERLAP:
+            return f"Apply ClueRun({clue_run_name(axis, line_index, clue_index)})"
+        case Rule.GUARANTEED_RUN:
+            return f"Fill guaranteed run {run_name(axis, line_index, start, end)}"
+        case Rule.CROSS_BEFORE:
+            return f"Cross before guaranteed start {tile_name(axis, line_index, start)}"
+        case Rule.CROSS_AFTER:
+            return f"Cross after guaranteed end {tile_name(axis, line_index, start)}"
+        case Rule.TRIM_START:
+            return f"ClueRun({clue_run_name(axis, line_index, clue_index)}) first to contain {run_name(axis, line_index, start, end)} so last_start={start}"
+        case Rule.TRIM_END:
+            return f"ClueRun({clue_run_name(axis, line_index, clue_index)}) last to contain {run_name(axis, line_index, start, end)} so first_end={end}"
+    return f"{rule_name(rule).capitalize()} {line_name(axis, line_index)}"
+
 def state_name_verb(state):
     match state:
         case State.CROSSED:
@@ -60,5 +206,9 @@ def state_name_verb(state):
             return "fill"
     return str(state)
 
+# Index of tiles start to end of a line, in the board
+def line_tiles(axis, line_index, start, end):
+    return (line_index, slice(start, end)) if axis == Axis.ROWS else (slice(start, end), line_index)
+
 def puzzle_and_transpose(puzzle):
     return [puzzle, puzzle.transpose()]
\ No newline at end of file
@@ -1,37 +1,62 @@
-from line_profiler_pycharm import profile
+import argparse
+import os
+import sys
 import numpy as np
 import time
 
 from functools import partial
 
-from picross_display import display_picross
-from picross_import import picross_import
+from EventLog import EventLog
+from LeanSolver import LeanSolver, lean_board
+from picross_batch import solve_batch, solve_stream
+from picross_import import picross_import, picross_read
+from picross_lockstep import solve_lockstep
+from picross_shared import solve_shared
 from Solver import Solver
+from helpers import *
 
-all_puzzle_clues = picross_import("puzzles/Large.txt")
+puzzle_file = "puzzles/Large.txt"
 
-def solve_main(i, display, display_steps=False, display_steps_on_callback=False, catch_errors=False):
-    puzzle_clues_raw = all_puzzle_clues[i]
+# Only read when first needed, so that importing this module does no work
+all_puzzle_clues = None
+
+def get_all_puzzle_clues():
+    global all_puzzle_clues
+    if all_puzzle_clues is None:
+        all_puzzle_clues = picross_import(puzzle_file)
+    return all_puzzle_clues
+
+def solve_main(i, display, display_steps=False, display_steps_on_callback=False, catch_errors=False, event_log_dir=None, **solver_options):
+    puzzle_clues_raw = get_all_puzzle_clues()[i]
     puzzle_name = f"Puzzle {i}"
 
     puzzle = np.zeros((len(puzzle_clues_raw[0]), len(puzzle_clues_raw[1])), dtype=int)
-    solver = Solver(puzzle_name, puzzle, puzzle_clues_raw, display_steps=display_steps)
+    event_log = EventLog(os.path.join(event_log_dir, f"{i}.events")) if event_log_dir is not None else None
+    solver = Solver(puzzle_name, puzzle, puzzle_clues_raw, display_steps=display_steps, event_log=event_log, **solver_options)
 
-    if catch_errors:
-        try:
+    try:
+        if catch_errors:
+            try:
+                solver.solve()
+            except Exception as e:
+                print(f"{e} occurred in Puzzle {i}")
+        else:
             solver.solve()
-        except Exception as e:
-            print(f"{e} occurred in Puzzle {i}")
-    else:
-        solver.solve()
+    finally:
+        if event_log is not None:
+            event_log.close()
 
     if display:
-        solve_callback = partial(solve_main, i, display, display_steps=display_steps_on_callback, display_steps_on_callback=display_steps_on_callback)
+        from picross_display import display_picross # matplotlib is only imported when displaying
+        solve_callback = partial(solve_main, i, display, display_steps=display_steps_on_callback, display_steps_on_callback=display_steps_on_callback, **solver_options)
         display_picross(solver, btn_solve_callback=solve_callback)
 
     return solver.verify()
 
-def solve_all_main(display_errors, puzzles_to_solve=range(len(all_puzzle_clues))):
+def solve_all_main(display_errors, puzzles_to_solve=None, event_log_dir=None, **solver_options):
+    if puzzles_to_solve is None:
+        puzzles_to_solve = range(len(get_all_puzzle_clues()))
+
     solved_count = 0
     unsolved_count = 0
 
@@ -39,7 +64,7 @@ def solve_all_main(display_errors, puzzles_to_solve=range(len(all_puzzle_clues))
 
     for i in puzzles_to_solve:
         start_time = time.time()
-        solved = solve_main(i, False)
+        solved = solve_main(i, False, event_log_dir=event_log_dir, **solver_options)
         time_elapsed += time.time() - start_time
 
         if solved:
@@ -49,11 +74,158 @@ def solve_all_main(display_errors, puzzles_to_solve=range(len(all_puzzle_clues))
             print(f"Failed to solve Puzzle {i}")
             if display_errors:
                 print(f"Resolving and displaying Puzzle {i}")
-                solve_main(i, True, display_steps_on_callback=True)
+                solve_main(i, True, display_steps_on_callback=True, **solver_options)
 
     print(f"solved:{solved_count}, unsolved:{unsolved_count}, time:{time_elapsed}")
 
-# solve_all_main(False, range(30))
-# solve_all_main(True)
-solve_all_main(False)
-# solve_main(16, True)
\ No newline at end of file
+def solve_all_parallel_main(puzzles_to_solve=None, workers=None, chunk_size=8, event_log_dir=None, **solver_options):
+    solved_count = 0
+    unsolved_count = 0
+
+    start_time = time.time()
+
+    for result in solve_batch(get_all_puzzle_clues(), puzzles_to_solve, workers=workers, chunk_size=chunk_size, ordered=False, event_log_dir=event_log_dir, **solver_options):
+        if result.solved:
+            solved_count = solved_count + 1
+        else:
+            unsolved_count = unsolved_count + 1
+            print(f"Failed to solve Puzzle {result.index}" + (f" ({result.error})" if result.error else ""))
+
+    print(f"solved:{solved_count}, unsolved:{unsolved_count}, time:{time.time() - start_time}")
+
+# Solve puzzles of the same size together as array operations, handing any that stall to a Solver
+def solve_all_lockstep_main(puzzles_to_solve=None, **solver_options):
+    solved_count = 0
+    unsolved_count = 0
+
+    start_time = time.time()
+
+    for result in solve_lockstep(get_all_puzzle_clues(), puzzles_to_solve, **solver_options):
+        if result.solved:
+            solved_count = solved_count + 1
+        else:
+            unsolved_count = unsolved_count + 1
+            print(f"Failed to solve Puzzle {result.index}" + (f" ({result.error})" if result.error else ""))
+
+    print(f"solved:{solved_count}, unsolved:{unsolved_count}, time:{time.time() - start_time}")
+
+# Solve each puzzle in turn, with its lines split between worker processes sharing its board
+def solve_all_shared_main(puzzles_to_solve=None, workers=None, **solver_options):
+    solved_count = 0
+    unsolved_count = 0
+
+    start_time = time.time()
+
+    all_puzzle_clues = get_all_puzzle_clues()
+    for i in puzzles_to_solve or range(len(all_puzzle_clues)):
+        result = solve_shared(all_puzzle_clues[i], workers=workers, **solver_options)
+        if result.complete:
+            solved_count = solved_count + 1
+        else:
+            unsolved_count = unsolved_count + 1
+            print(f"Failed to solve Puzzle {i} ({result.stop_reason}, {result.known_fraction():.1%} known)")
+
+    print(f"solved:{solved_count}, unsolved:{unsolved_count}, time:{time.time() - start_time}")
+
+# Solve each puzzle with a LeanSolver, optionally with its board in a memory-mapped file, which each puzzle overwrites
+def solve_all_lean_main(puzzles_to_solve=None, memmap_file=None, time_limit=None, max_passes=None):
+    solved_count = 0
+    unsolved_count = 0
+
+    start_time = time.time()
+
+    all_puzzle_clues = get_all_puzzle_clues()
+    for i in puzzles_to_solve or range(len(all_puzzle_clues)):
+        puzzle_clues_raw = all_puzzle_clues[i]
+        puzzle = lean_board((len(puzzle_clues_raw[0]), len(puzzle_clues_raw[1])), memmap_file)
+        solver = LeanSolver(f"Puzzle {i}", puzzle, puzzle_clues_raw, time_limit=time_limit, max_passes=max_passes)
+        result = solver.solve()
+        if result.complete and solver.verify():
+            solved_count = solved_count + 1
+        else:
+            unsolved_count = unsolved_count + 1
+            print(f"Failed to solve Puzzle {i} ({result.stop_reason}, {result.known_fraction():.1%} known)")
+
+    print(f"solved:{solved_count}, unsolved:{unsolved_count}, time:{time.time() - start_time}")
+
+# Solve a puzzle file while it is being read, so the file can be larger than memory
+def solve_stream_main(filename, workers=None, chunk_size=8, event_log_dir=None, **solver_options):
+    solved_count = 0
+    unsolved_count = 0
+
+    start_time = time.time()
+
+    for result in solve_stream(picross_read(filename), workers=workers, chunk_size=chunk_size, ordered=False, event_log_dir=event_log_dir, **solver_options):
+        if result.solved:
+            solved_count = solved_count + 1
+        else:
+            unsolved_count = unsolved_count + 1
+            print(f"Failed to solve Puzzle {result.index} \"{result.title}\" on line {result.line_number}" + (f" ({result.error})" if result.error else ""))
+
+    print(f"solved:{solved_count}, unsolved:{unsolved_count}, time:{time.time() - start_time}")
+
+def main(argv=None):
+    global puzzle_file
+
+    parser = argparse.ArgumentParser(description="Solve the puzzles of a puzzle file.")
+    parser.add_argument("--file", default=puzzle_file, help="Puzzle file to solve")
+    parser.add_argument("--puzzle", type=int, action="append", help="Index of a puzzle to solve (repeatable, default all)")
+    parser.add_argument("--display", action="store_true", help="Display each solved puzzle")
+    parser.add_argument("--display-steps", action="store_true", help="Display the board after every change")
+    parser.add_argument("--display-errors", action="store_true", help="Display puzzles that fail to solve")
+    parser.add_argument("--parallel", action="store_true", help="Solve in worker processes")
+    parser.add_argument("--stream", action="store_true", help="Solve in worker processes while the file is read")
+    parser.add_argument("--lockstep", action="store_true", help="Solve puzzles of the same size together as array operations")
+    parser.add_argument("--shared", action="store_true", help="Solve one puzzle at a time, its lines split between worker processes sharing the board")
+    parser.add_argument("--lean", action="store_true", help="Solve with a LeanSolver, which keeps only a byte per tile and flat arrays of clue runs")
+    parser.add_argument("--memmap", metavar="FILE", help="With --lean, keep each board in this file instead of in memory. "
+                        "The file is overwritten by each puzzle in turn, so only the last board is left in it.")
+    parser.add_argument("--workers", type=int, help="Number of worker processes (default one per CPU)")
+    # Left unset by default, so that --lean can tell they were given
+    parser.add_argument("--engine", choices=[Engine.OBJECTS, Engine.BITSET], help=f"(default {Engine.OBJECTS})")
+    parser.add_argument("--schedule", choices=[Schedule.SWEEP, Schedule.QUEUE, Schedule.PRIORITY], help=f"(default {Schedule.SWEEP})")
+    parser.add_argument("--line-logic", choices=[LineLogic.RULES, LineLogic.PLACEMENTS],
+                        help=f"Solve lines by hand-written rules, or exactly from every placement of their clues (default {LineLogic.RULES})")
+    parser.add_argument("--search", action="store_true", help="Guess tiles once line logic stalls")
+    parser.add_argument("--time-limit", type=float, help="Most seconds each puzzle can take")
+    parser.add_argument("--max-passes", type=int, help="Most solving passes of each puzzle")
+    parser.add_argument("--event-log", metavar="DIR", help="Record each solve to DIR/<puzzle>.events, to be replayed with picross_replay")
+    args = parser.parse_args(argv)
+
+    # A LeanSolver always solves lines from their placements, in sweeps, with no search or event log
+    if args.lean:
+        lean_conflicts = [flag for flag, value in [("--engine", args.engine), ("--schedule", args.schedule), ("--line-logic", args.line_logic),
+                                                   ("--search", args.search), ("--event-log", args.event_log)] if value]
+        if lean_conflicts:
+            parser.error(f"{', '.join(lean_conflicts)} can't be used with --lean")
+    elif args.memmap is not None:
+        parser.error("--memmap can only be used with --lean")
+
+    puzzle_file = args.file
+    solver_options = {"engine": args.engine or Engine.OBJECTS, "schedule": args.schedule or Schedule.SWEEP,
+                      "line_logic": args.line_logic or LineLogic.RULES, "search": args.search,
+                      "time_limit": args.time_limit, "max_passes": args.max_passes}
+
+    if args.event_log is not None:
+        os.makedirs(args.event_log, exist_ok=True)
+
+    if args.stream:
+        solve_stream_main(args.file, workers=args.workers, event_log_dir=args.event_log, **solver_options)
+    elif args.lockstep:
+        solve_all_lockstep_main(args.puzzle, **solver_options)
+    elif args.lean:
+        solve_all_lean_main(args.puzzle, args.memmap, time_limit=args.time_limit, max_passes=args.max_passes)
+    elif args.shared:
+        solve_all_shared_main(args.puzzle, workers=args.workers, **solver_options)
+    elif args.parallel:
+        solve_all_parallel_main(args.puzzle, workers=args.workers, event_log_dir=args.event_log, **solver_options)
+    elif args.display or args.display_steps:
+        for i in args.puzzle or range(len(get_all_puzzle_clues())):
+            solve_main(i, True, display_steps=args.display_steps, display_steps_on_callback=args.display_steps, event_log_dir=args.event_log, **solver_options)
+    else:
+        solve_all_main(args.display_errors, args.puzzle, event_log_dir=args.event_log, **solver_options)
+    return 0
+
+# Worker processes may import this module, so only solve when run directly
+if __name__ == "__main__":
+    sys.exit(main())
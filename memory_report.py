@@ -0,0 +1,79 @@
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from LeanSolver import LeanSolver, lean_board
+from picross_generate import generate_puzzle
+from picross_import import picross_import
+from Solver import Solver
+from helpers import *
+
+# Clues of a random bitmap, so that boards of any size can be measured
+def random_puzzle_clues(size, density=0.6, seed=0):
+    return generate_puzzle(size, size, density, "random", seed)[1]
+
+# Bytes allocated by building a Solver's object graph, before solving
+def measure_setup(puzzle_clues_raw, solver_options):
+    puzzle = np.zeros((len(puzzle_clues_raw[0]), len(puzzle_clues_raw[1])), dtype=int)
+
+    tracemalloc.start()
+    solver = Solver("Memory", puzzle, puzzle_clues_raw, display_steps=False, **solver_options)
+    solver.initialize_clue_runs()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return allocated, puzzle.size
+
+# Peak bytes allocated while building and solving a LeanSolver, and the seconds the solve took. The clue lists are
+# made beforehand, so they aren't counted, and neither is a memmap board, which is kept in its file.
+def measure_lean_peak(puzzle_clues_raw, memmap=False):
+    shape = (len(puzzle_clues_raw[0]), len(puzzle_clues_raw[1]))
+    with tempfile.TemporaryDirectory() as directory:
+        tracemalloc.start()
+        board = lean_board(shape, os.path.join(directory, "board") if memmap else None)
+        start_time = time.perf_counter()
+        LeanSolver("Memory", board, puzzle_clues_raw).solve()
+        time_elapsed = time.perf_counter() - start_time
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del board
+
+    return peak, shape[0] * shape[1], time_elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the memory used by the Solver's object graph.")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[25, 50, 100])
+    parser.add_argument("--engine", default=Engine.OBJECTS, choices=[Engine.OBJECTS, Engine.BITSET])
+    parser.add_argument("--lean", action="store_true", help="Measure the peak memory of solving with a LeanSolver instead")
+    parser.add_argument("--memmap", action="store_true", help="With --lean, keep each board in a memory-mapped file")
+    args = parser.parse_args()
+    solver_options = {"engine": args.engine}
+
+    if args.lean:
+        for size in args.sizes:
+            peak, cells, time_elapsed = measure_lean_peak(random_puzzle_clues(size), args.memmap)
+            print(f"{size}x{size} random: {peak / (1 << 20):.1f} MiB peak, {peak / cells:.1f} B/cell, solved in {time_elapsed:.1f}s")
+        return
+
+    for size in args.sizes:
+        allocated, cells = measure_setup(random_puzzle_clues(size), solver_options)
+        print(f"{size}x{size} random: {allocated / 1024:.0f} KiB, {allocated / cells:.0f} B/cell")
+
+    all_puzzle_clues = picross_import("puzzles/Large.txt")
+    allocations = [measure_setup(puzzle_clues_raw, solver_options) for puzzle_clues_raw in all_puzzle_clues]
+    total_allocated = sum(allocated for allocated, _ in allocations)
+    total_cells = sum(cells for _, cells in allocations)
+    print(f"Large.txt: {total_allocated / total_cells:.0f} B/cell on average, {max(allocated for allocated, _ in allocations) / 1024:.0f} KiB largest puzzle")
+
+    start_time = time.perf_counter()
+    for puzzle_clues_raw in all_puzzle_clues:
+        puzzle = np.zeros((len(puzzle_clues_raw[0]), len(puzzle_clues_raw[1])), dtype=int)
+        Solver("Memory", puzzle, puzzle_clues_raw, display_steps=False, **solver_options).solve()
+    print(f"Large.txt: solved in {time.perf_counter() - start_time:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import numpy as np
+
+from Solver import Solver
+from helpers import *
+from picross_import import parse_puzzle_line
+
+# Library entry point. Nothing here displays anything or imports matplotlib.
+
+def solve(row_clues, col_clues, puzzle=None, **solver_options):
+    """
+    Solve a puzzle from its clues.
+
+    :param row_clues: Run lengths of each row, from the top, such as [[3], [1, 1]]
+    :param col_clues: Run lengths of each column, from the left
+    :param puzzle: Board of tiles known from the start, which isn't modified. None for a blank board.
+    :param solver_options: Keyword arguments passed on to Solver, such as engine, schedule, search or time_limit
+    :return: Board of shape (rows, cols) holding State.FILLED, State.CROSSED, or State.UNKNOWN where the puzzle
+        couldn't be solved, or wasn't reached before a budget ran out. Raises Contradiction if the clues can't be
+        satisfied.
+    """
+    return solve_with_stats(row_clues, col_clues, puzzle, **solver_options)[0]
+
+def solve_with_stats(row_clues, col_clues, puzzle=None, **solver_options):
+    """
+    Same as solve, but also returns the SolveStats of the solve.
+
+    :return: (board, SolveStats)
+    """
+    result = solve_with_result(row_clues, col_clues, puzzle, **solver_options)
+    return result.board, result.stats
+
+def solve_with_result(row_clues, col_clues, puzzle=None, **solver_options):
+    """
+    Same as solve, but returns the SolveResult of the solve, which also says why it stopped.
+    """
+    if puzzle is None:
+        puzzle = np.zeros((len(row_clues), len(col_clues)), dtype=int)
+    else:
+        puzzle = np.array(puzzle, dtype=int)
+
+    solver = Solver("Puzzle", puzzle, [row_clues, col_clues], display_steps=False, **solver_options)
+    return solver.solve()
+
+def solve_text(line, **solver_options):
+    """
+    Solve a puzzle written as in the puzzle files, such as "5x5\tTitle\t1,1:5:5:3:1-2:4:4:4:2". The size and title
+    are optional.
+
+    :return: Board, as returned by solve
+    """
+    _, (row_clues, col_clues) = parse_puzzle_line(line)
+    return solve(row_clues, col_clues, **solver_options)
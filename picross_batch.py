@@ -0,0 +1,155 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+import numpy as np
+
+from EventLog import EventLog
+from LineCache import LineCache
+from PuzzleCorpus import PuzzleCorpus
+from Solver import Solver
+
+# Each worker process keeps one LineCache, shared by every puzzle it solves
+worker_line_cache = None
+
+# Each worker process maps a compiled corpus once, and reads the puzzles it is sent from it
+worker_corpora = {}
+
+class PuzzleResult:
+    def __init__(self, index, solved, time_elapsed, pass_count, error=None, title=None, line_number=None, stats=None, board=None):
+        self.index = index
+        self.title = title
+        self.line_number = line_number
+        self.solved = solved
+        self.time_elapsed = time_elapsed
+        self.pass_count = pass_count
+        self.error = error
+        self.stats = stats # SolveStats of the solve
+        self.board = board # Solved board, when kept by the solving process
+
+    def __repr__(self):
+        return f"PuzzleResult(index={self.index}, title={self.title!r}, line_number={self.line_number}, solved={self.solved}, time_elapsed={self.time_elapsed:.4f}, pass_count={self.pass_count}, error={self.error!r})"
+
+def solve_puzzle(index, puzzle_clues_raw, solver_options, title=None, line_number=None, event_log_dir=None):
+    puzzle = np.zeros((len(puzzle_clues_raw[0]), len(puzzle_clues_raw[1])), dtype=int)
+    event_log = EventLog(os.path.join(event_log_dir, f"{index}.events")) if event_log_dir is not None else None
+    solver = Solver(f"Puzzle {index}" + (f" {title}" if title else ""), puzzle, puzzle_clues_raw, display_steps=False, event_log=event_log, **solver_options)
+
+    start_time = time.perf_counter()
+    try:
+        solver.solve()
+    except Exception as e:
+        return PuzzleResult(index, False, time.perf_counter() - start_time, solver.pass_count, f"{type(e).__name__}: {e}", title, line_number, solver.stats)
+    finally:
+        if event_log is not None:
+            event_log.close()
+    time_elapsed = time.perf_counter() - start_time
+
+    return PuzzleResult(index, solver.verify(), time_elapsed, solver.pass_count, title=title, line_number=line_number, stats=solver.stats)
+
+def solve_chunk(chunk, solver_options, line_cache_size=None, corpus_filename=None, event_log_dir=None):
+    global worker_line_cache
+    if line_cache_size:
+        if worker_line_cache is None:
+            worker_line_cache = LineCache(line_cache_size)
+        solver_options = dict(solver_options, line_cache=worker_line_cache)
+
+    # With a corpus, the chunk only holds puzzle indices
+    if corpus_filename is not None:
+        if corpus_filename not in worker_corpora:
+            worker_corpora[corpus_filename] = PuzzleCorpus(corpus_filename)
+        chunk = [(record.index, record.title, record.line_number, record.clues) for record in worker_corpora[corpus_filename].records(chunk)]
+
+    return [solve_puzzle(index, puzzle_clues_raw, solver_options, title, line_number, event_log_dir) for index, title, line_number, puzzle_clues_raw in chunk]
+
+def solve_batch(all_puzzle_clues, puzzles_to_solve=None, workers=None, chunk_size=1, ordered=True, line_cache_size=None, event_log_dir=None, **solver_options):
+    """
+    Solve puzzles in a pool of worker processes, yielding a PuzzleResult for each one.
+
+    :param all_puzzle_clues: Puzzle clues as returned by picross_import
+    :param puzzles_to_solve: Indices of the puzzles to solve, or None for all of them
+    :param workers: Number of worker processes, or None for one per CPU
+    :param chunk_size: Number of puzzles sent to a worker at a time
+    :param ordered: If True, results are yielded in input order, otherwise as soon as their chunk completes
+    :param line_cache_size: If set, each worker shares a LineCache of this size between all of its puzzles
+    :param event_log_dir: If set, each solve is recorded to an EventLog named <index>.events in this directory
+    :param solver_options: Keyword arguments passed on to each Solver, such as engine or schedule
+    """
+    if puzzles_to_solve is None:
+        puzzles_to_solve = range(len(all_puzzle_clues))
+
+    puzzles = ((i, None, None, all_puzzle_clues[i]) for i in puzzles_to_solve)
+    yield from solve_pipeline(puzzles, workers, chunk_size, ordered, line_cache_size, solver_options, event_log_dir=event_log_dir)
+
+def solve_stream(puzzle_records, workers=None, chunk_size=1, ordered=True, line_cache_size=None, event_log_dir=None, **solver_options):
+    """
+    Solve puzzles as they are read, yielding a PuzzleResult for each one. Only a few chunks per worker are read ahead,
+    so memory stays flat however many puzzles there are, and the first results arrive while the rest are still unread.
+
+    :param puzzle_records: Iterable of PuzzleRecord, such as from picross_read
+    :param workers: Number of worker processes, None for one per CPU, or 0 to solve in this process
+    :param chunk_size: Number of puzzles sent to a worker at a time
+    :param ordered: If True, results are yielded in input order, otherwise as soon as their chunk completes
+    :param line_cache_size: If set, each worker shares a LineCache of this size between all of its puzzles
+    :param event_log_dir: If set, each solve is recorded to an EventLog named <index>.events in this directory
+    :param solver_options: Keyword arguments passed on to each Solver, such as engine or schedule
+    """
+    puzzles = ((record.index, record.title, record.line_number, record.clues) for record in puzzle_records)
+    yield from solve_pipeline(puzzles, workers, chunk_size, ordered, line_cache_size, solver_options, event_log_dir=event_log_dir)
+
+def solve_corpus(corpus_filename, puzzles_to_solve=None, workers=None, chunk_size=1, ordered=True, line_cache_size=None, event_log_dir=None, **solver_options):
+    """
+    Solve puzzles from a compiled corpus, yielding a PuzzleResult for each one. Workers are only sent puzzle indices,
+    and read just those puzzles from their own map of the corpus.
+
+    :param corpus_filename: Corpus written by picross_corpus.compile_corpus
+    :param puzzles_to_solve: Indices of the puzzles to solve, or None for all of them
+    :param workers: Number of worker processes, None for one per CPU, or 0 to solve in this process
+    :param chunk_size: Number of puzzles sent to a worker at a time
+    :param ordered: If True, results are yielded in input order, otherwise as soon as their chunk completes
+    :param line_cache_size: If set, each worker shares a LineCache of this size between all of its puzzles
+    :param event_log_dir: If set, each solve is recorded to an EventLog named <index>.events in this directory
+    :param solver_options: Keyword arguments passed on to each Solver, such as engine or schedule
+    """
+    if puzzles_to_solve is None:
+        with PuzzleCorpus(corpus_filename) as corpus:
+            puzzles_to_solve = range(len(corpus))
+
+    yield from solve_pipeline(puzzles_to_solve, workers, chunk_size, ordered, line_cache_size, solver_options, corpus_filename, event_log_dir)
+
+# Chunks waiting in the pool for each worker, so that no worker runs out of work while its results are collected
+CHUNKS_PER_WORKER = 2
+
+def solve_pipeline(puzzles, workers, chunk_size, ordered, line_cache_size, solver_options, corpus_filename=None, event_log_dir=None):
+    puzzles = iter(puzzles)
+    chunks = iter(lambda: list(islice(puzzles, chunk_size)), [])
+
+    if workers == 0:
+        for chunk in chunks:
+            yield from solve_chunk(chunk, solver_options, line_cache_size, corpus_filename, event_log_dir)
+        return
+
+    max_pending = CHUNKS_PER_WORKER * (workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(solve_chunk, chunk, solver_options, line_cache_size, corpus_filename, event_log_dir))
+
+            # Wait for a chunk to finish before reading the next one
+            if len(pending) >= max_pending:
+                yield from collect_chunk(pending, ordered)
+
+        while pending:
+            yield from collect_chunk(pending, ordered)
+
+# Remove a finished chunk from pending and return its results. Waits for the oldest chunk if ordered.
+def collect_chunk(pending, ordered):
+    if ordered:
+        return pending.popleft().result()
+
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    future = next(iter(done))
+    pending.remove(future)
+    return future.result()
@@ -0,0 +1,106 @@
+import argparse
+import sys
+from array import array
+
+import numpy as np
+
+from PuzzleCorpus import CORPUS_HEADER, CORPUS_MAGIC, CORPUS_SECTION_OFFSETS, CORPUS_SECTIONS, CORPUS_VERSION, PuzzleCorpus
+from picross_import import picross_read
+
+# Sections start on this boundary so that their arrays are aligned
+SECTION_ALIGNMENT = 8
+
+# Clue run lengths are buffered and written in blocks of this many
+CLUE_BUFFER_SIZE = 1 << 16
+
+def write_clues(file, clue_buffer):
+    if sys.byteorder == "big":
+        clue_buffer.byteswap()
+    clue_buffer.tofile(file)
+    del clue_buffer[:]
+
+def write_section(file, values, dtype):
+    padding = -file.tell() % SECTION_ALIGNMENT
+    file.write(b"\0" * padding)
+    offset = file.tell()
+    file.write(np.asarray(values, dtype=np.dtype(dtype).newbyteorder("<")).tobytes())
+    return offset
+
+def compile_corpus(puzzle_records, output_filename):
+    """
+    Write puzzles to a binary corpus that PuzzleCorpus can open. The clues are written as they are read, so only the
+    offsets are kept in memory.
+
+    :param puzzle_records: Iterable of PuzzleRecord, such as from picross_read, or the filename of a puzzle text file
+    :param output_filename: File to write the corpus to
+    :return: Number of puzzles written
+    """
+    if isinstance(puzzle_records, str):
+        puzzle_records = picross_read(puzzle_records)
+
+    clue_count = 0
+    clue_buffer = array('H')
+    line_starts = array('q', [0])
+    puzzle_starts = array('q', [0])
+    row_counts = array('i')
+    line_numbers = array('q')
+    title_starts = array('q', [0])
+    titles = bytearray()
+
+    with open(output_filename, 'wb') as file:
+        header_size = CORPUS_HEADER.size + CORPUS_SECTION_OFFSETS.size
+        file.write(b"\0" * header_size)
+
+        clues_offset = file.tell()
+        for record in puzzle_records:
+            row_clues, col_clues = record.clues
+            for clue_run_lengths in row_clues + col_clues:
+                try:
+                    clue_buffer.extend(clue_run_lengths)
+                except OverflowError:
+                    raise ValueError(f"Puzzle {record.index} on line {record.line_number} has a clue too large for the corpus format")
+                clue_count += len(clue_run_lengths)
+                line_starts.append(clue_count)
+
+            if len(clue_buffer) >= CLUE_BUFFER_SIZE:
+                write_clues(file, clue_buffer)
+
+            puzzle_starts.append(len(line_starts) - 1)
+            row_counts.append(len(row_clues))
+            line_numbers.append(record.line_number)
+            titles += record.title.encode("utf-8")
+            title_starts.append(len(titles))
+
+        write_clues(file, clue_buffer)
+
+        sections = {
+            "line_starts": line_starts,
+            "puzzle_starts": puzzle_starts,
+            "row_counts": row_counts,
+            "line_numbers": line_numbers,
+            "title_starts": title_starts,
+            "titles": titles,
+        }
+        section_offsets = [clues_offset if name == "clues" else write_section(file, sections[name], dtype)
+                           for name, dtype in CORPUS_SECTIONS]
+
+        puzzle_count = len(row_counts)
+        file.seek(0)
+        file.write(CORPUS_HEADER.pack(CORPUS_MAGIC, CORPUS_VERSION, 0, puzzle_count, len(line_starts) - 1, clue_count))
+        file.write(CORPUS_SECTION_OFFSETS.pack(*section_offsets))
+
+    return puzzle_count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile a puzzle text file to a binary corpus that can be memory-mapped.")
+    parser.add_argument("input", help="Puzzle text file, in the format read by picross_import")
+    parser.add_argument("output", help="Binary corpus file to write")
+    args = parser.parse_args(argv)
+
+    puzzle_count = compile_corpus(args.input, args.output)
+    with PuzzleCorpus(args.output) as corpus:
+        print(f"Compiled {puzzle_count} puzzles from {args.input} to {args.output} ({len(corpus.clues)} clue runs)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
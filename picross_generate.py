@@ -0,0 +1,104 @@
+import argparse
+import sys
+
+import numpy as np
+
+from helpers import *
+
+# Synthetic puzzles of any size, with clues derived from a generated bitmap. Random bitmaps have little structure for
+# line logic to work with, while blob bitmaps are made of smooth shapes, more like drawn puzzles.
+
+def random_bitmap(height, width, density=0.6, rng=None):
+    rng = np.random.default_rng(rng)
+    return rng.random((height, width)) < density
+
+def blob_bitmap(height, width, density=0.6, rng=None, radius=None):
+    """
+    Smooth random shapes, from noise blurred over radius tiles and thresholded so that exactly the given fraction of
+    tiles is filled.
+
+    :param radius: Size of the shapes, by default a twentieth of the board
+    """
+    rng = np.random.default_rng(rng)
+    if radius is None:
+        radius = max(1, min(height, width) // 20)
+
+    noise = box_blur(rng.random((height, width)), radius)
+    filled_count = round(density * noise.size)
+    bitmap = np.zeros(noise.size, dtype=bool)
+    if filled_count:
+        bitmap[np.argsort(noise, axis=None)[-filled_count:]] = True
+    return bitmap.reshape(noise.shape)
+
+# Mean of the values within radius along each axis, with the edges extended
+def box_blur(values, radius):
+    for axis in [Axis.ROWS, Axis.COLS]:
+        padded = np.pad(values, [(radius, radius) if i == axis else (0, 0) for i in range(values.ndim)], mode="edge")
+        sums = np.cumsum(padded, axis=axis)
+        sums = np.insert(sums, 0, 0, axis=axis)
+        window = 2 * radius + 1
+        values = (np.take(sums, range(window, sums.shape[axis]), axis=axis) - np.take(sums, range(sums.shape[axis] - window), axis=axis)) / window
+    return values
+
+BITMAPS = {
+    "random": random_bitmap,
+    "blobs": blob_bitmap,
+}
+
+# Run lengths of each row of a bitmap, with [0] for an empty row, as in the puzzle files
+def bitmap_line_clues(bitmap):
+    padded = np.zeros((bitmap.shape[0], bitmap.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = bitmap
+    edges = np.diff(padded, axis=1)
+
+    # Both are in row order, so the nth start and the nth end belong to the same run
+    run_rows, run_starts = np.nonzero(edges == 1)
+    _, run_ends = np.nonzero(edges == -1)
+    row_bounds = np.searchsorted(run_rows, np.arange(1, bitmap.shape[0]))
+    return [run_lengths.tolist() or [0] for run_lengths in np.split(run_ends - run_starts, row_bounds)]
+
+def bitmap_clues(bitmap):
+    """
+    :return: Clues of the bitmap, in the nested lists returned by picross_import
+    """
+    return [bitmap_line_clues(view) for view in puzzle_and_transpose(np.asarray(bitmap, dtype=bool))]
+
+def generate_puzzle(height, width, density=0.6, kind="blobs", seed=None):
+    """
+    :return: (bitmap, clues) of a new puzzle. The bitmap is one solution of the clues, though not always the only one.
+    """
+    bitmap = BITMAPS[kind](height, width, density, np.random.default_rng(seed))
+    return bitmap, bitmap_clues(bitmap)
+
+# A line of a puzzle file, as read by picross_import.parse_puzzle_line
+def puzzle_text(clues, title=""):
+    row_clues, col_clues = clues
+    clue_text = "-".join(":".join(",".join(str(run_length) for run_length in clue_run_lengths) for clue_run_lengths in axis_clues)
+                         for axis_clues in clues)
+    return f"{len(col_clues)}x{len(row_clues)}\t{title}\t{clue_text}"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a puzzle file of generated puzzles.")
+    parser.add_argument("output", help="Puzzle file to write")
+    parser.add_argument("--size", type=int, default=100, help="Width and height of the puzzles")
+    parser.add_argument("--width", type=int, help="Width of the puzzles, if not square")
+    parser.add_argument("--height", type=int, help="Height of the puzzles, if not square")
+    parser.add_argument("--density", type=float, default=0.6, help="Fraction of tiles filled")
+    parser.add_argument("--kind", default="blobs", choices=list(BITMAPS))
+    parser.add_argument("--count", type=int, default=1, help="Number of puzzles")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the first puzzle. Each puzzle after it uses the next seed.")
+    args = parser.parse_args(argv)
+
+    height = args.height or args.size
+    width = args.width or args.size
+    with open(args.output, "w") as file:
+        for i in range(args.count):
+            seed = args.seed + i
+            _, clues = generate_puzzle(height, width, args.density, args.kind, seed)
+            file.write(puzzle_text(clues, f"{args.kind} {width}x{height} density {args.density} seed {seed}") + "\n")
+
+    print(f"Wrote {args.count} {width}x{height} {args.kind} puzzles to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,55 @@
-def picross_import(filename):
-    with open(filename, 'r') as file:
-        lines = file.readlines()
+class PuzzleRecord:
+    def __init__(self, index, line_number, width, height, title, clues):
+        self.index = index
+        self.line_number = line_number
+        self.width = width
+        self.height = height
+        self.title = title
+        self.clues = clues
+
+    def __repr__(self):
+        return f"PuzzleRecord(index={self.index}, line_number={self.line_number}, size={self.width}x{self.height}, title={self.title!r})"
+
+# Parse one line of a puzzle file: "<width>x<height>\t<title>\t<row clues>-<col clues>"
+def parse_puzzle_line(line):
+    line = line.rstrip('\r\n')
+
+    # The clues follow the last tab or space, since titles can contain spaces
+    separator_index = max(line.rfind('\t'), line.rfind(' '))
+    header = line[:max(separator_index, 0)]
+    data = line[separator_index + 1:]
+
+    # The title follows the dimensions. The dimensions aren't always accurate, so the size is taken from the clues instead.
+    header_sections = header.split(None, 1)
+    title = header_sections[1] if len(header_sections) > 1 else ""
 
-    result = []
-    for line in lines:
-        # Ignore the dimensions and title
-        data = line[max(line.rfind('\t'), line.rfind(' ')) + 1:]
+    # Split on the dash
+    sections = data.split('-')
 
-        # Split on the dash
-        sections = data.split('-')
+    # Split on the colons and the commas
+    clues = [[[int(num) for num in item.split(',')] for item in sec.split(':')] for sec in sections]
+    return title.strip(), clues
 
-        # Split on the colons and the commas
-        arrays = [[[int(num) for num in item.split(',')] for item in sec.split(':')] for sec in sections]
-        result.append(arrays)
+def picross_read(file):
+    """
+    Read puzzles one at a time, without loading the whole file.
 
-    return result
+    :param file: A filename, or an open text file or other iterable of lines
+    :return: Generator of PuzzleRecord, one per non-blank line
+    """
+    if isinstance(file, str):
+        with open(file, 'r') as opened_file:
+            yield from picross_read(opened_file)
+        return
+
+    index = 0
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+
+        title, clues = parse_puzzle_line(line)
+        yield PuzzleRecord(index, line_number, len(clues[1]), len(clues[0]), title, clues)
+        index += 1
+
+def picross_import(filename):
+    return [record.clues for record in picross_read(filename)]
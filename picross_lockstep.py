@@ -0,0 +1,241 @@
+import time
+
+import numpy as np
+
+from SolveStats import SolveStats
+from Solver import Solver
+from helpers import *
+from picross_batch import PuzzleResult
+from picross_overlap import pad_clues
+
+# Lockstep solving of many small puzzles at once. Puzzles of the same size are stacked into one 3-D board array, and
+# each pass solves every changed row of every puzzle in the stack, then every changed column, as whole-array
+# operations. For boards of a few hundred tiles, that costs far less than building a Solver and its Tiles and
+# ClueRuns for each puzzle. Puzzles drop out of the stack once they're complete, and any that line logic can't finish
+# are handed to a regular Solver, along with the tiles found so far.
+
+def solve_lockstep(all_puzzle_clues, puzzles_to_solve=None, max_stack_size=1024, **solver_options):
+    """
+    Solve many puzzles, stacking those of the same size and solving each stack in lockstep.
+
+    :param all_puzzle_clues: Clues of each puzzle, as returned by picross_import
+    :param puzzles_to_solve: Indices of the puzzles to solve, by default all of them
+    :param max_stack_size: Most puzzles solved in one stack, which bounds the memory of each pass
+    :param solver_options: Keyword arguments passed on to the Solver of each puzzle lockstep solving couldn't finish
+    :return: List of PuzzleResult, in the order of puzzles_to_solve, each holding its puzzle's board. The time of a
+        stack is split evenly between its puzzles.
+    """
+    if puzzles_to_solve is None:
+        puzzles_to_solve = range(len(all_puzzle_clues))
+
+    stacks = {}
+    for i in puzzles_to_solve:
+        puzzle_clues_raw = all_puzzle_clues[i]
+        stacks.setdefault((len(puzzle_clues_raw[Axis.ROWS]), len(puzzle_clues_raw[Axis.COLS])), []).append(i)
+
+    results = {}
+    for (num_rows, num_cols), indices in stacks.items():
+        for stack_start in range(0, len(indices), max_stack_size):
+            stack_indices = indices[stack_start:stack_start + max_stack_size]
+            stack_clues = [all_puzzle_clues[i] for i in stack_indices]
+            for result in solve_stack(stack_indices, stack_clues, num_rows, num_cols, solver_options):
+                results[result.index] = result
+
+    return [results[i] for i in puzzles_to_solve]
+
+def solve_stack(indices, stack_clues, num_rows, num_cols, solver_options):
+    start_time = time.perf_counter()
+    puzzle_count = len(indices)
+    boards = np.zeros((puzzle_count, num_rows, num_cols), dtype=np.int8)
+
+    # Clues of every line of the stack along each axis, with the lines of each puzzle together
+    axis_clues = []
+    for axis in [Axis.ROWS, Axis.COLS]:
+        axis_clues.append(pad_clues([[run_length for run_length in clue_run_lengths if run_length]
+                                     for puzzle_clues_raw in stack_clues for clue_run_lengths in puzzle_clues_raw[axis]]))
+
+    passes = np.zeros(puzzle_count, dtype=int)
+    line_solves = np.zeros(puzzle_count, dtype=int)
+    solvable = np.ones(puzzle_count, dtype=bool)
+    active = np.ones(puzzle_count, dtype=bool)
+    dirty = [np.ones((puzzle_count, num_rows), dtype=bool), np.ones((puzzle_count, num_cols), dtype=bool)]
+
+    while active.any():
+        changed = np.zeros(puzzle_count, dtype=bool)
+        for axis in [Axis.ROWS, Axis.COLS]:
+            changed |= solve_stack_lines(boards, axis, axis_clues[axis], dirty, active, solvable, line_solves)
+        passes[active] += 1
+
+        # Complete puzzles drop out, and so do those that stalled or that some line's clue can't be satisfied in
+        complete = ~(boards == State.UNKNOWN).any(axis=(1, 2))
+        active &= changed & solvable & ~complete
+
+    # The last tiles of a puzzle can complete it before the lines across them are solved again, so check every line
+    complete = ~(boards == State.UNKNOWN).any(axis=(1, 2))
+    verified = complete & solvable
+    for axis in [Axis.ROWS, Axis.COLS]:
+        verified &= lines_solvable(boards, axis, axis_clues[axis], verified)
+
+    stack_time = (time.perf_counter() - start_time) / puzzle_count
+    for i, index in enumerate(indices):
+        stats = SolveStats()
+        stats.passes = int(passes[i])
+        stats.line_solves = int(line_solves[i])
+        stats.phase_times["lockstep"] = stack_time
+
+        if verified[i]:
+            yield PuzzleResult(index, True, stack_time, stats.passes, stats=stats, board=boards[i].astype(int))
+            continue
+
+        # Line logic stalled, or hit a contradiction that the Solver will report
+        board = boards[i].astype(int)
+        solver = Solver(f"Puzzle {index}", board, stack_clues[i], display_steps=False, **solver_options)
+        solver_start_time = time.perf_counter()
+        error = None
+        try:
+            solver.solve()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        time_elapsed = stack_time + time.perf_counter() - solver_start_time
+
+        stats.merge(solver.stats)
+        stats.phase_times.update(solver.stats.phase_times)
+        yield PuzzleResult(index, error is None and solver.verify(), time_elapsed, stats.passes, error, stats=stats, board=board)
+
+# The boards as stacks of lines along the given axis, of shape (puzzles, lines, line length). Writes go to the boards.
+def stack_lines(boards, axis):
+    return boards if axis == Axis.ROWS else boards.transpose(0, 2, 1)
+
+def solve_stack_lines(boards, axis, clues, dirty, active, solvable, line_solves):
+    """
+    Solve the dirty lines along one axis of the active puzzles, and mark the lines across every changed tile dirty.
+
+    :return: Boolean array of the puzzles whose boards changed
+    """
+    clue_lengths, clue_counts = clues
+    lines = stack_lines(boards, axis)
+    puzzle_indices, line_indices = np.nonzero(dirty[axis] & active[:, np.newaxis])
+    changed = np.zeros(len(boards), dtype=bool)
+    if not len(puzzle_indices):
+        return changed
+
+    old_lines = lines[puzzle_indices, line_indices]
+    clue_indices = puzzle_indices * lines.shape[1] + line_indices
+    new_lines, lines_ok = solve_lines(old_lines, clue_lengths[clue_indices], clue_counts[clue_indices])
+    lines[puzzle_indices, line_indices] = new_lines
+
+    dirty[axis][puzzle_indices, line_indices] = False
+    solvable[puzzle_indices[~lines_ok]] = False
+    np.add.at(line_solves, puzzle_indices, 1)
+
+    changed_lines, changed_tiles = np.nonzero(new_lines != old_lines)
+    changed[puzzle_indices[changed_lines]] = True
+    dirty[not axis][puzzle_indices[changed_lines], changed_tiles] = True
+    return changed
+
+# Whether each line along one axis of the given puzzles agrees with its clue, for each puzzle
+def lines_solvable(boards, axis, clues, puzzles):
+    clue_lengths, clue_counts = clues
+    lines = stack_lines(boards, axis)
+    result = puzzles.copy()
+    puzzle_indices = np.flatnonzero(puzzles)
+    if not len(puzzle_indices):
+        return result
+
+    line_count = lines.shape[1]
+    clue_indices = (puzzle_indices[:, np.newaxis] * line_count + np.arange(line_count)).ravel()
+    _, lines_ok = solve_lines(lines[puzzle_indices].reshape(-1, lines.shape[2]), clue_lengths[clue_indices], clue_counts[clue_indices])
+    result[puzzle_indices] = lines_ok.reshape(-1, line_count).all(axis=1)
+    return result
+
+def solve_lines(lines, clue_lengths, clue_counts):
+    """
+    Every deduction that can be made from each line on its own, for many lines of the same length at once. A tile is
+    filled if every placement of the line's clue that agrees with its known tiles fills it, and crossed if none does.
+    This finds everything Line.solve_line does, and sometimes more.
+
+    :param lines: Array of shape (lines, line length) of tile states
+    :param clue_lengths: Run lengths of each line's clue, padded with zeros as by pad_clues
+    :param clue_counts: Number of runs in each line's clue
+    :return: (lines, solvable). lines is a new array of the deduced states. solvable is False for each line that no
+        placement agrees with, which is left as it was.
+    """
+    line_count, line_length = lines.shape
+    clue_lengths = np.asarray(clue_lengths, dtype=int).reshape(line_count, -1)
+    clue_counts = np.asarray(clue_counts, dtype=int)
+
+    # Every line gets a crossed tile at each end, so that every run has a tile that can be crossed before and after it
+    padded = np.full((line_count, line_length + 2), State.CROSSED, dtype=lines.dtype)
+    padded[:, 1:-1] = lines
+    can_fill = padded != State.CROSSED
+    can_cross = padded != State.FILLED
+    size = line_length + 2
+
+    # Number of tiles before each index that can't be filled, so that a run fits wherever it stays the same
+    blocked_before = np.zeros((line_count, size + 1), dtype=int)
+    np.cumsum(~can_fill, axis=1, out=blocked_before[:, 1:])
+
+    # fits_before[:, j, i]: the first j runs fit before tile i, which is crossed. fits_after[:, j, i]: the last j runs
+    # fit after tile i, which is crossed. The second is the first for the reversed line and reversed clue.
+    fits_before = fitting_runs(can_fill, can_cross, blocked_before, clue_lengths)
+    reversed_lengths = reverse_clues(clue_lengths, clue_counts)
+    fits_after = fitting_runs(can_fill[:, ::-1], can_cross[:, ::-1], blocked_before[:, -1:] - blocked_before[:, ::-1], reversed_lengths)[:, :, ::-1]
+
+    line_indices = np.arange(line_count)
+    solvable = fits_before[line_indices, clue_counts, size - 1]
+
+    # fits_after of the runs left after each number of runs, -1 where there are more runs before than in the clue
+    runs_after = clue_counts[:, np.newaxis] - np.arange(clue_lengths.shape[1] + 1)
+    runs_after_fit = fits_after[line_indices[:, np.newaxis], np.maximum(runs_after, 0)] & (runs_after >= 0)[:, :, np.newaxis]
+
+    # A tile can be crossed if some number of runs fits before it and the rest after it
+    crossable = (fits_before & runs_after_fit).any(axis=1)
+
+    # Run j can start at s if the runs before it fit before s - 1, it fits from s, and the runs after it fit after
+    # its end. A tile can be filled if some run can start within the run's length before it.
+    run_count = clue_lengths.shape[1]
+    starts = np.arange(size)
+    run_ends = np.minimum(starts + clue_lengths[:, :, np.newaxis], size - 1)
+    run_fits = blocked_before[line_indices[:, np.newaxis, np.newaxis], run_ends] == blocked_before[:, np.newaxis, :size]
+    valid_starts = np.zeros((line_count, run_count, size), dtype=bool)
+    valid_starts[:, :, 1:] = fits_before[:, :run_count, :-1]
+    valid_starts &= run_fits & (starts + clue_lengths[:, :, np.newaxis] < size)
+    valid_starts &= np.take_along_axis(runs_after_fit[:, 1:], run_ends, axis=2)
+    valid_starts &= (np.arange(run_count) < clue_counts[:, np.newaxis])[:, :, np.newaxis]
+
+    starts_before = np.zeros((line_count, run_count, size + 1), dtype=int)
+    np.cumsum(valid_starts, axis=2, out=starts_before[:, :, 1:])
+    first_covering_starts = np.maximum(starts + 1 - clue_lengths[:, :, np.newaxis], 0)
+    fillable = (starts_before[:, :, 1:] > np.take_along_axis(starts_before, first_covering_starts, axis=2)).any(axis=1)
+
+    new_lines = lines.copy()
+    known_filled = (fillable & ~crossable)[:, 1:-1] & solvable[:, np.newaxis]
+    known_crossed = (crossable & ~fillable)[:, 1:-1] & solvable[:, np.newaxis]
+    new_lines[known_filled] = State.FILLED
+    new_lines[known_crossed] = State.CROSSED
+    return new_lines, solvable
+
+def fitting_runs(can_fill, can_cross, blocked_before, clue_lengths):
+    """
+    :return: Boolean array of shape (lines, clue runs + 1, line length). [:, j, i] is True if the first j runs of the
+        clue can be placed before tile i, and tile i can be crossed.
+    """
+    line_count, size = can_fill.shape
+    run_count = clue_lengths.shape[1]
+    line_indices = np.arange(line_count)[:, np.newaxis]
+    run_indices = np.arange(run_count)[np.newaxis, :]
+
+    fits = np.zeros((line_count, run_count + 1, size), dtype=bool)
+    fits[:, 0] = np.logical_and.accumulate(can_cross, axis=1)
+    for i in range(1, size):
+        # Either the tile before was crossed after the same runs, or run j - 1 ends just before tile i
+        run_starts = i - clue_lengths
+        ends_here = (run_starts >= 1) & (blocked_before[line_indices, np.maximum(run_starts, 0)] == blocked_before[:, i:i + 1])
+        ends_here &= fits[line_indices, run_indices, np.maximum(run_starts - 1, 0)]
+        fits[:, 1:, i] = can_cross[:, i:i + 1] & (fits[:, 1:, i - 1] | ends_here)
+    return fits
+
+# Each line's clue in reverse, still padded with zeros at the end
+def reverse_clues(clue_lengths, clue_counts):
+    reversed_indices = clue_counts[:, np.newaxis] - 1 - np.arange(clue_lengths.shape[1])
+    return np.where(reversed_indices >= 0, np.take_along_axis(clue_lengths, np.maximum(reversed_indices, 0), axis=1), 0)
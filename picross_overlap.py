@@ -0,0 +1,39 @@
+import numpy as np
+
+# Clue run lengths of every line in one array, padded with zeros, along with the number of clue runs in each line
+def pad_clues(line_clues_raw):
+    clue_counts = np.array([len(clue_run_lengths) for clue_run_lengths in line_clues_raw], dtype=int)
+    clue_lengths = np.zeros((len(line_clues_raw), clue_counts.max(initial=0)), dtype=int)
+    for line_index, clue_run_lengths in enumerate(line_clues_raw):
+        clue_lengths[line_index, :len(clue_run_lengths)] = clue_run_lengths
+    return clue_lengths, clue_counts
+
+def initial_overlap(line_clues_raw, line_length):
+    """
+    The deductions of ClueRun.apply on a blank board, for every line along one axis at once.
+
+    :return: (filled, crossed, first_starts, last_starts). filled and crossed are boolean arrays of shape
+        (lines, line_length). first_starts and last_starts hold the bounds of each ClueRun, padded like pad_clues.
+    """
+    clue_lengths, clue_counts = pad_clues(line_clues_raw)
+    line_count, max_clue_count = clue_lengths.shape
+    is_clue = np.arange(max_clue_count)[np.newaxis, :] < clue_counts[:, np.newaxis]
+
+    # Left-most placement packs every earlier run to the left, and the right-most shifts them all by the slack
+    first_starts = np.cumsum(clue_lengths + 1, axis=1) - clue_lengths - 1
+    slack = line_length - (clue_lengths.sum(axis=1) + clue_counts - 1)
+    last_starts = first_starts + slack[:, np.newaxis]
+    first_ends = first_starts + clue_lengths
+
+    # Fill each run's overlap [last_start, first_end) by marking its edges and accumulating along the line
+    overlaps = is_clue & (last_starts < first_ends)
+    overlap_lines = np.nonzero(overlaps)[0]
+    edges = np.zeros((line_count, line_length + 1), dtype=int)
+    np.add.at(edges, (overlap_lines, last_starts[overlaps]), 1)
+    np.add.at(edges, (overlap_lines, first_ends[overlaps]), -1)
+    filled = np.cumsum(edges, axis=1)[:, :line_length] > 0
+
+    # With no slack, every run is fixed, so every other tile is crossed. So is every tile of an empty line.
+    crossed = ((slack == 0) | (clue_counts == 0))[:, np.newaxis] & ~filled
+
+    return filled, crossed, first_starts, last_starts
@@ -0,0 +1,105 @@
+from helpers import *
+
+# Every deduction a single line allows, found by dynamic programming over the placements of its clue runs rather than by
+# the Rules of Line.solve_line. Sets of positions are integer bitmasks, so each step of the DP handles a whole line at
+# once, and a line costs a few big-integer operations per clue run.
+
+# Positions up to size that can be reached from a seed by moving right over tiles that aren't filled, as a mask. A seed on
+# a filled tile only reaches itself. Adding the seeds to the open tiles carries each one along to the next tile that
+# isn't open, so the bits the addition flips are the positions each seed reaches.
+def reachable_after(seeds, filled, size):
+    positions = bit_range(0, size + 1)
+    passing = seeds & ~filled
+    open_tiles = ~(passing | filled) & positions
+    return (seeds | (open_tiles + (passing << 1)) ^ open_tiles) & positions
+
+def reverse_bits(mask, width):
+    return int(format(mask, "b").zfill(width)[::-1], 2)
+
+def forward_placements(clue_run_lengths, filled, crossed, size, start_masks=None):
+    """
+    Left to right half of the DP.
+
+    :param start_masks: If given, a mask for each ClueRun of the only starts it can have
+
+    :return: (starts, afters). starts[j] is the mask of starts at which ClueRun j fits, with every ClueRun before it
+        placed before it. afters[j] is the mask of positions x for which the first j ClueRuns fit before x, with no
+        filled tile from the end of the last of them up to x. afters has one more mask than there are ClueRuns.
+    """
+    starts = []
+    afters = []
+    after = reachable_after(1, filled, size)
+    ready = after # Where the next ClueRun can start
+    for clue_index, run_length in enumerate(clue_run_lengths):
+        fitting_starts = ready & ~smear_down(crossed, run_length) & bit_range(0, size - run_length + 1)
+        if start_masks is not None:
+            fitting_starts &= start_masks[clue_index]
+        starts.append(fitting_starts)
+        afters.append(after)
+        after = reachable_after(fitting_starts << run_length, filled, size)
+        # The tile after a run must be crossed
+        ready = (after & ~filled) << 1
+    afters.append(after)
+    return starts, afters
+
+def line_placements(clue_run_lengths, filled, crossed, size, first_starts=None, last_starts=None):
+    """
+    Solve a line exactly, from its clues and known tiles.
+
+    :param filled: Mask of the line's filled tiles
+    :param crossed: Mask of the line's crossed tiles
+    :param first_starts: If given, with last_starts, the bounds of the starts each ClueRun is already known to be
+        within. They narrow the DP, and must not leave out any start that fits.
+    :return: (starts, fills, crosses), or None if no placement of the clues fits the line. starts[j] is the mask of
+        starts of ClueRun j used by some placement that fits. fills and crosses are the unknown tiles that every such
+        placement fills or leaves empty.
+    """
+    clue_count = len(clue_run_lengths)
+    start_masks = None
+    reversed_start_masks = None
+    if first_starts is not None:
+        start_masks = [bit_range(first_start, last_start + 1) for first_start, last_start in zip(first_starts, last_starts)]
+        reversed_start_masks = [bit_range(size - last_start - run_length, size - first_start - run_length + 1)
+                                for first_start, last_start, run_length in zip(first_starts[::-1], last_starts[::-1], clue_run_lengths[::-1])]
+
+    forward_starts, afters = forward_placements(clue_run_lengths, filled, crossed, size, start_masks)
+    if not afters[-1] >> size & 1:
+        return None
+
+    # The same from right to left, on the reversed line. befores[m] is the mask of positions x for which the last m
+    # ClueRuns fit from x on, with no filled tile from x up to the first of them.
+    _, reversed_afters = forward_placements(clue_run_lengths[::-1], reverse_bits(filled, size), reverse_bits(crossed, size), size,
+                                            reversed_start_masks)
+    befores = [reverse_bits(after, size + 1) for after in reversed_afters]
+
+    starts = []
+    fillable = 0
+    for clue_index, run_length in enumerate(clue_run_lengths):
+        following_count = clue_count - 1 - clue_index
+        # Ends of a run after which the remaining ClueRuns fit, past a crossed tile unless it's the last
+        if following_count:
+            ends = befores[following_count] >> 1 & ~filled
+        else:
+            ends = befores[0]
+        run_starts = forward_starts[clue_index] & ends >> run_length
+        starts.append(run_starts)
+        fillable |= smear_up(run_starts, run_length)
+
+    # A tile can be left empty if some number of ClueRuns fit before it and the rest after it
+    crossable = 0
+    for clue_index in range(clue_count + 1):
+        crossable |= afters[clue_index] & befores[clue_count - clue_index] >> 1
+    line_bits = bit_range(0, size)
+    crossable &= line_bits & ~filled
+
+    unknown = line_bits & ~filled & ~crossed
+    return starts, unknown & ~crossable, unknown & ~fillable
+
+# Counterpart of BitLine.solve_line_cells. Returns the tiles of line_raw every placement fills and crosses, as masks.
+def solve_line_placement_cells(clue_run_lengths, line_raw):
+    line_raw = np.asarray(line_raw)
+    placements = line_placements(clue_run_lengths, bools_to_mask(line_raw == State.FILLED), bools_to_mask(line_raw == State.CROSSED), len(line_raw))
+    if placements is None:
+        raise Contradiction(f"No placement of {clue_run_lengths} fits the line")
+    _, fills, crosses = placements
+    return fills, crosses
@@ -0,0 +1,42 @@
+import argparse
+import json
+import sys
+
+from EventLog import event_dicts
+from EventReplay import EventReplay
+from helpers import *
+
+def board_text(board):
+    return "\n".join("".join({State.FILLED: "#", State.CROSSED: "x"}.get(state, ".") for state in row) for row in board.tolist())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a solve recorded by an EventLog.")
+    parser.add_argument("log", help="Event log written by a Solver with event_log set")
+    parser.add_argument("--step", type=int, help="Step to show the board after (default the end of the log)")
+    parser.add_argument("--jsonl", action="store_true", help="Write every event as a line of JSON instead")
+    parser.add_argument("--display", action="store_true", help="Display each step that changed the board, from --step on")
+    args = parser.parse_args(argv)
+
+    replay = EventReplay(args.log)
+
+    if args.jsonl:
+        for event in event_dicts(replay.events):
+            print(json.dumps(event))
+        return 0
+
+    if args.display:
+        first_step = args.step or 0
+        for step in [first_step] + [step for step in replay.board_steps() if step > first_step]:
+            replay.display(step)
+            if replay.solver.renderer.closed:
+                break
+        return 0
+
+    board = replay.board(args.step)
+    print(f"{replay.header['name']}: {len(replay.events)} events, {len(replay)} steps")
+    print(f"After {'the last event' if args.step is None else f'step {args.step}: {replay.step_title(args.step)}'}")
+    print(board_text(board))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+import argparse
+import asyncio
+import sys
+
+from SolverService import SolverService
+from helpers import *
+
+async def serve(service, host, port, unix_path):
+    await service.start(host, port, unix_path)
+    print(f"Serving on {unix_path or f'http://{host}:{port}'} with {service.workers} workers", flush=True)
+    try:
+        await service.serve_forever()
+    finally:
+        service.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve puzzles posted over HTTP, with a pool of warm worker processes.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--unix", metavar="PATH", help="Listen on a Unix socket at PATH instead of a port")
+    parser.add_argument("--workers", type=int, help="Number of worker processes (default one per CPU)")
+    parser.add_argument("--max-pending", type=int, help="Requests that can wait for a worker before more are turned away (default 4 per worker)")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Most seconds a request can take")
+    parser.add_argument("--max-memory", type=float, help="Most MiB a request can allocate (default no limit)")
+    parser.add_argument("--engine", default=Engine.OBJECTS, choices=[Engine.OBJECTS, Engine.BITSET])
+    parser.add_argument("--schedule", default=Schedule.SWEEP, choices=[Schedule.SWEEP, Schedule.QUEUE, Schedule.PRIORITY])
+    parser.add_argument("--search", action="store_true", help="Guess tiles once line logic stalls")
+    args = parser.parse_args(argv)
+
+    memory_limit = None if args.max_memory is None else int(args.max_memory * (1 << 20))
+    service = SolverService(args.workers, args.max_pending, args.timeout, memory_limit,
+                            engine=args.engine, schedule=args.schedule, search=args.search)
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+# Worker processes import this module, so only serve when run directly
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from BitLine import solve_line_cells
+from SolveBudget import SolveBudget
+from SolveResult import SolveResult
+from SolveStats import SolveStats
+from Solver import Solver
+from helpers import *
+from picross_placements import solve_line_placement_cells
+
+# Solving one huge puzzle on several cores. The board lives in shared memory, in the -1/0/1 encoding of puzzle_raw, and
+# each worker process maps it once. Every row that needs solving is solved at once, then every such column. Each worker
+# solves its own chunk of the lines and writes their tiles straight to the board, which is safe because no two lines of
+# one axis share a tile. Workers only report which perpendicular lines they changed, and the coordinator decides which
+# lines to solve next, and what to do once none are left. After the board, the shared memory holds a stop flag, which
+# the coordinator sets once the budget runs out, and which the workers check before each line.
+
+# Seconds between checks of the budget while the workers solve a phase
+BUDGET_POLL_INTERVAL = 0.05
+
+# Set in each worker process by init_worker
+worker_memory = None
+worker_board = None
+worker_stop = None
+worker_clues = None
+worker_solve_cells = None
+
+def line_solver(line_logic):
+    return solve_line_placement_cells if line_logic == LineLogic.PLACEMENTS else solve_line_cells
+
+# The board and the stop flag in the shared memory
+def shared_arrays(memory, shape):
+    board = np.ndarray(shape, dtype=np.int8, buffer=memory.buf)
+    stop = np.ndarray(1, dtype=np.int8, buffer=memory.buf, offset=board.nbytes)
+    return board, stop
+
+def init_worker(memory_name, shape, row_and_col_clues_raw, line_logic):
+    global worker_memory, worker_board, worker_stop, worker_clues, worker_solve_cells
+    worker_memory = shared_memory.SharedMemory(name=memory_name)
+    worker_board, worker_stop = shared_arrays(worker_memory, shape)
+    worker_clues = row_and_col_clues_raw
+    worker_solve_cells = line_solver(line_logic)
+
+def solve_lines(board, row_and_col_clues_raw, solve_cells, axis, line_indices, stop=None):
+    """
+    Solve each line once, from the tiles on the board, and write the tiles it deduces to the board.
+
+    :param stop: Flag checked before each line, which stops the rest of the lines from being solved once it's set
+    :return: (changed, error). changed is the mask of perpendicular lines given new tiles. error is the message of the
+        Contradiction a line ran into, or None.
+    """
+    axis_view = puzzle_and_transpose(board)[axis]
+    changed = 0
+    for line_index in line_indices:
+        if stop is not None and stop[0]:
+            break
+        line_raw = axis_view[line_index]
+        try:
+            fills, crosses = solve_cells(row_and_col_clues_raw[axis][line_index], line_raw)
+        except Contradiction as e:
+            return changed, f"Line {line_name(axis, line_index)}: {e}"
+        if fills:
+            line_raw[mask_to_bools(fills, len(line_raw))] = State.FILLED
+        if crosses:
+            line_raw[mask_to_bools(crosses, len(line_raw))] = State.CROSSED
+        changed |= fills | crosses
+    return changed, None
+
+def solve_worker_lines(axis, line_indices):
+    return solve_lines(worker_board, worker_clues, worker_solve_cells, axis, line_indices, worker_stop)
+
+# Solve lines until none of them has new tiles to work with, or the budget runs out. Returns the StopReason.
+def propagate_shared(executor, board, stop, chunk_count, budget, stats):
+    lines_to_solve = [np.ones(board.shape[Axis.ROWS], dtype=bool), np.ones(board.shape[Axis.COLS], dtype=bool)]
+    axis = Axis.ROWS
+    try:
+        while lines_to_solve[Axis.ROWS].any() or lines_to_solve[Axis.COLS].any():
+            if axis == Axis.ROWS:
+                budget.count_passes()
+                stats.passes += 1
+            budget.check()
+
+            line_indices = np.flatnonzero(lines_to_solve[axis])
+            lines_to_solve[axis][:] = False
+            if len(line_indices):
+                # The perpendicular lines are only read once every chunk is done, so they see all of this axis' tiles
+                chunks = [chunk.tolist() for chunk in np.array_split(line_indices, min(len(line_indices), chunk_count))]
+                futures = {executor.submit(solve_worker_lines, axis, chunk) for chunk in chunks}
+                try:
+                    # The budget is checked while waiting, so that it's kept to even during a long phase
+                    while futures:
+                        done, futures = wait(futures, BUDGET_POLL_INTERVAL, FIRST_COMPLETED)
+                        for future in done:
+                            changed, error = future.result()
+                            if error is not None:
+                                raise Contradiction(error)
+                            lines_to_solve[not axis] |= mask_to_bools(changed, board.shape[not axis])
+                        budget.check()
+                finally:
+                    # Once the phase is cut short, the workers stop at their next line, and chunks not yet started are dropped
+                    if futures:
+                        stop[0] = 1
+                        for future in futures:
+                            future.cancel()
+                stats.line_solves += len(line_indices)
+            axis = Axis.COLS if axis == Axis.ROWS else Axis.ROWS
+    except BudgetExceeded as e:
+        return e.stop_reason
+
+    return StopReason.STALLED if (board == State.UNKNOWN).any() else StopReason.COMPLETE
+
+def solve_shared(puzzle_clues_raw, puzzle=None, workers=None, chunks_per_worker=4, line_logic=LineLogic.RULES, search=False,
+                 time_limit=None, max_passes=None, budget=None, **solver_options):
+    """
+    Solve one puzzle by line logic, with the lines of each axis split between worker processes sharing the board. Meant
+    for boards of a thousand lines or more, where one Solver would leave every core but one idle.
+
+    :param puzzle_clues_raw: Clues of the puzzle, as returned by picross_import
+    :param puzzle: Starting board, or None for a blank one. It's copied to shared memory, and isn't changed.
+    :param workers: Number of worker processes, or None for one per CPU
+    :param chunks_per_worker: Each axis is sent in this many chunks of lines per worker, so that a worker whose lines
+        were quick to solve can take on more
+    :param line_logic: A LineLogic, for how each line is solved
+    :param search: If line logic stalls, finish in this process with a Solver that searches, from the shared board
+    :param budget: SolveBudget to solve within, such as one that another thread can cancel, instead of one made from
+        time_limit and max_passes
+    :param solver_options: Keyword arguments passed on to that Solver, such as engine
+    :return: SolveResult, whose board is a copy of the shared board
+    """
+    row_and_col_clues_raw = [[[run_length for run_length in clue_run_lengths if run_length] for clue_run_lengths in axis_clues_raw]
+                             for axis_clues_raw in puzzle_clues_raw]
+    shape = (len(puzzle_clues_raw[Axis.ROWS]), len(puzzle_clues_raw[Axis.COLS]))
+    workers = workers or os.cpu_count()
+    budget = budget if budget is not None else SolveBudget(time_limit, max_passes)
+    budget.start()
+    stats = SolveStats()
+
+    memory = shared_memory.SharedMemory(create=True, size=shape[0] * shape[1] + 1)
+    board, stop = shared_arrays(memory, shape)
+    try:
+        board[:] = State.UNKNOWN if puzzle is None else puzzle
+        stop[0] = 0
+        with stats.phase("propagate"):
+            with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(memory.name, shape, row_and_col_clues_raw, line_logic)) as executor:
+                stop_reason = propagate_shared(executor, board, stop, workers * chunks_per_worker, budget, stats)
+        puzzle_raw = np.array(board, dtype=int)
+    finally:
+        del board, stop # The shared memory can't be closed while an array still maps it
+        memory.close()
+        memory.unlink()
+
+    if stop_reason != StopReason.STALLED or not search:
+        return SolveResult(puzzle_raw, stop_reason, stats)
+
+    # Search in a single Solver. It shares the budget without starting it again, so it only gets what is left of it,
+    # and a cancel still reaches it.
+    solver = Solver("Shared", puzzle_raw, puzzle_clues_raw, display_steps=False, line_logic=line_logic, search=True,
+                    budget=budget, **solver_options)
+    try:
+        solver.solve_steps()
+        stop_reason = StopReason.COMPLETE if solver.is_complete() else StopReason.STALLED
+    except BudgetExceeded as e:
+        stop_reason = e.stop_reason
+    finally:
+        stats.merge(solver.stats)
+    return SolveResult(solver.puzzle_raw, stop_reason, stats)
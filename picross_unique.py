@@ -0,0 +1,54 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from Solver import Solver
+from helpers import *
+from picross_import import picross_import
+
+def find_solutions(puzzle_clues_raw, limit=2, name="Puzzle", **solver_options):
+    """
+    :return: Up to limit solutions of the clues, as boards. One solution means it's the only one.
+    :param solver_options: Keyword arguments passed on to the Solver, such as engine or time_limit
+    """
+    puzzle = np.zeros((len(puzzle_clues_raw[0]), len(puzzle_clues_raw[1])), dtype=int)
+    return Solver(name, puzzle, puzzle_clues_raw, display_steps=False, **solver_options).find_solutions(limit)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that each puzzle of a file has exactly one solution. Exits with 1 if any doesn't.")
+    parser.add_argument("file", nargs="?", default="puzzles/Large.txt", help="Puzzle file to check")
+    parser.add_argument("--puzzle", type=int, action="append", help="Index of a puzzle to check (repeatable, default all)")
+    parser.add_argument("--limit", type=int, default=2, help="Stop counting the solutions of a puzzle once this many are found")
+    parser.add_argument("--engine", default=Engine.BITSET, choices=[Engine.OBJECTS, Engine.BITSET])
+    parser.add_argument("--line-logic", default=LineLogic.RULES, choices=[LineLogic.RULES, LineLogic.PLACEMENTS])
+    parser.add_argument("--time-limit", type=float, help="Most seconds each puzzle can take")
+    args = parser.parse_args(argv)
+
+    all_puzzle_clues = picross_import(args.file)
+    counts = {"unique": 0, "multiple": 0, "none": 0, "unfinished": 0}
+    start_time = time.time()
+    for i in args.puzzle or range(len(all_puzzle_clues)):
+        try:
+            solutions = find_solutions(all_puzzle_clues[i], args.limit, f"Puzzle {i}", engine=args.engine,
+                                       line_logic=args.line_logic, time_limit=args.time_limit)
+        except BudgetExceeded as e:
+            counts["unfinished"] += 1
+            print(f"Puzzle {i}: stopped counting ({e.stop_reason})")
+            continue
+
+        if len(solutions) == 1:
+            counts["unique"] += 1
+        elif solutions:
+            counts["multiple"] += 1
+            print(f"Puzzle {i}: {'at least ' if len(solutions) == args.limit else ''}{len(solutions)} solutions")
+        else:
+            counts["none"] += 1
+            print(f"Puzzle {i}: no solution")
+
+    print(", ".join(f"{name}:{count}" for name, count in counts.items()) + f", time:{time.time() - start_time}")
+    return 0 if counts["unique"] == sum(counts.values()) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+import argparse
+import json
+import math
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+from Solver import Solver
+from helpers import *
+from picross_generate import BITMAPS, generate_puzzle
+
+def solve_generated(puzzle_clues_raw, solver_options):
+    puzzle = np.zeros((len(puzzle_clues_raw[0]), len(puzzle_clues_raw[1])), dtype=int)
+
+    start_time = time.perf_counter()
+    solver = Solver("Scaling", puzzle, puzzle_clues_raw, display_steps=False, **solver_options)
+    solver.solve()
+    time_elapsed = time.perf_counter() - start_time
+
+    return time_elapsed, solver, puzzle
+
+# Peak bytes allocated while building and solving a Solver. Measured in a separate solve, as tracing slows it down.
+def measure_peak_memory(puzzle_clues_raw, solver_options):
+    tracemalloc.start()
+    try:
+        solve_generated(puzzle_clues_raw, solver_options)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+def benchmark_size(size, density, kind, seeds, solver_options, measure_memory=True):
+    times = []
+    passes = []
+    line_solves = []
+    clue_runs = []
+    known_fractions = []
+    solved_count = 0
+    peaks = []
+    for seed in range(seeds):
+        _, puzzle_clues_raw = generate_puzzle(size, size, density, kind, seed)
+        time_elapsed, solver, puzzle = solve_generated(puzzle_clues_raw, solver_options)
+
+        times.append(time_elapsed)
+        passes.append(solver.pass_count)
+        line_solves.append(solver.stats.line_solves)
+        clue_runs.append(sum(len(clue_run_lengths) for axis_clues in solver.row_and_col_clues_raw for clue_run_lengths in axis_clues))
+        known_fractions.append(np.count_nonzero(puzzle) / puzzle.size)
+        solved_count += bool(solver.is_complete() and solver.verify())
+        if measure_memory:
+            peaks.append(measure_peak_memory(puzzle_clues_raw, solver_options))
+
+    return {
+        "size": size,
+        "cells": size * size,
+        "clue_runs": statistics.mean(clue_runs),
+        "min": min(times),
+        "median": statistics.median(times),
+        "passes": statistics.mean(passes),
+        "line_solves": statistics.mean(line_solves),
+        "known_fraction": statistics.mean(known_fractions),
+        "solved": solved_count,
+        "puzzles": seeds,
+        "peak_memory": statistics.mean(peaks) if peaks else None,
+    }
+
+def add_scaling_exponents(results):
+    """
+    For each size after the first, the exponent k for which the metric grew as cells ** k since the size before it.
+    A k above 1 is superlinear in the board's area.
+    """
+    for previous, result in zip(results, results[1:]):
+        cell_ratio = math.log(result["cells"] / previous["cells"])
+        clue_ratio = math.log(result["clue_runs"] / previous["clue_runs"]) if previous["clue_runs"] and result["clue_runs"] else 0
+        for metric in ["median", "passes", "line_solves", "peak_memory"]:
+            if previous[metric] and result[metric]:
+                result[f"{metric}_exponent"] = math.log(result[metric] / previous[metric]) / cell_ratio
+        if clue_ratio and previous["median"] and result["median"]:
+            result["median_clue_exponent"] = math.log(result["median"] / previous["median"]) / clue_ratio
+
+def format_exponent(result, metric):
+    exponent = result.get(f"{metric}_exponent")
+    return "" if exponent is None else f"{exponent:.2f}"
+
+def print_results(results):
+    print(f"{'size':>9} {'clue runs':>9} {'median s':>9} {'us/cell':>8} {'passes':>7} {'line solves':>11} {'known':>6} {'solved':>6} {'peak MiB':>8}"
+          f" | {'k time':>6} {'k clues':>7} {'k passes':>8} {'k memory':>8}")
+    for result in results:
+        peak_memory = "" if result["peak_memory"] is None else f"{result['peak_memory'] / (1 << 20):.1f}"
+        clue_exponent = result.get("median_clue_exponent")
+        print(f"{result['size']:>4}x{result['size']:<4} {result['clue_runs']:>9.0f} {result['median']:>9.3f} {1e6 * result['median'] / result['cells']:>8.1f}"
+              f" {result['passes']:>7.1f} {result['line_solves']:>11.0f} {result['known_fraction']:>6.1%} {result['solved']:>2}/{result['puzzles']:<3} {peak_memory:>8}"
+              f" | {format_exponent(result, 'median'):>6} {'' if clue_exponent is None else f'{clue_exponent:.2f}':>7}"
+              f" {format_exponent(result, 'passes'):>8} {format_exponent(result, 'peak_memory'):>8}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time generated puzzles of growing sizes, to find where solving scales superlinearly.")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[25, 50, 100, 200], help="Widths of the square puzzles")
+    parser.add_argument("--density", type=float, default=0.6, help="Fraction of tiles filled")
+    parser.add_argument("--kind", default="blobs", choices=list(BITMAPS), help="Bitmaps the clues are derived from")
+    parser.add_argument("--seeds", type=int, default=3, help="Puzzles generated per size")
+    parser.add_argument("--engine", default=Engine.OBJECTS, choices=[Engine.OBJECTS, Engine.BITSET])
+    parser.add_argument("--schedule", default=Schedule.SWEEP, choices=[Schedule.SWEEP, Schedule.QUEUE, Schedule.PRIORITY])
+    parser.add_argument("--line-logic", default=LineLogic.RULES, choices=[LineLogic.RULES, LineLogic.PLACEMENTS],
+                        help="Solve lines by hand-written rules, or exactly from every placement of their clues")
+    parser.add_argument("--search", action="store_true", help="Guess tiles once line logic stalls")
+    parser.add_argument("--no-memory", action="store_true", help="Skip measuring peak memory, which solves every puzzle a second time")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    solver_options = {"engine": args.engine, "schedule": args.schedule, "line_logic": args.line_logic, "search": args.search}
+    results = []
+    for size in sorted(args.sizes):
+        results.append(benchmark_size(size, args.density, args.kind, args.seeds, solver_options, not args.no_memory))
+    add_scaling_exponents(results)
+
+    print(f"{args.kind} puzzles, density {args.density}, {solver_options}")
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({
+                "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "kind": args.kind,
+                "density": args.density,
+                "seeds": args.seeds,
+                "solver_options": solver_options,
+                "results": results,
+            }, file, indent=1)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,24 @@
+import os
+
+import numpy as np
+import pytest
+
+from EventLog import EventLog
+from EventReplay import EventReplay
+from Solver import Solver
+from helpers import *
+from picross_import import picross_import
+
+LARGE_PUZZLES = os.path.join(os.path.dirname(__file__), "puzzles", "Large.txt")
+
+@pytest.mark.parametrize("engine", [Engine.OBJECTS, Engine.BITSET])
+@pytest.mark.parametrize("vectorized_init", [False, True])
+def test_replay_matches_solve(tmp_path, engine, vectorized_init):
+    for puzzle_index, puzzle_clues_raw in list(enumerate(picross_import(LARGE_PUZZLES)))[::30]:
+        puzzle = np.zeros((len(puzzle_clues_raw[Axis.ROWS]), len(puzzle_clues_raw[Axis.COLS])), dtype=int)
+        filename = tmp_path / f"{puzzle_index}.events"
+        with EventLog(filename) as event_log:
+            Solver(f"Puzzle {puzzle_index}", puzzle, puzzle_clues_raw, display_steps=False, engine=engine,
+                   vectorized_init=vectorized_init, event_log=event_log).solve()
+
+        assert (EventReplay(filename).board() == puzzle).all(), f"Puzzle {puzzle_index} replays differently"
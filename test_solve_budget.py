@@ -0,0 +1,41 @@
+import os
+
+import numpy as np
+import pytest
+
+from LeanSolver import LeanSolver
+from Solver import Solver
+from helpers import *
+from picross_import import picross_import
+
+LARGE_PUZZLES = os.path.join(os.path.dirname(__file__), "puzzles", "Large.txt")
+
+def puzzle_and_clues(puzzle_index=0):
+    puzzle_clues_raw = picross_import(LARGE_PUZZLES)[puzzle_index]
+    return np.zeros((len(puzzle_clues_raw[Axis.ROWS]), len(puzzle_clues_raw[Axis.COLS])), dtype=int), puzzle_clues_raw
+
+@pytest.mark.parametrize("vectorized_init", [False, True])
+def test_cancel_before_solve(vectorized_init):
+    puzzle, puzzle_clues_raw = puzzle_and_clues()
+    solver = Solver("Cancelled", puzzle, puzzle_clues_raw, display_steps=False, vectorized_init=vectorized_init)
+    solver.cancel()
+
+    result = solver.solve()
+    assert result.stop_reason == StopReason.CANCELLED
+    assert not puzzle.any()
+
+def test_cancel_is_used_up_by_the_solve_it_stops():
+    puzzle, puzzle_clues_raw = puzzle_and_clues()
+    solver = Solver("Cancelled", puzzle, puzzle_clues_raw, display_steps=False)
+    solver.cancel()
+    assert solver.solve().stop_reason == StopReason.CANCELLED
+
+    solver = Solver("Not cancelled", puzzle, puzzle_clues_raw, display_steps=False, budget=solver.budget)
+    assert solver.solve().stop_reason == StopReason.COMPLETE
+
+def test_lean_cancel_before_solve():
+    puzzle, puzzle_clues_raw = puzzle_and_clues()
+    solver = LeanSolver("Cancelled", puzzle, puzzle_clues_raw)
+    solver.cancel()
+    assert solver.solve().stop_reason == StopReason.CANCELLED
+    assert not puzzle.any()
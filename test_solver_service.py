@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+from SolverService import SolverService
+from picross_generate import generate_puzzle, puzzle_text
+
+async def request(unix_path, method, target, body=b""):
+    reader, writer = await asyncio.open_unix_connection(unix_path)
+    writer.write(f"{method} {target} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, response_body = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(response_body)
+
+def run_service(tmp_path, test, **service_options):
+    async def run():
+        service = SolverService(**service_options)
+        unix_path = str(tmp_path / "service.sock")
+        await service.start(unix_path=unix_path)
+        try:
+            await test(service, unix_path)
+        finally:
+            service.close()
+    asyncio.run(run())
+
+def test_service(tmp_path):
+    async def test(service, unix_path):
+        status_code, response = await request(unix_path, "GET", "/health")
+        assert status_code == 200 and response["status"] == "ok"
+
+        for body in [b"1,1:5", b"1x1\tBad\t1-1-1", b"1x1\tBad\t1-x", "1x1\tBad\t1-1\xff".encode("latin-1")]:
+            status_code, response = await request(unix_path, "POST", "/solve", body)
+            assert status_code == 400, body
+
+        status_code, response = await request(unix_path, "POST", "/solve", b"3x2\tSmall\t3:1-2:1:1")
+        assert status_code == 200
+        assert response["status"] == "solved"
+        assert response["board"] == [[1, 1, 1], [1, -1, -1]]
+
+        assert (await request(unix_path, "GET", "/nowhere"))[0] == 404
+        assert (await request(unix_path, "GET", "/solve"))[0] == 405
+
+        counts = (await request(unix_path, "GET", "/metrics"))[1]["counts"]
+        assert counts["requests"] == 5
+        assert counts["bad_request"] == 4
+        assert counts["solved"] == 1
+
+    run_service(tmp_path, test, workers=1)
+
+def test_service_timeout_and_capacity(tmp_path):
+    _, clues = generate_puzzle(150, 150, seed=1)
+    slow_puzzle = puzzle_text(clues, "Slow").encode("utf-8")
+
+    async def test(service, unix_path):
+        # With one worker and no room to wait, a second request is turned away while the first is solved
+        slow_request = asyncio.create_task(request(unix_path, "POST", "/solve?timeout=0.3", slow_puzzle))
+        while service.in_flight < service.capacity:
+            await asyncio.sleep(0.01)
+        status_code, response = await request(unix_path, "POST", "/solve", b"1x1\tQuick\t1-1")
+        assert status_code == 503
+        assert (await request(unix_path, "GET", "/health"))[1]["status"] == "busy"
+
+        status_code, response = await slow_request
+        assert status_code == 504
+        assert response["status"] == "timeout"
+
+    run_service(tmp_path, test, workers=1, max_pending=0)